@@ -2,53 +2,95 @@
 """
 Farm Link 원격 제어 스크립트
 아두이노에 제어 명령을 전송하는 스크립트
+제어 작업은 스케줄러(farmlink_actuator)가 실행 시각 순으로 보내며, 제어 로그는 모아서 한 번에 기록
 """
 
 import serial
 import time
 import sys
+import os
 import argparse
 import json
-import requests
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from farmlink_actuator import ActuatorScheduler, ControlLogBatcher, parse_at
+from farmlink_api import FarmLinkApiClient
+from farmlink_parser import looks_like_sensor_line
+from farmlink_serial import wait_until_ready
 
 class FarmLinkController:
-    def __init__(self, port='COM7', baudrate=9600):
+    def __init__(self, port='COM7', baudrate=9600, device_id='farmlink-001',
+                 api_base_url="http://localhost:3000", session=None):
         self.port = port
         self.baudrate = baudrate
+        self.device_id = device_id
         self.serial_conn = None
-        self.api_base_url = "http://localhost:3000"
-        
+        self.api_base_url = api_base_url
+        # 제어 로그 기록은 공유 API 클라이언트로 전송 (keep-alive, 재시도, 서킷 브레이커)
+        self.owns_http = session is None
+        self.http = session or FarmLinkApiClient(self.api_base_url)
+        # 스케줄러를 쓰면 제어 로그를 모아서 업로드 (None이면 명령마다 바로 기록)
+        self.log_batcher = None
+        # 응답은 수신 스레드가 읽어 출력하고, 기다리는 쪽은 이벤트로 깨움
+        self.write_lock = threading.Lock()
+        self.response_event = threading.Event()
+        self.reader_active = False
+        self.reader_thread = None
+    
     def connect(self):
         """시리얼 포트 연결"""
         try:
-            self.serial_conn = serial.Serial(self.port, self.baudrate, timeout=1)
-            time.sleep(2)  # 연결 안정화 대기
-            print(f"✅ {self.port} 포트에 연결되었습니다.")
+            self.serial_conn = serial.Serial(self.port, self.baudrate, timeout=0.2)
+            # 보드가 재시작되어 시작 메시지를 보낼 때까지만 대기 (최대 3초)
+            wait_until_ready(self.serial_conn)
+            self.reader_active = True
+            self.reader_thread = threading.Thread(target=self.response_worker, daemon=True)
+            self.reader_thread.start()
+            print(f"✅ [{self.device_id}] {self.port} 포트에 연결되었습니다.")
             return True
         except Exception as e:
-            print(f"❌ 시리얼 포트 연결 실패: {e}")
+            print(f"❌ [{self.device_id}] 시리얼 포트 연결 실패: {e}")
             return False
     
     def disconnect(self):
         """시리얼 포트 연결 해제"""
+        self.reader_active = False
+        if self.reader_thread:
+            self.reader_thread.join(timeout=1)
+        if self.owns_http:
+            self.http.close()
         if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.close()
-            print("🔌 시리얼 포트 연결이 해제되었습니다.")
+            print(f"🔌 [{self.device_id}] 시리얼 포트 연결이 해제되었습니다.")
+    
+    def response_worker(self):
+        """보드 응답 수신 스레드"""
+        while self.reader_active:
+            try:
+                line = self.serial_conn.readline()
+            except Exception:
+                break
+            # 보드가 계속 보내는 센서 데이터 줄은 명령 응답이 아니므로 건너뜀 (SerialCommand.matches와 같은 기준)
+            if line and not looks_like_sensor_line(line):
+                response = line.decode('utf-8', errors='replace').strip()
+                if response:
+                    print(f"📥 [{self.device_id}] 응답: {response}")
+                    self.response_event.set()
     
     def log_control_action(self, action, duration, triggered_by='manual'):
         """API 서버를 통해 제어 로그 기록"""
         try:
             log_data = {
-                'device_id': 'farmlink-001',
+                'device_id': self.device_id,
                 'action': action,
                 'duration': duration,
                 'triggered_by': triggered_by
             }
             
-            response = requests.post(
+            response = self.http.post(
                 f"{self.api_base_url}/api/control-logs",
-                json=log_data,
-                timeout=5
+                json=log_data
             )
             
             if response.status_code == 200:
@@ -62,31 +104,31 @@ class FarmLinkController:
             else:
                 print(f"⚠️ API 서버 오류: {response.status_code}")
                 return False
-                
+        
         except Exception as e:
             print(f"⚠️ 제어 로그 기록 오류: {e}")
             return False
     
-    def send_command(self, command):
-        """아두이노에 명령 전송"""
+    def send_command(self, command, wait=0.5):
+        """아두이노에 명령 전송 (wait초 안에 응답이 오면 바로 반환, 0이면 기다리지 않음)"""
         if not self.serial_conn or not self.serial_conn.is_open:
-            print("❌ 시리얼 포트가 연결되지 않았습니다.")
+            print(f"❌ [{self.device_id}] 시리얼 포트가 연결되지 않았습니다.")
             return False
         
         try:
             command_bytes = (command + '\n').encode('utf-8')
-            self.serial_conn.write(command_bytes)
-            print(f"📤 명령 전송: {command}")
+            self.response_event.clear()
+            with self.write_lock:
+                self.serial_conn.write(command_bytes)
+            print(f"📤 [{self.device_id}] 명령 전송: {command}")
             
-            # 응답 대기
-            time.sleep(0.5)
-            if self.serial_conn.in_waiting > 0:
-                response = self.serial_conn.readline().decode('utf-8').strip()
-                print(f"📥 응답: {response}")
+            # 응답 대기 (고정 0.5초 대신 응답이 오는 즉시 반환)
+            if wait:
+                self.response_event.wait(wait)
             
             return True
         except Exception as e:
-            print(f"❌ 명령 전송 실패: {e}")
+            print(f"❌ [{self.device_id}] 명령 전송 실패: {e}")
             return False
     
     def control_device(self, action, duration=5000):
@@ -94,9 +136,12 @@ class FarmLinkController:
         command = f"control:{action}:{duration}"
         success = self.send_command(command)
         
-        # 제어 로그 기록
+        # 제어 로그 기록 (스케줄러 사용 시에는 모아서 업로드)
         if success and action != 'status':
-            self.log_control_action(action, duration, 'manual')
+            if self.log_batcher:
+                self.log_batcher.add(self.device_id, action, duration, 'manual')
+            else:
+                self.log_control_action(action, duration, 'manual')
         
         return success
     
@@ -116,20 +161,70 @@ class FarmLinkController:
         """모든 장치 끄기"""
         return self.send_command("control:all_off:0")
 
+def parse_devices(value):
+    """--devices 인자 ("farmlink-001=COM7,farmlink-002=COM8")를 (장치 ID, 포트) 목록으로 변환"""
+    devices = []
+    for item in value.split(','):
+        device_id, separator, port = item.strip().partition('=')
+        if not separator or not device_id or not port:
+            raise argparse.ArgumentTypeError(f"장치 형식은 <장치 ID>=<포트>입니다: {item}")
+        devices.append((device_id, port))
+    return devices
+
+def load_schedule(path):
+    """작업 파일(JSON 목록) 읽기: [{"action": "water_pump", "duration": 5000, "at": "06:00", "devices": [...]}]"""
+    with open(path, encoding='utf-8') as f:
+        jobs = json.load(f)
+    if not isinstance(jobs, list):
+        raise ValueError("작업 파일은 JSON 목록이어야 합니다.")
+    return jobs
+
+def print_jobs(jobs):
+    if not jobs:
+        print("📋 대기 중인 작업이 없습니다.")
+    for job in jobs:
+        print(f"📋 {job}")
+
 def main():
     parser = argparse.ArgumentParser(description='Farm Link 원격 제어')
     parser.add_argument('--port', default='COM7', help='시리얼 포트 (기본: COM7)')
-    parser.add_argument('--action', choices=['water_pump', 'fan', 'led', 'all_off', 'status', 'reset', 'defaults'], 
+    parser.add_argument('--device-id', default='farmlink-001', help='장치 ID (기본: farmlink-001)')
+    parser.add_argument('--devices', type=parse_devices,
+                        help='여러 장치 제어 (<장치 ID>=<포트>를 쉼표로 구분, 지정하면 --port/--device-id 대신 사용)')
+    parser.add_argument('--api-url', default="http://localhost:3000", help='API 서버 주소 (기본: http://localhost:3000)')
+    parser.add_argument('--action', choices=['water_pump', 'fan', 'led', 'all_off', 'status', 'reset', 'defaults'],
                        help='제어 액션')
     parser.add_argument('--duration', type=int, default=5000, help='작동 시간 (밀리초, 기본: 5000)')
+    parser.add_argument('--at', help='실행 시각 (예: 06:00 다음 도래 시각, 2024-05-01T06:00, 기본: 즉시)')
+    parser.add_argument('--schedule', help='작업 파일 (JSON 목록: action, duration, at, devices)')
     parser.add_argument('--interactive', action='store_true', help='대화형 모드')
     
     args = parser.parse_args()
     
-    controller = FarmLinkController(port=args.port)
+    # 모든 장치가 API 클라이언트와 제어 로그 업로드를 공유
+    api_client = FarmLinkApiClient(args.api_url)
+    log_batcher = ControlLogBatcher(api_client)
+    controllers = {}
+    for device_id, port in (args.devices or [(args.device_id, args.port)]):
+        controller = FarmLinkController(port=port, device_id=device_id, api_base_url=args.api_url, session=api_client)
+        controller.log_batcher = log_batcher
+        if not controller.connect():
+            for connected in controllers.values():
+                connected.disconnect()
+            sys.exit(1)
+        controllers[device_id] = controller
     
-    if not controller.connect():
-        sys.exit(1)
+    # 스케줄러는 응답을 기다리지 않고 쓰기만 함 (응답은 장치별 수신 스레드가 출력)
+    scheduler = ActuatorScheduler(
+        {device_id: (lambda command, controller=controller: controller.send_command(command, wait=0))
+         for device_id, controller in controllers.items()},
+        log_batcher=log_batcher
+    )
+    scheduler.start()
+    
+    def broadcast(command):
+        for controller in controllers.values():
+            controller.send_command(command)
     
     try:
         if args.interactive:
@@ -139,6 +234,8 @@ def main():
             print("  water_pump [시간] - 물펌프 작동")
             print("  fan [시간] - 팬 작동")
             print("  led [시간] - LED 작동")
+            print("  at <HH:MM> <water_pump|fan|led> [시간] [장치,...] - 예약 작동")
+            print("  jobs - 예약 작업 목록")
             print("  all_off - 모든 장치 끄기")
             print("  status - 상태 조회")
             print("  reset - 시스템 리셋")
@@ -157,16 +254,22 @@ def main():
                     if command == 'quit':
                         break
                     elif command == 'status':
-                        controller.get_status()
+                        broadcast("status")
                     elif command == 'reset':
-                        controller.reset_system()
+                        broadcast("reset")
                     elif command == 'defaults':
-                        controller.restore_defaults()
+                        broadcast("defaults")
                     elif command == 'all_off':
-                        controller.turn_off_all()
+                        scheduler.schedule('all_off', 0)
                     elif command in ['water_pump', 'fan', 'led']:
                         duration = int(user_input[1]) if len(user_input) > 1 else 5000
-                        controller.control_device(command, duration)
+                        scheduler.schedule(command, duration)
+                    elif command == 'at' and len(user_input) >= 3:
+                        duration = int(user_input[3]) if len(user_input) > 3 else 5000
+                        device_ids = user_input[4].split(',') if len(user_input) > 4 else None
+                        print_jobs(scheduler.schedule(user_input[2], duration, device_ids, at=parse_at(user_input[1])))
+                    elif command == 'jobs':
+                        print_jobs(scheduler.pending_jobs())
                     else:
                         print("❌ 알 수 없는 명령입니다.")
                 
@@ -177,19 +280,39 @@ def main():
         
         else:
             # 명령행 모드
-            if args.action == 'status':
-                controller.get_status()
+            if args.schedule:
+                for job in load_schedule(args.schedule):
+                    scheduler.schedule(job['action'], job.get('duration', 5000), job.get('devices'),
+                                       at=parse_at(job.get('at')))
+            elif args.action == 'status':
+                broadcast("status")
             elif args.action == 'reset':
-                controller.reset_system()
+                broadcast("reset")
             elif args.action == 'defaults':
-                controller.restore_defaults()
-            elif args.action == 'all_off':
-                controller.turn_off_all()
-            else:
-                controller.control_device(args.action, args.duration)
+                broadcast("defaults")
+            elif args.action:
+                scheduler.schedule(args.action, args.duration if args.action != 'all_off' else 0,
+                                   at=parse_at(args.at))
+            
+            pending = scheduler.pending_jobs()
+            if pending:
+                print_jobs(pending)
+                print("⏳ 예약 작업을 모두 실행할 때까지 대기합니다 (Ctrl+C로 취소)")
+            try:
+                scheduler.wait_idle()
+                # 마지막 명령의 응답을 받을 시간
+                time.sleep(0.5)
+            except KeyboardInterrupt:
+                print("\n⏹️ 남은 예약 작업을 취소합니다.")
     
     finally:
-        controller.disconnect()
+        scheduler.stop()
+        stats = scheduler.get_stats()
+        print(f"📊 작업 {stats['jobs_scheduled']}건 (병합 {stats['jobs_merged']}건, 중복 제거 {stats['jobs_redundant']}건), "
+              f"명령 전송 {stats['commands_sent']}건, 제어 로그 요청 {stats['logs']['requests_sent']}회")
+        for controller in controllers.values():
+            controller.disconnect()
+        api_client.close()
 
 if __name__ == "__main__":
     main()
@@ -5,11 +5,16 @@ ESP8266 연결이 안될 때 노트북 USB를 통한 Supabase 데이터 전송
 """
 
 import serial
-import requests
-import json
-import time
 import sys
-from datetime import datetime
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from farmlink_api import FarmLinkApiClient
+from farmlink_batch import SensorBatchUploader
+from farmlink_clock import BoardClock
+from farmlink_pipeline import (Buffer, HttpWriter, Parser, Pipeline, Sink, Stage, clock_stage, decode, enrich_stage,
+                               output_sink, readline_source)
+from farmlink_serial import wait_until_ready
 
 # 시리얼 포트 설정 (Windows에서는 COM3, COM4 등으로 변경)
 SERIAL_PORT = 'COM7'  # Arduino가 연결된 포트로 변경
@@ -18,6 +23,16 @@ BAUD_RATE = 9600
 # API 서버 설정 (supabase-api를 통해 데이터 전송)
 API_BASE_URL = "http://localhost:3000"
 
+# 배치 전송 설정 (BATCH_SIZE가 0이면 한 건씩 전송)
+BATCH_SIZE = 0
+BATCH_MAX_AGE = 5.0
+
+# 수신한 측정값을 JSON Lines 파일에도 기록하려면 경로 지정 (None이면 사용 안 함, '-'이면 표준 출력)
+OUTPUT_PATH = None
+
+# 모든 API 호출이 공유하는 클라이언트 (keep-alive 연결 풀, 재시도, 서킷 브레이커)
+api_client = FarmLinkApiClient(API_BASE_URL)
+
 def connect_to_arduino():
     """Arduino와 시리얼 연결"""
     try:
@@ -33,8 +48,6 @@ def connect_to_arduino():
             dsrdtr=False
         )
         print(f"Arduino 연결 성공: {SERIAL_PORT}")
-        # 연결 후 잠시 대기
-        time.sleep(2)
         return ser
     except serial.SerialException as e:
         print(f"Arduino 연결 실패: {e}")
@@ -43,90 +56,15 @@ def connect_to_arduino():
         print("Mac/Linux: /dev/ttyUSB0, /dev/ttyACM0, ...")
         return None
 
-def parse_sensor_data(line):
-    """시리얼 데이터에서 센서 값 파싱 (JSON 형태)"""
-    try:
-        # JSON 형태의 데이터인지 확인
-        if line.startswith('{') and line.endswith('}'):
-            data = json.loads(line)
-            print(f"JSON 데이터 파싱 성공: {data}")
-            return data
-        else:
-            # 기존 텍스트 형태의 데이터 처리 (백업)
-            data = {}
-            
-            # 수분량 추출
-            if "수분량:" in line:
-                moisture_start = line.find("수분량:") + 4
-                moisture_end = line.find("%", moisture_start)
-                data['soil_moisture'] = float(line[moisture_start:moisture_end].strip())
-            
-            # 조도 추출
-            if "조도:" in line:
-                light_start = line.find("조도:") + 3
-                light_end = line.find("ph", light_start)
-                data['light_intensity'] = float(line[light_start:light_end].strip())
-            
-            # 온도 추출
-            if "온도:" in line:
-                temp_start = line.find("온도:") + 3
-                temp_end = line.find("°C", temp_start)
-                data['temperature'] = float(line[temp_start:temp_end].strip())
-            
-            # 습도 추출
-            if "습도:" in line:
-                humidity_start = line.find("습도:") + 3
-                humidity_end = line.find("%", humidity_start)
-                data['humidity'] = float(line[humidity_start:humidity_end].strip())
-            
-            return data if len(data) == 4 else None
-            
-    except (ValueError, IndexError, json.JSONDecodeError) as e:
-        print(f"데이터 파싱 오류: {e}")
-        return None
-
-def send_to_api(data):
-    """API 서버를 통해 데이터 전송"""
-    try:
-        # 타임스탬프 처리
-        if 'timestamp' in data:
-            # 아두이노의 millis() 값이면 현재 시간으로 변환
-            if isinstance(data['timestamp'], (int, float)):
-                data['timestamp'] = datetime.now().isoformat()
-        else:
-            # 타임스탬프가 없으면 현재 시간 추가
-            data['timestamp'] = datetime.now().isoformat()
-        
-        # API 서버 호출
-        headers = {
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.post(
-            f"{API_BASE_URL}/api/sensor-data",
-            headers=headers,
-            json=data,
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            if result.get('success'):
-                print(f"✓ API 전송 성공: {data['soil_moisture']}% 수분, {data['temperature']}°C")
-                return True
-            else:
-                print(f"✗ API 전송 실패: {result.get('error', 'Unknown error')}")
-                return False
-        else:
-            print(f"✗ API 서버 오류: {response.status_code} - {response.text}")
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        print(f"✗ 네트워크 오류: {e}")
-        return False
-    except Exception as e:
-        print(f"✗ 예상치 못한 오류: {e}")
-        return False
+def build_pipeline(batch_uploader):
+    """수집 파이프라인: 시리얼 줄 → decode → parse → clock → enrich → API 전송 (+ 파일)
+    읽기는 별도 스레드가 크기 제한 큐(Buffer)로 넘기므로 전송이 느려도 OS 시리얼 버퍼가 넘치지 않음
+    """
+    sinks = [Sink('upload', HttpWriter(api_client, API_BASE_URL, batcher=batch_uploader), [enrich_stage()])]
+    if OUTPUT_PATH:
+        sinks.append(output_sink(OUTPUT_PATH))
+    return Pipeline([Buffer(1000, 'serial'), Stage('decode_text', decode), Stage('parse', Parser()),
+                     clock_stage(BoardClock())], sinks)
 
 def main():
     """메인 실행 함수"""
@@ -138,57 +76,38 @@ def main():
     if not ser:
         sys.exit(1)
     
+    batch_uploader = None
+    if BATCH_SIZE > 0:
+        batch_uploader = SensorBatchUploader(
+            api_base_url=API_BASE_URL,
+            max_batch_size=BATCH_SIZE,
+            max_batch_age=BATCH_MAX_AGE,
+            session=api_client
+        )
+        batch_uploader.start()
+    
+    # 연결 후 고정 시간 대신 보드가 시작 메시지(또는 센서 데이터)를 보낼 때까지만 대기 (최대 3초)
+    ready, received = wait_until_ready(ser)
+    if not ready:
+        print("보드 시작 메시지가 없어 그대로 진행합니다.")
+    
     print("센서 데이터 수집 중... (Ctrl+C로 종료)")
     print("-" * 40)
     
+    pipeline = build_pipeline(batch_uploader).start()
     try:
-        while True:
-            # 시리얼 데이터 읽기
-            if ser.in_waiting > 0:
-                try:
-                    # 바이트 데이터 읽기
-                    raw_data = ser.readline()
-                    if raw_data:
-                        # 여러 인코딩 시도
-                        line = None
-                        for encoding in ['utf-8', 'latin-1', 'cp1252']:
-                            try:
-                                line = raw_data.decode(encoding).strip()
-                                break
-                            except UnicodeDecodeError:
-                                continue
-                        
-                        # 모든 인코딩 실패 시 에러 무시하고 처리
-                        if line is None:
-                            line = raw_data.decode('utf-8', errors='ignore').strip()
-                        
-                        # JSON 데이터 또는 텍스트 데이터 처리
-                        if line and (line.startswith('{') or "수분량:" in line):
-                            print(f"수신된 데이터: {line}")
-                            
-                            # 데이터 파싱
-                            sensor_data = parse_sensor_data(line)
-                            
-                            if sensor_data and len(sensor_data) >= 4:
-                                # API 서버로 전송
-                                if send_to_api(sensor_data):
-                                    print(f"✓ 데이터 전송 완료: {sensor_data}")
-                                else:
-                                    print(f"✗ 데이터 전송 실패: {sensor_data}")
-                            else:
-                                print(f"✗ 데이터 파싱 실패: {line}")
-                
-                except Exception as e:
-                    print(f"시리얼 데이터 읽기 오류: {e}")
-                    continue
-            
-            time.sleep(0.1)  # CPU 사용량 줄이기
-            
+        # 대기 중에 받은 줄부터 처리한 뒤 포트에서 계속 읽음
+        pipeline.run(readline_source(ser, received))
     except KeyboardInterrupt:
         print("\n프로그램을 종료합니다...")
     finally:
+        pipeline.close()
+        if batch_uploader:
+            batch_uploader.stop()
         ser.close()
         print("Arduino 연결이 종료되었습니다.")
+        api_client.print_stats()
+        api_client.close()
 
 if __name__ == "__main__":
     main()
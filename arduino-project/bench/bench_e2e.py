@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Farm Link 수집기 종단 간(end-to-end) 벤치마크
+가상 아두이노(pty)와 API 스텁 서버를 띄우고 FarmLinkController와 backup/usb_data_sender.py를
+별도 프로세스로 실행하여 출력 속도를 높여 가며 다음을 측정 (Linux/macOS 전용)
+- 처리량: API에 도착한 센서 줄 수 / 측정 시간
+- 유실률: 보드가 출력한 줄 중 API에 도착하지 못한 비율
+- 업로드 지연: 보드 출력부터 API 도착까지의 p50/p95/p99 (ms)
+- 읽기 한 건당 CPU 시간 (ms, 측정 구간 동안 수집기 프로세스의 user+sys)
+
+사용법:
+    python bench/bench_e2e.py
+    python bench/bench_e2e.py --targets controller --rates 10,50,100 --duration 20 --controller-args="--batch-size 50"
+    python bench/bench_e2e.py --targets controller --baud 9600 --controller-args="--binary-baud 115200"
+"""
+
+import argparse
+import json
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, BENCH_DIR)
+
+from stub_api import StubApiServer
+from virtual_arduino import VirtualArduino
+
+# usb_data_sender.py는 설정이 모듈 상수이므로 상수를 바꾼 뒤 main() 실행
+USB_SENDER_BOOTSTRAP = (
+    "import sys; sys.path.insert(0, {backup!r}); import usb_data_sender as sender; "
+    "sender.SERIAL_PORT = {port!r}; sender.API_BASE_URL = {api!r}; "
+    "sender.api_client = sender.FarmLinkApiClient({api!r}); sender.main()"
+)
+
+
+def target_command(target, port, api_url, extra_args):
+    """측정 대상 수집기 실행 명령"""
+    if target == 'controller':
+        return [sys.executable, os.path.join(PROJECT_DIR, 'farmlink_controller.py'),
+                '--port', port, '--api-url', api_url, '--sample-interval', '0'] + extra_args
+    bootstrap = USB_SENDER_BOOTSTRAP.format(backup=os.path.join(PROJECT_DIR, 'backup'), port=port, api=api_url)
+    return [sys.executable, '-c', bootstrap]
+
+
+def process_cpu_seconds(pid):
+    """프로세스의 누적 CPU 시간 (user+sys, 초), /proc이 없으면 None"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    # ')' 뒤 필드 기준 utime은 12번째, stime은 13번째 (clock tick 단위)
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_case(target, rate, args, extra_args):
+    """한 수집기를 한 출력 속도로 측정"""
+    stub = StubApiServer().start()
+    # 시작 메시지와 명령 응답(이진 모드 협상 등)은 바로 처리하고, 센서 줄은 측정 구간에만 출력
+    arduino = VirtualArduino(rate=0, jitter=args.jitter, line_format=args.format,
+                             baudrate=args.baud, tag_sequence=True)
+    arduino.start()
+    log = open(os.devnull, 'w') if not args.verbose else None
+    process = subprocess.Popen(target_command(target, arduino.port, stub.url, extra_args),
+                               cwd=PROJECT_DIR, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        # 수집기가 포트를 열고 보드 준비 확인(시작 메시지)을 마칠 때까지 기다린 뒤 출력 시작
+        time.sleep(args.warmup)
+        if process.poll() is not None:
+            raise RuntimeError(f"{target} 프로세스가 시작 직후 종료되었습니다 (코드 {process.returncode})")
+        stub.state.reset()
+        cpu_started = process_cpu_seconds(process.pid)
+        arduino.rate = rate
+        time.sleep(args.duration)
+        arduino.stop()
+        # 배치/재시도 중인 데이터가 도착할 시간을 줌
+        time.sleep(args.drain)
+        cpu_finished = process_cpu_seconds(process.pid)
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        if log:
+            log.close()
+        arduino.close()
+        stub.stop()
+
+    latencies = []
+    received = set()
+    for received_at, reading in stub.state.readings:
+        try:
+            sequence = int(float(reading.get('light_intensity')))
+        except (TypeError, ValueError):
+            continue
+        sent_at = arduino.sent_at.get(sequence)
+        if sent_at is None or sequence in received:
+            continue
+        received.add(sequence)
+        latencies.append((received_at - sent_at) * 1000)
+    latencies.sort()
+
+    emitted = arduino.lines_sent + arduino.lines_dropped
+    cpu = cpu_finished - cpu_started if cpu_started is not None and cpu_finished is not None else None
+    return {
+        'target': target,
+        'rate': rate,
+        'emitted': emitted,
+        'received': len(received),
+        'lines_per_sec': len(received) / args.duration,
+        'drop_rate': 1 - len(received) / emitted if emitted else 0.0,
+        'uart_dropped': arduino.lines_dropped,
+        'latency_p50_ms': percentile(latencies, 0.50),
+        'latency_p95_ms': percentile(latencies, 0.95),
+        'latency_p99_ms': percentile(latencies, 0.99),
+        'cpu_ms_per_reading': cpu / len(received) * 1000 if cpu is not None and received else None,
+        'http_requests': stub.state.requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Farm Link 수집기 종단 간 벤치마크')
+    parser.add_argument('--targets', default='controller,usb_sender',
+                        help='측정 대상 (controller, usb_sender, 쉼표로 구분)')
+    parser.add_argument('--rates', default='1,5,10,20,50,100', help='초당 출력 줄 수 목록 (기본: 1,5,10,20,50,100)')
+    parser.add_argument('--duration', type=float, default=10.0, help='속도별 측정 시간 (초, 기본: 10)')
+    parser.add_argument('--warmup', type=float, default=3.0, help='수집기 시작 후 출력 시작까지 대기 (초)')
+    parser.add_argument('--drain', type=float, default=6.0, help='출력 중지 후 업로드 완료 대기 (초)')
+    parser.add_argument('--format', choices=['text', 'json'], default='text', help='센서 줄 형식')
+    parser.add_argument('--jitter', type=float, default=0.1, help='출력 간격 지터 비율 (기본: 0.1)')
+    parser.add_argument('--baud', type=int, help='가상 보드 출력 속도 제한 (예: 9600)')
+    parser.add_argument('--controller-args', default='', help='farmlink_controller.py에 추가로 넘길 인자')
+    parser.add_argument('--json-output', help='결과를 JSON 파일로 저장')
+    parser.add_argument('--verbose', action='store_true', help='수집기 출력 표시')
+    args = parser.parse_args()
+
+    targets = [target.strip() for target in args.targets.split(',') if target.strip()]
+    rates = [float(rate) for rate in args.rates.split(',') if rate.strip()]
+    print(f"형식: {args.format}, 속도별 {args.duration:.0f}초 측정, 지터 ±{args.jitter * 100:.0f}%")
+    print(f"{'대상':<12}{'출력/초':>8}{'출력':>8}{'도착':>8}{'줄/초':>9}{'유실률':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'CPU ms/건':>11}")
+
+    results = []
+    for target in targets:
+        extra_args = shlex.split(args.controller_args) if target == 'controller' else []
+        for rate in rates:
+            result = run_case(target, rate, args, extra_args)
+            results.append(result)
+            cpu = result['cpu_ms_per_reading']
+            print(f"{target:<12}{rate:>8.0f}{result['emitted']:>8}{result['received']:>8}"
+                  f"{result['lines_per_sec']:>9.1f}{result['drop_rate'] * 100:>8.1f}%"
+                  f"{result['latency_p50_ms']:>9.0f}{result['latency_p95_ms']:>9.0f}{result['latency_p99_ms']:>9.0f}"
+                  f"{cpu if cpu is not None else float('nan'):>11.2f}")
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json_output}")
+
+
+if __name__ == "__main__":
+    main()
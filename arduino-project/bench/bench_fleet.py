@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Farm Link API 서버 장치 수 부하 벤치마크 (fleet load generator)
+수천 개의 가상 장치(device_id)가 실제와 비슷한 측정값을 정해진 주기로 보내는 부하를 만들고,
+장치 수를 단계적으로 늘려 가며 API 서버 한 대가 감당하는 한계를 측정
+- 수집: 장치마다 interval초마다 POST /api/sensor-data (--batch N이면 N건씩 /api/sensor-data/batch)
+- 임계치: 장치마다 threshold-interval초마다 GET /api/threshold-configs/:deviceId/active (ETag 조건부, 304 포함)
+- 단계별 처리량, 오류율, 응답 지연 p50/p95/p99와 예정 시각 기준 지연(클라이언트 대기 포함) 보고
+- 부하는 응답을 기다리지 않고 예정 시각에 보내므로(open loop) 서버가 느려져도 보내는 양이 줄지 않음
+- 각 프로세스는 asyncio 루프 하나와 keep-alive 연결 풀로 담당 장치를 실행 (--processes로 CPU 코어 분산)
+실제 Supabase에 연결된 서버로 실행하면 센서 데이터가 저장되므로 시험용 프로젝트를 사용할 것
+
+사용법:
+    python bench/bench_fleet.py --stub
+    python bench/bench_fleet.py --url http://localhost:3000 --fleet 100,500,1000,2000,5000 --duration 30
+    python bench/bench_fleet.py --url http://localhost:3000 --fleet 1000,5000,10000 --batch 10 --processes 4
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+
+class HttpPool:
+    """표준 라이브러리 asyncio 스트림으로 만든 최소 HTTP/1.1 keep-alive 연결 풀
+    size개 연결까지만 동시에 요청하고, 나머지 요청은 연결이 빌 때까지 기다림
+    """
+
+    def __init__(self, url, size):
+        parsed = urlsplit(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.host_header = parsed.netloc
+        self.slots = asyncio.Semaphore(size)
+        self.idle = []
+        self.connects = 0
+
+    async def request(self, method, path, body=None, headers=None):
+        """(상태 코드, 응답 헤더, 본문, 응답 시간) 반환 (응답 시간은 연결을 얻은 뒤부터, 초)"""
+        async with self.slots:
+            started = time.monotonic()
+            reused = bool(self.idle)
+            conn = self.idle.pop() if reused else await self.open()
+            while True:
+                try:
+                    status, response_headers, payload, keep_alive = await self.exchange(conn, method, path, body,
+                                                                                        headers)
+                    break
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    conn[1].close()
+                    if not reused:
+                        raise
+                    # 쉬는 동안 서버가 닫은 keep-alive 연결이면 새 연결로 한 번 더 시도
+                    reused = False
+                    conn = await self.open()
+                except BaseException:
+                    # 시간 초과 등으로 중간에 멈춘 연결은 응답이 섞이지 않도록 버림
+                    conn[1].close()
+                    raise
+            if keep_alive:
+                self.idle.append(conn)
+            else:
+                conn[1].close()
+            return status, response_headers, payload, time.monotonic() - started
+
+    async def open(self):
+        self.connects += 1
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def exchange(self, conn, method, path, body, headers):
+        reader, writer = conn
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host_header}\r\nConnection: keep-alive\r\n"
+        if body is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        for name, value in (headers or {}).items():
+            head += f"{name}: {value}\r\n"
+        writer.write(head.encode('latin-1') + b"\r\n" + (body or b''))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("서버가 연결을 닫았습니다")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = response_headers.get('connection', '').lower() != 'close'
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            payload = bytearray()
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    # 트레일러 헤더까지 읽고 끝
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                payload += await reader.readexactly(size)
+                await reader.readline()
+        elif 'content-length' in response_headers:
+            payload = await reader.readexactly(int(response_headers['content-length']))
+        elif status in (204, 304) or 100 <= status < 200:
+            payload = b''
+        else:
+            payload = await reader.read()
+            keep_alive = False
+        return status, response_headers, bytes(payload), keep_alive
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = []
+
+
+class VirtualDevice:
+    """가상 장치 하나의 측정값 모델 (장치마다 기준 온습도, 일교차, 토양 건조 속도, 최대 조도가 다름)
+    온도/조도는 하루 주기를 따르고 습도는 온도와 반대로 움직이며, 토양 수분은 서서히 마르다가 급수로 오름
+    """
+
+    def __init__(self, index, prefix, seed):
+        self.device_id = f"{prefix}-{index:05d}"
+        self.rng = random.Random(seed * 1000003 + index)
+        rng = self.rng
+        self.base_temperature = rng.gauss(24.0, 3.0)
+        self.temperature_swing = rng.uniform(2.0, 7.0)
+        self.base_humidity = rng.gauss(60.0, 8.0)
+        self.light_peak = rng.uniform(500.0, 1000.0)
+        self.soil = rng.uniform(40.0, 80.0)
+        self.drying_rate = rng.uniform(0.002, 0.02)
+        # 장치마다 설치 위치(그늘/창가)에 따라 하루 주기가 조금씩 어긋남 (시간)
+        self.phase = rng.uniform(-1.0, 1.0)
+        # 임계치 설정의 마지막 ETag (304 응답으로 본문 없이 확인)
+        self.etag = None
+
+    def reading(self, now):
+        rng = self.rng
+        local = time.localtime(now)
+        hour = (local.tm_hour + local.tm_min / 60 + self.phase) % 24
+        sun = max(0.0, math.sin(math.pi * (hour - 6) / 12))
+        temperature = (self.base_temperature + self.temperature_swing * math.sin(2 * math.pi * (hour - 9) / 24)
+                       + rng.gauss(0, 0.3))
+        humidity = self.base_humidity - 1.5 * (temperature - self.base_temperature) + rng.gauss(0, 1.5)
+        light = self.light_peak * sun * rng.uniform(0.6, 1.0) + rng.gauss(0, 5)
+        self.soil -= self.drying_rate * (1 + sun)
+        if self.soil < 30 and rng.random() < 0.2:
+            self.soil += rng.uniform(25.0, 40.0)
+        return {
+            'device_id': self.device_id,
+            'soil_moisture': round(min(max(self.soil + rng.gauss(0, 0.5), 0.0), 100.0), 1),
+            'light_intensity': round(min(max(light, 0.0), 1023.0)),
+            'temperature': round(temperature, 2),
+            'humidity': round(min(max(humidity, 5.0), 99.0), 2),
+            'timestamp': datetime.fromtimestamp(now).astimezone().isoformat(),
+        }
+
+
+class EndpointStats:
+    """엔드포인트 하나의 요청 결과 (측정 구간에 예정된 요청만 집계)"""
+
+    def __init__(self):
+        self.sent = 0
+        self.ok = 0
+        self.not_modified = 0
+        self.errors = {}
+        # 응답 지연 (보낸 시각 기준)과 예정 시각 기준 지연 (연결 풀 대기 포함), 초
+        self.latencies = array('d')
+        self.delays = array('d')
+
+    def to_dict(self):
+        return {
+            'sent': self.sent,
+            'ok': self.ok,
+            'not_modified': self.not_modified,
+            'errors': self.errors,
+            'latencies': self.latencies.tolist(),
+            'delays': self.delays.tolist(),
+        }
+
+
+class FleetRunner:
+    """한 프로세스에서 담당 장치들의 수집/임계치 요청을 예정 시각마다 보냄"""
+
+    def __init__(self, options, indexes, start_wall):
+        self.options = options
+        self.devices = [VirtualDevice(index, options['prefix'], options['seed']) for index in indexes]
+        self.start_wall = start_wall
+        self.stats = {'ingest': EndpointStats(), 'threshold': EndpointStats()}
+        self.tasks = set()
+
+    async def run(self):
+        options = self.options
+        self.pool = HttpPool(options['url'], options['connections'])
+        # 모든 프로세스가 같은 벽시계 시각에 시작하고, 그 뒤로는 monotonic 시계로 예정 시각 계산
+        self.start = time.monotonic() + max(self.start_wall - time.time(), 0)
+        self.measure_from = self.start + options['warmup']
+        self.stop = self.measure_from + options['duration']
+        loops = [self.ingest_loop(device) for device in self.devices]
+        if options['threshold_interval']:
+            loops += [self.threshold_loop(device) for device in self.devices]
+        await asyncio.gather(*loops)
+        # 측정 구간이 끝난 뒤 아직 응답을 기다리는 요청까지 정리
+        if self.tasks:
+            await asyncio.wait(self.tasks, timeout=options['timeout'])
+        self.pool.close()
+        return {name: stats.to_dict() for name, stats in self.stats.items()}
+
+    def next_time(self, scheduled, interval, rng):
+        return scheduled + interval * (1 + rng.uniform(-self.options['jitter'], self.options['jitter']))
+
+    async def ingest_loop(self, device):
+        options = self.options
+        batch_size = options['batch']
+        # 첫 전송은 주기 안에서 고르게 분산 (모든 장치가 같은 순간에 보내지 않도록)
+        scheduled = self.start + device.rng.uniform(0, options['interval'])
+        pending = []
+        while scheduled < self.stop:
+            await asyncio.sleep(max(scheduled - time.monotonic(), 0))
+            pending.append(device.reading(time.time()))
+            if len(pending) >= max(batch_size, 1):
+                if batch_size:
+                    path, body = '/api/sensor-data/batch', {'readings': pending}
+                else:
+                    path, body = '/api/sensor-data', pending[0]
+                pending = []
+                self.submit('ingest', scheduled, self.pool.request('POST', path, json.dumps(body).encode()))
+            scheduled = self.next_time(scheduled, options['interval'], device.rng)
+
+    async def threshold_loop(self, device):
+        interval = self.options['threshold_interval']
+        scheduled = self.start + device.rng.uniform(0, interval)
+        path = f"/api/threshold-configs/{device.device_id}/active"
+        while scheduled < self.stop:
+            await asyncio.sleep(max(scheduled - time.monotonic(), 0))
+            headers = {'If-None-Match': device.etag} if device.etag else None
+            self.submit('threshold', scheduled, self.pool.request('GET', path, headers=headers), device)
+            scheduled = self.next_time(scheduled, interval, device.rng)
+
+    def submit(self, name, scheduled, request, device=None):
+        """응답을 기다리지 않고 요청을 보냄 (서버가 느려져도 부하가 줄지 않음)"""
+        task = asyncio.ensure_future(self.timed(name, scheduled, request, device))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def timed(self, name, scheduled, request, device):
+        measured = scheduled >= self.measure_from
+        stats = self.stats[name]
+        if measured:
+            stats.sent += 1
+        try:
+            status, headers, _, elapsed = await asyncio.wait_for(request, timeout=self.options['timeout'])
+        except asyncio.TimeoutError:
+            error = 'timeout'
+        except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+            error = type(e).__name__
+        else:
+            error = None if status in (200, 304) else f"HTTP {status}"
+            if device is not None and status in (200, 304):
+                device.etag = headers.get('etag', device.etag)
+        if not measured:
+            return
+        if error:
+            stats.errors[error] = stats.errors.get(error, 0) + 1
+            return
+        finished = time.monotonic()
+        stats.ok += 1
+        if status == 304:
+            stats.not_modified += 1
+        stats.latencies.append(elapsed)
+        stats.delays.append(finished - scheduled)
+
+
+def run_fleet(options, indexes, start_wall):
+    """프로세스 하나가 담당하는 장치 실행 (ProcessPoolExecutor에서 호출)"""
+    return asyncio.run(FleetRunner(options, indexes, start_wall).run())
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def merge_results(results):
+    """프로세스별 결과를 엔드포인트별로 합침"""
+    merged = {}
+    for result in results:
+        for name, stats in result.items():
+            total = merged.setdefault(name, {'sent': 0, 'ok': 0, 'not_modified': 0, 'errors': {},
+                                             'latencies': [], 'delays': []})
+            for key in ('sent', 'ok', 'not_modified'):
+                total[key] += stats[key]
+            for error, count in stats['errors'].items():
+                total['errors'][error] = total['errors'].get(error, 0) + count
+            total['latencies'].extend(stats['latencies'])
+            total['delays'].extend(stats['delays'])
+    return merged
+
+
+def summarize(stats, duration):
+    latencies = sorted(stats['latencies'])
+    delays = sorted(stats['delays'])
+    errors = sum(stats['errors'].values())
+    return {
+        'sent': stats['sent'],
+        'ok': stats['ok'],
+        'not_modified': stats['not_modified'],
+        'errors': stats['errors'],
+        'throughput': stats['ok'] / duration,
+        'error_rate': errors / stats['sent'] if stats['sent'] else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+        'scheduled_p99_ms': percentile(delays, 0.99) * 1000,
+    }
+
+
+def run_step(args, options, fleet_size, executor):
+    """장치 fleet_size개로 한 단계 실행 (장치는 프로세스마다 고르게 나눔)"""
+    processes = min(args.processes, fleet_size)
+    slices = [range(index, fleet_size, processes) for index in range(processes)]
+    # 프로세스 시작 시간을 감안해 모두 같은 시각에 시작
+    start_wall = time.time() + (1.0 if executor else 0.1)
+    if executor:
+        futures = [executor.submit(run_fleet, options, list(indexes), start_wall) for indexes in slices]
+        results = [future.result() for future in futures]
+    else:
+        results = [run_fleet(options, list(slices[0]), start_wall)]
+    merged = merge_results(results)
+    return {name: summarize(stats, args.duration) for name, stats in merged.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Farm Link API 서버 장치 수 부하 벤치마크')
+    parser.add_argument('--url', default='http://localhost:3000', help='API 서버 주소 (기본: http://localhost:3000)')
+    parser.add_argument('--stub', action='store_true', help='API 스텁 서버를 띄워 실행 (도구 동작 확인용)')
+    parser.add_argument('--fleet', default='100,500,1000,2000,5000',
+                        help='단계별 가상 장치 수 목록 (기본: 100,500,1000,2000,5000)')
+    parser.add_argument('--interval', type=float, default=5.0, help='장치별 측정값 주기 (초, 기본: 5)')
+    parser.add_argument('--threshold-interval', type=float, default=7.0,
+                        help='장치별 임계치 조회 주기 (초, 기본: 7, 0이면 조회 안 함)')
+    parser.add_argument('--batch', type=int, default=0,
+                        help='측정값 N건씩 배치 엔드포인트로 전송 (기본: 0, 한 건씩)')
+    parser.add_argument('--jitter', type=float, default=0.1, help='주기 지터 비율 (기본: 0.1)')
+    parser.add_argument('--duration', type=float, default=30.0, help='단계별 측정 시간 (초, 기본: 30)')
+    parser.add_argument('--warmup', type=float, default=5.0, help='단계 시작 후 집계에서 제외할 시간 (초, 기본: 5)')
+    parser.add_argument('--processes', type=int, default=1, help='부하 생성 프로세스 수 (기본: 1)')
+    parser.add_argument('--connections', type=int, default=64, help='프로세스별 keep-alive 연결 수 (기본: 64)')
+    parser.add_argument('--timeout', type=float, default=10.0, help='요청 시간 초과 (초, 기본: 10)')
+    parser.add_argument('--max-p99', type=float, default=500.0,
+                        help='수집 p99 지연 한도 (ms, 넘으면 다음 단계로 늘리지 않음, 기본: 500)')
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help='오류율 한도 (기본: 0.01)')
+    parser.add_argument('--prefix', default='fleet', help='가상 장치 ID 접두사 (기본: fleet)')
+    parser.add_argument('--seed', type=int, default=1, help='측정값 난수 시드 (기본: 1)')
+    parser.add_argument('--json-output', help='결과를 JSON 파일로 저장')
+
+    args = parser.parse_args()
+
+    stub = None
+    if args.stub:
+        from stub_api import StubApiServer
+        stub = StubApiServer().start()
+        args.url = stub.url
+
+    options = {
+        'url': args.url,
+        'interval': args.interval,
+        'threshold_interval': args.threshold_interval,
+        'batch': args.batch,
+        'jitter': args.jitter,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'connections': max(math.ceil(args.connections / args.processes), 1),
+        'timeout': args.timeout,
+        'prefix': args.prefix,
+        'seed': args.seed,
+    }
+    fleet_sizes = [int(size) for size in args.fleet.split(',')]
+    executor = ProcessPoolExecutor(max_workers=args.processes) if args.processes > 1 else None
+
+    mode = f"배치 {args.batch}건" if args.batch else "한 건씩"
+    print(f"대상: {args.url}, 측정값 {args.interval}초 주기 ({mode}), 임계치 {args.threshold_interval}초 주기, "
+          f"단계별 {args.duration}초 측정, 프로세스 {args.processes}개 × 연결 {options['connections']}개")
+    print(f"{'장치':>7}{'목표 req/s':>12}{'처리 req/s':>12}{'오류율':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'최대 ms':>9}{'예정 p99':>10}{'임계치 p99':>12}")
+    results = []
+    supported = 0
+    try:
+        for fleet_size in fleet_sizes:
+            step = run_step(args, options, fleet_size, executor)
+            ingest = step['ingest']
+            threshold = step.get('threshold')
+            offered = fleet_size / args.interval / max(args.batch, 1)
+            if args.threshold_interval:
+                offered += fleet_size / args.threshold_interval
+            handled = ingest['throughput'] + (threshold['throughput'] if threshold else 0.0)
+            sent = ingest['sent'] + (threshold['sent'] if threshold else 0)
+            errors = sum(ingest['errors'].values()) + (sum(threshold['errors'].values()) if threshold else 0)
+            error_rate = errors / sent if sent else 0.0
+            print(f"{fleet_size:>7}{offered:>12.1f}{handled:>12.1f}{error_rate:>9.2%}{ingest['p50_ms']:>9.1f}"
+                  f"{ingest['p95_ms']:>9.1f}{ingest['p99_ms']:>9.1f}{ingest['max_ms']:>9.0f}"
+                  f"{ingest['scheduled_p99_ms']:>10.1f}{threshold['p99_ms'] if threshold else 0.0:>12.1f}")
+            for name, stats in step.items():
+                if stats['errors']:
+                    details = ', '.join(f"{error} {count}건" for error, count in stats['errors'].items())
+                    print(f"        ⚠️ {name} 오류: {details}")
+            if ingest['scheduled_p99_ms'] > args.max_p99 >= ingest['p99_ms']:
+                # 서버 응답은 빠른데 예정 시각보다 늦게 보냄: 연결 풀 대기나 부하 생성 프로세스의 CPU 한계
+                print("        ⚠️ 예정 시각 기준 지연이 큼: --connections 또는 --processes를 늘려 다시 측정하세요")
+            results.append({'devices': fleet_size, 'offered_rps': offered, 'handled_rps': handled,
+                            'error_rate': error_rate, 'endpoints': step})
+            if ingest['p99_ms'] > args.max_p99 or error_rate > args.max_error_rate:
+                print(f"🛑 장치 {fleet_size}개에서 한도 초과 (p99 {ingest['p99_ms']:.0f}ms / 오류율 {error_rate:.2%}), "
+                      f"단계 증가 중지")
+                break
+            supported = fleet_size
+    except KeyboardInterrupt:
+        print("\n측정을 중단합니다...")
+    finally:
+        if executor:
+            executor.shutdown()
+        if stub:
+            stub.stop()
+
+    print(f"✅ 한도(p99 ≤ {args.max_p99:.0f}ms, 오류율 ≤ {args.max_error_rate:.0%}) 안에서 처리한 최대 장치 수: "
+          f"{supported or '없음'}")
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump({'supported_devices': supported, 'steps': results}, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json_output}")
+
+
+if __name__ == "__main__":
+    main()
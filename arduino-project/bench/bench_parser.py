@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Farm Link 파서 마이크로 벤치마크
+기록된 시리얼 줄 코퍼스(bench/corpus/*.txt)로 기존 방식(다중 디코딩 + find 파싱)과
+farmlink_parser의 단일 패스 파서를 비교하여 코어당 초당 처리 줄 수를 측정
+
+사용법:
+    python bench/bench_parser.py
+    python bench/bench_parser.py --repeat 50 --json-backend json
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import farmlink_parser
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+
+def legacy_decode(raw_data):
+    """기존 수집 루프의 디코딩 (여러 인코딩 시도)"""
+    for encoding in ['utf-8', 'latin-1', 'cp1252']:
+        try:
+            return raw_data.decode(encoding).strip()
+        except UnicodeDecodeError:
+            continue
+    return raw_data.decode('utf-8', errors='ignore').strip()
+
+
+def legacy_parse(line):
+    """기존 parse_sensor_data (출력 제외)"""
+    try:
+        if line.startswith('{') and line.endswith('}'):
+            return json.loads(line)
+        data = {}
+        if "수분량:" in line:
+            start = line.find("수분량:") + 4
+            data['soil_moisture'] = float(line[start:line.find("%", start)].strip())
+        if "조도:" in line:
+            start = line.find("조도:") + 3
+            data['light_intensity'] = float(line[start:line.find("ph", start)].strip())
+        if "온도:" in line:
+            start = line.find("온도:") + 3
+            data['temperature'] = float(line[start:line.find("°C", start)].strip())
+        if "습도:" in line:
+            start = line.find("습도:") + 3
+            data['humidity'] = float(line[start:line.find("%", start)].strip())
+        return data if len(data) == 4 else None
+    except (ValueError, IndexError):
+        return None
+
+
+def run_legacy(lines):
+    parsed = 0
+    for raw_data in lines:
+        line = legacy_decode(raw_data)
+        if line and (line.startswith('{') or "수분량:" in line):
+            if legacy_parse(line):
+                parsed += 1
+    return parsed
+
+
+def run_parser(lines):
+    parsed = 0
+    looks_like_sensor_line = farmlink_parser.looks_like_sensor_line
+    parse_line = farmlink_parser.parse_line
+    for raw_data in lines:
+        # 컨트롤러와 같은 순서: 먼저 파싱하고, 실패한 줄만 센서 형식인지 확인
+        if parse_line(raw_data):
+            parsed += 1
+        else:
+            looks_like_sensor_line(raw_data)
+    return parsed
+
+
+def measure(function, lines, rounds):
+    """가장 빠른 회차 기준 초당 줄 수 (다른 프로세스 간섭을 줄이기 위해 최소 시간 사용)"""
+    best = float('inf')
+    parsed = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        parsed = function(lines)
+        best = min(best, time.perf_counter() - started)
+    return len(lines) / best, parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Farm Link 파서 벤치마크')
+    parser.add_argument('--corpus', nargs='*', help='코퍼스 파일 (기본: bench/corpus/*.txt)')
+    parser.add_argument('--repeat', type=int, default=20, help='코퍼스 반복 횟수 (기본: 20)')
+    parser.add_argument('--rounds', type=int, default=5, help='측정 회차 (기본: 5)')
+    parser.add_argument('--json-backend', choices=['auto', 'json'], default='auto',
+                        help='JSON 백엔드 (auto: orjson 설치 시 사용)')
+    args = parser.parse_args()
+
+    if args.json_backend == 'json':
+        farmlink_parser.json_loads = lambda raw: json.loads(raw.decode('utf-8'))
+        farmlink_parser.JSON_BACKEND = 'json'
+
+    paths = args.corpus or sorted(glob.glob(os.path.join(CORPUS_DIR, '*.txt')))
+    print(f"JSON 백엔드: {farmlink_parser.JSON_BACKEND}, 반복 {args.repeat}회, 측정 {args.rounds}회")
+    print(f"{'코퍼스':<24}{'줄 수':>8}{'기존 (줄/초)':>16}{'파서 (줄/초)':>16}{'배율':>8}{'파싱 (기존/파서)':>20}")
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            lines = f.read().splitlines(keepends=True) * args.repeat
+        legacy_rate, legacy_parsed = measure(run_legacy, lines, args.rounds)
+        parser_rate, parser_parsed = measure(run_parser, lines, args.rounds)
+        print(f"{os.path.basename(path):<24}{len(lines):>8}{legacy_rate:>16,.0f}{parser_rate:>16,.0f}"
+              f"{parser_rate / legacy_rate:>7.1f}x{f'{legacy_parsed}/{parser_parsed}':>20}")
+
+
+if __name__ == "__main__":
+    main()
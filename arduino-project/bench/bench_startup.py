@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Farm Link 수집기 시작 시간(cold start) 벤치마크
+가상 아두이노(pty, 부팅 지연 흉내)와 API 스텁 서버를 띄우고 farmlink_controller.py를 반복 실행하여 다음을 측정
+- 모듈 로드: python -c "import farmlink_controller" 소요 시간
+- 보드 준비: 프로세스 실행부터 "보드 준비 완료" 출력까지 (시작 메시지 대기 포함)
+- 수집 시작: 프로세스 실행부터 "데이터 수집이 시작되었습니다" 출력까지
+- 첫 업로드: 프로세스 실행부터 첫 센서 데이터가 API에 도착할 때까지
+
+사용법:
+    python bench/bench_startup.py
+    python bench/bench_startup.py --runs 20 --boot-delay 1.6 --rate 2
+"""
+
+import argparse
+import json
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, BENCH_DIR)
+
+from stub_api import StubApiServer
+from virtual_arduino import VirtualArduino
+
+# 수집기 출력에서 찾을 단계별 표시
+MARKERS = {
+    'ready': '보드 준비 완료',
+    'collecting': '데이터 수집이 시작되었습니다',
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure_import(runs):
+    """수집기 모듈을 불러오는 데 걸리는 시간 (새 인터프리터 기준, 인터프리터 시작 시간 제외)"""
+    code = "import time; t = time.perf_counter(); import farmlink_controller; print(time.perf_counter() - t)"
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_DIR, capture_output=True,
+                                text=True, check=True).stdout
+        samples.append(float(output.strip().splitlines()[-1]) * 1000)
+    return sorted(samples)
+
+
+def run_once(args, extra_args):
+    """수집기를 한 번 실행하여 단계별 도달 시간(ms) 측정"""
+    stub = StubApiServer().start()
+    arduino = VirtualArduino(rate=args.rate, boot_delay=args.boot_delay)
+    command = [sys.executable, os.path.join(PROJECT_DIR, 'farmlink_controller.py'),
+               '--port', arduino.port, '--api-url', stub.url, '--sample-interval', '0'] + extra_args
+    timings = {}
+    launched = time.monotonic()
+    # 스텁 서버는 도착 시각을 time.time()으로 기록
+    launched_wall = time.time()
+    # 실제 보드처럼 수집기 실행과 동시에 부팅 시작
+    arduino.start()
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, env=dict(os.environ, PYTHONUNBUFFERED='1'))
+
+    def read_output():
+        for line in process.stdout:
+            if args.verbose:
+                print(f"    | {line.rstrip()}")
+            for name, marker in MARKERS.items():
+                if name not in timings and marker in line:
+                    timings[name] = (time.monotonic() - launched) * 1000
+
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+    try:
+        deadline = launched + args.timeout
+        while not stub.state.readings and time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"수집기 프로세스가 시작 직후 종료되었습니다 (코드 {process.returncode})")
+            time.sleep(0.005)
+        if stub.state.readings:
+            timings['first_upload'] = (stub.state.readings[0][0] - launched_wall) * 1000
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        reader.join(timeout=1)
+        arduino.close()
+        stub.stop()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Farm Link 수집기 시작 시간 벤치마크')
+    parser.add_argument('--runs', type=int, default=10, help='반복 실행 횟수 (기본: 10)')
+    parser.add_argument('--boot-delay', type=float, default=0.5,
+                        help='가상 보드의 시작 메시지 전 부팅 시간 (초, 기본: 0.5)')
+    parser.add_argument('--rate', type=float, default=1.0, help='초당 센서 줄 수 (기본: 1)')
+    parser.add_argument('--timeout', type=float, default=15.0, help='한 번 실행의 첫 업로드 대기 한도 (초)')
+    parser.add_argument('--controller-args', default='', help='farmlink_controller.py에 추가로 넘길 인자')
+    parser.add_argument('--json-output', help='결과를 JSON 파일로 저장')
+    parser.add_argument('--verbose', action='store_true', help='수집기 출력 표시')
+
+    args = parser.parse_args()
+
+    extra_args = shlex.split(args.controller_args)
+    print(f"가상 보드 부팅 {args.boot_delay}초, 센서 {args.rate}줄/초, {args.runs}회 실행")
+    samples = {'import': measure_import(args.runs)}
+    for index in range(args.runs):
+        timings = run_once(args, extra_args)
+        for name, value in timings.items():
+            samples.setdefault(name, []).append(value)
+        missing = [name for name in list(MARKERS) + ['first_upload'] if name not in timings]
+        if missing:
+            print(f"⚠️ {index + 1}번째 실행에서 도달하지 못한 단계: {', '.join(missing)}")
+
+    labels = {'import': '모듈 로드', 'ready': '보드 준비', 'collecting': '수집 시작', 'first_upload': '첫 업로드'}
+    print(f"{'단계':<12}{'횟수':>6}{'p50 ms':>10}{'p90 ms':>10}{'최대 ms':>10}")
+    results = {}
+    for name, label in labels.items():
+        values = sorted(samples.get(name, []))
+        results[name] = {
+            'count': len(values),
+            'p50_ms': percentile(values, 0.50),
+            'p90_ms': percentile(values, 0.90),
+            'max_ms': values[-1] if values else 0.0,
+        }
+        result = results[name]
+        print(f"{label:<12}{result['count']:>6}{result['p50_ms']:>10.0f}{result['p90_ms']:>10.0f}{result['max_ms']:>10.0f}")
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Farm Link 로컬 시계열 저장소 벤치마크
+임시 디렉터리에 장치 하나의 N주 분량 합성 데이터(1초 간격)를 기록한 뒤
+최근 1시간 조회, 전체 기간 집계, 1시간 구간 집계의 소요 시간과 초당 스캔 레코드 수를 측정
+
+사용법:
+    python bench/bench_store.py
+    python bench/bench_store.py --weeks 4 --interval 1
+"""
+
+import argparse
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from farmlink_store import TimeSeriesStore
+
+DEVICE_ID = 'bench-001'
+
+
+def fill(store, weeks, interval, now):
+    """합성 데이터 기록 (하루 주기로 변하는 센서 값)"""
+    count = int(weeks * 7 * 86400 / interval)
+    start = now - count * interval
+    for index in range(count):
+        timestamp = start + index * interval
+        phase = math.sin(timestamp / 86400 * 2 * math.pi)
+        store.append(DEVICE_ID, timestamp, {
+            'soil_moisture': 50 + 20 * phase,
+            'light_intensity': 500 + 400 * phase,
+            'temperature': 24 + 6 * phase,
+            'humidity': 60 - 15 * phase,
+        })
+    store.flush()
+    return count
+
+
+def measure(name, func, records):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    rate = records / elapsed if elapsed else 0.0
+    print(f"  {name:<22} {elapsed * 1000:9.1f}ms  {rate / 1e6:6.1f}M 레코드/초  결과 {len(result)}행")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Farm Link 로컬 시계열 저장소 벤치마크')
+    parser.add_argument('--weeks', type=float, default=2, help='합성 데이터 기간 (주, 기본: 2)')
+    parser.add_argument('--interval', type=float, default=1.0, help='측정 간격 (초, 기본: 1)')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='farmlink_tsdb_')
+    try:
+        store = TimeSeriesStore(root, retention_days=0)
+        now = time.time()
+        started = time.perf_counter()
+        count = fill(store, args.weeks, args.interval, now)
+        elapsed = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(root, DEVICE_ID, name))
+                   for name in os.listdir(os.path.join(root, DEVICE_ID)))
+        print(f"📝 기록: {count}건, {elapsed:.1f}초 ({count / elapsed:.0f}건/초), {size / 1e6:.1f}MB")
+
+        begin = now - args.weeks * 7 * 86400
+        print("📊 조회:")
+        measure('최근 1시간 (last)', lambda: store.last(DEVICE_ID, hours=1, now=now), 3600 / args.interval)
+        measure('전체 기간 집계', lambda: store.aggregate(DEVICE_ID, begin, now + 1), count)
+        measure('1시간 구간 집계', lambda: store.aggregate(DEVICE_ID, begin, now + 1, bucket=3600), count)
+        measure('1일 구간 집계', lambda: store.aggregate(DEVICE_ID, begin, now + 1, bucket=86400), count)
+        store.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Farm Link 업로드 경로 점검
+API 스텁 서버를 띄우고 UploadPipeline(메모리 배치, 디스크 큐)에 넣은 측정값이 실제로 API에 도착하는지 확인
+(빈 디스크 큐가 거짓으로 평가되어 메모리 버퍼로 새는 회귀 방지)
+
+사용법:
+    python bench/check_upload.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+from stub_api import StubApiServer
+from farmlink_queue import UploadPipeline
+
+READING = {'soil_moisture': 45.0, 'light_intensity': 60.0, 'temperature': 24.5, 'humidity': 55.0}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+def check_pipeline(name, stub, **options):
+    """측정값 한 건을 업로드 경로에 넣고 스텁에 도착하는지 확인 (성공이면 True)"""
+    stub.state.reset()
+    pipeline = UploadPipeline(api_base_url=stub.url, **options)
+    pipeline.start()
+    try:
+        pipeline.add(dict(READING, device_id=name))
+        arrived = wait_for(lambda: any(reading.get('device_id') == name for _, reading in stub.state.readings))
+    finally:
+        pipeline.stop()
+        stats = pipeline.get_stats()
+        pipeline.close()
+    print(f"{'✅' if arrived else '❌'} {name}: 도착 {len(stub.state.readings)}건, "
+          f"메모리 버퍼 {stats['rows_buffered']}건, 큐 {stats.get('queued', '-')}")
+    return arrived and stats['rows_buffered'] == 0
+
+
+def main():
+    stub = StubApiServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            results = [
+                check_pipeline('memory', stub),
+                check_pipeline('memory-batch', stub, batch_size=10, batch_age=0.2),
+                check_pipeline('queue', stub, queue_path=os.path.join(directory, 'queue.db')),
+            ]
+    finally:
+        stub.stop()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Farm Link API 스텁 서버
+supabase-api의 수집 관련 엔드포인트를 같은 응답 형식으로 흉내 내는 로컬 HTTP 서버
+(센서 데이터 단건/배치/keyset 페이지 조회, 집계, 제어 로그, 활성 임계치 설정 ETag/304)
+받은 센서 데이터를 메모리에 기록하여 벤치마크에서 유실/지연 측정에 사용
+
+사용법:
+    python bench/stub_api.py --port 3000
+    python bench/stub_api.py --port 3000 --seed 500000 --seed-interval 5   # 내보내기 테스트용 이력
+"""
+
+import argparse
+import bisect
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+ACTIVE_CONFIG_PATH = re.compile(r'^/api/threshold-configs/([^/]+)/active$')
+
+
+class StubState:
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        # latency: 응답 전 인위적 지연 (초), failure_rate: 503으로 응답할 비율
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.lock = threading.Lock()
+        # (도착 시각, 센서 데이터) 목록
+        self.readings = []
+        self.rollups = []
+        self.control_logs = []
+        self.requests = 0
+        self.failures = 0
+        self.threshold_config = {
+            'id': 1,
+            'config_name': '기본 설정',
+            'soil_moisture_threshold': 20.0,
+            'light_intensity_threshold': 60.0,
+            'temperature_threshold': 30.0,
+            'humidity_threshold': 70.0,
+            'is_active': True,
+            'updated_at': '2024-01-01T00:00:00Z',
+        }
+        self.threshold_version = 1
+        # GET /api/sensor-data용 (timestamp, id) 정렬 행 (받은 건수가 바뀌면 다시 만듦)
+        self.sorted_rows = []
+        self.sorted_keys = []
+        self.sorted_count = 0
+
+    def record_readings(self, readings):
+        received_at = time.time()
+        with self.lock:
+            self.readings.extend((received_at, reading) for reading in readings)
+
+    def seed_readings(self, count, interval=5.0, device_ids=('farmlink-001',)):
+        """현재 시각까지 interval초 간격의 합성 이력 기록 (장치마다 count건)"""
+        now = time.time()
+        readings = []
+        for device_id in device_ids:
+            for index in range(count):
+                timestamp = now - (count - index) * interval
+                phase = math.sin(timestamp / 86400 * 2 * math.pi)
+                readings.append((timestamp, {
+                    'device_id': device_id,
+                    'soil_moisture': round(50 + 20 * phase, 2),
+                    'light_intensity': round(500 + 400 * phase, 2),
+                    'temperature': round(24 + 6 * phase, 2),
+                    'humidity': round(60 - 15 * phase, 2),
+                    'timestamp': datetime.fromtimestamp(timestamp, timezone.utc).isoformat(),
+                }))
+        with self.lock:
+            self.readings.extend(readings)
+
+    def sensor_rows(self):
+        """받은 센서 데이터를 sensor_data 행 형식으로 (timestamp, id) 정렬"""
+        with self.lock:
+            if self.sorted_count != len(self.readings):
+                rows = []
+                for index, (received_at, reading) in enumerate(self.readings):
+                    timestamp = reading.get('timestamp')
+                    epoch = parse_time(timestamp) if isinstance(timestamp, str) else received_at
+                    rows.append((epoch, index + 1, dict(
+                        reading, id=index + 1,
+                        device_id=reading.get('device_id', 'farmlink-001'),
+                        timestamp=datetime.fromtimestamp(epoch, timezone.utc).isoformat(),
+                        created_at=datetime.fromtimestamp(received_at, timezone.utc).isoformat(),
+                    )))
+                rows.sort(key=lambda row: (row[0], row[1]))
+                self.sorted_rows = rows
+                self.sorted_keys = [(row[0], row[1]) for row in rows]
+                self.sorted_count = len(self.readings)
+            return self.sorted_rows, self.sorted_keys
+
+    def set_threshold_config(self, **values):
+        """임계치 설정 변경 (ETag가 바뀌어 다음 조회에서 200 응답)"""
+        with self.lock:
+            self.threshold_config.update(values)
+            self.threshold_version += 1
+
+    def reset(self):
+        with self.lock:
+            self.readings = []
+            self.sorted_count = 0
+            self.rollups = []
+            self.control_logs = []
+            self.requests = 0
+            self.failures = 0
+
+
+def parse_time(value):
+    """ISO 8601 문자열을 epoch 초로 변환 (시간대가 없으면 로컬 시각)"""
+    return datetime.fromisoformat(value).timestamp()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 헤더와 본문을 따로 쓰므로 Nagle 지연(수십 ms)을 끔
+    disable_nagle_algorithm = True
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def begin(self):
+        """공통 처리: 요청 수 기록, 인위적 지연과 장애 주입 (장애이면 True)"""
+        state = self.state
+        with state.lock:
+            state.requests += 1
+        if state.latency:
+            time.sleep(state.latency)
+        if state.failure_rate and random.random() < state.failure_rate:
+            with state.lock:
+                state.failures += 1
+            self.send_json(503, {'success': False, 'error': '스텁 장애 주입'})
+            return True
+        return False
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if self.begin():
+            return
+        if path == '/health':
+            self.send_json(200, {'status': 'OK', 'service': 'Farm Link API (stub)'})
+            return
+        match = ACTIVE_CONFIG_PATH.match(path)
+        if match:
+            with self.state.lock:
+                config = dict(self.state.threshold_config, device_id=match.group(1))
+                etag = f'W/"{config["id"]}-{self.state.threshold_version}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_json(200, {'success': True, 'data': config}, headers={'ETag': etag})
+            return
+        if path == '/api/sensor-data':
+            self.send_sensor_data(parse_qs(self.path.split('?', 1)[1]) if '?' in self.path else {})
+            return
+        self.send_json(404, {'success': False, 'error': '요청한 엔드포인트를 찾을 수 없습니다.'})
+
+    def send_sensor_data(self, query):
+        """GET /api/sensor-data (서버와 같은 keyset 페이지 조회 규칙)"""
+        params = {name: values[0] for name, values in query.items()}
+        keyset = params.get('order') == 'asc'
+        limit = int(params.get('limit', 100))
+        if keyset:
+            limit = min(limit, 1000)
+        rows, keys = self.state.sensor_rows()
+
+        start = 0
+        if params.get('start_date'):
+            start = bisect.bisect_left(keys, (parse_time(params['start_date']), 0))
+        if keyset and params.get('after_timestamp') and params.get('after_id'):
+            cursor = (parse_time(params['after_timestamp']), int(params['after_id']))
+            start = max(start, bisect.bisect_right(keys, cursor))
+        end = len(rows)
+        if params.get('end_before'):
+            end = bisect.bisect_left(keys, (parse_time(params['end_before']), 0))
+        if params.get('end_date'):
+            end = min(end, bisect.bisect_right(keys, (parse_time(params['end_date']), math.inf)))
+
+        device_id = params.get('device_id')
+        candidates = rows[start:end] if keyset else reversed(rows[start:end])
+        data = []
+        for _, _, row in candidates:
+            if device_id and row['device_id'] != device_id:
+                continue
+            data.append(row)
+            if len(data) >= limit:
+                break
+        next_cursor = None
+        if keyset and len(data) == limit:
+            next_cursor = {'after_timestamp': data[-1]['timestamp'], 'after_id': data[-1]['id']}
+        self.send_json(200, {'success': True, 'data': data, 'count': len(data), 'next_cursor': next_cursor})
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0]
+        try:
+            body = self.read_json()
+        except ValueError:
+            self.send_json(400, {'success': False, 'error': 'JSON 형식 오류'})
+            return
+        if self.begin():
+            return
+        if path == '/api/sensor-data':
+            self.state.record_readings([body])
+            self.send_json(200, {'success': True, 'data': body, 'message': '센서 데이터가 성공적으로 저장되었습니다.'})
+        elif path == '/api/sensor-data/batch':
+            readings = body.get('readings') or []
+            self.state.record_readings(readings)
+            self.send_json(200, {'success': True, 'inserted': len(readings), 'rejected': 0})
+        elif path == '/api/sensor-rollups/batch':
+            rollups = body.get('rollups') or []
+            with self.state.lock:
+                self.state.rollups.extend(rollups)
+            self.send_json(200, {'success': True, 'inserted': len(rollups), 'rejected': 0})
+        elif path == '/api/control-logs':
+            with self.state.lock:
+                self.state.control_logs.append(body)
+            self.send_json(200, {'success': True, 'data': body})
+        elif path == '/api/control-logs/batch':
+            logs = body.get('logs') or []
+            with self.state.lock:
+                self.state.control_logs.extend(logs)
+            self.send_json(200, {'success': True, 'inserted': len(logs), 'rejected': 0})
+        else:
+            self.send_json(404, {'success': False, 'error': '요청한 엔드포인트를 찾을 수 없습니다.'})
+
+
+class StubApiServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0):
+        self.state = StubState(latency=latency, failure_rate=failure_rate)
+        handler = type('BoundStubHandler', (StubHandler,), {'state': self.state})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Farm Link API 스텁 서버')
+    parser.add_argument('--port', type=int, default=3000, help='포트 (기본: 3000)')
+    parser.add_argument('--latency', type=float, default=0.0, help='응답 지연 (초)')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='503 응답 비율 (0~1)')
+    parser.add_argument('--seed', type=int, default=0, help='장치마다 미리 기록할 합성 센서 데이터 건수')
+    parser.add_argument('--seed-interval', type=float, default=5.0, help='합성 데이터 간격 (초, 기본: 5)')
+    parser.add_argument('--seed-devices', default='farmlink-001', help='합성 데이터 장치 ID (쉼표로 구분)')
+    args = parser.parse_args()
+
+    stub = StubApiServer(port=args.port, latency=args.latency, failure_rate=args.failure_rate).start()
+    if args.seed:
+        stub.state.seed_readings(args.seed, args.seed_interval, args.seed_devices.split(','))
+    print(f"🧪 API 스텁 서버: {stub.url}")
+    print("Ctrl+C로 종료")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"📥 요청 {stub.state.requests}건, 센서 데이터 {len(stub.state.readings)}건, "
+                  f"집계 {len(stub.state.rollups)}건")
+    except KeyboardInterrupt:
+        print("\n스텁 서버를 종료합니다...")
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Farm Link 가상 아두이노 (pty 시리얼 에뮬레이터)
+의사 터미널(pty)을 열어 arduino.ino와 같은 형식의 센서 줄을 지정한 속도/지터로 출력하고
+임계치 문자열("M:..,D:..,T:..,H:..//")과 제어 명령에 응답
+"binary:<baud>" 명령을 받으면 확인 응답 후 이진 프레임(farmlink_binary.py) 출력으로 전환
+실제 보드 없이 수집기를 실행/측정할 때 사용 (Linux/macOS 전용)
+
+사용법:
+    python bench/virtual_arduino.py --rate 2 --format text
+    python farmlink_controller.py --port /dev/pts/N   (출력된 포트 경로 사용)
+"""
+
+import argparse
+import errno
+import os
+import pty
+import random
+import select
+import sys
+import threading
+import time
+import tty
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from farmlink_binary import encode_reading, encode_text
+
+
+class VirtualArduino:
+    def __init__(self, rate=1.0, jitter=0.0, line_format='text', baudrate=None, tag_sequence=False,
+                 start_banner=True, boot_delay=0.0, clock_drift=0.0, millis_start=0):
+        # rate: 초당 센서 줄 수, jitter: 출력 간격의 ±비율 (0.1이면 ±10%)
+        self.rate = rate
+        self.jitter = jitter
+        self.line_format = line_format
+        # baudrate를 지정하면 실제 UART처럼 초당 baudrate/10 바이트로 출력 제한
+        self.baudrate = baudrate
+        # tag_sequence이면 조도 값에 일련번호를 넣어 수신 측에서 유실/지연 측정 가능
+        self.tag_sequence = tag_sequence
+        self.start_banner = start_banner
+        # boot_delay: 시작 메시지 전에 부트로더/setup() 시간만큼 대기 (실제 보드의 재시작 흉내)
+        self.boot_delay = boot_delay
+        # clock_drift: 보드 발진기 오차 (ppm, 양수면 millis()가 빠르게 증가)
+        # millis_start: 시작 시 millis() 값 (2**32 근처로 주면 49.7일 롤오버 흉내)
+        self.clock_drift = clock_drift
+        self.millis_start = millis_start
+
+        self.master_fd, self.slave_fd = pty.openpty()
+        # 에코/줄 변환 없이 바이트 그대로 전달
+        tty.setraw(self.slave_fd)
+        os.set_blocking(self.master_fd, False)
+        self.port = os.ttyname(self.slave_fd)
+
+        self.active = False
+        self.thread = None
+        self.started_at = None
+        self.sequence = 0
+        # 일련번호 -> 출력 시각 (time.time())
+        self.sent_at = {}
+        self.inbound = bytearray()
+        self.thresholds = None
+        # 이진 프레임 모드 (협상 후 센서 값과 응답을 모두 이진 프레임으로 출력)
+        self.binary = False
+
+        # 출력/수신 통계
+        self.lines_sent = 0
+        self.lines_dropped = 0
+        self.commands_received = 0
+        self.thresholds_received = 0
+
+    def start(self):
+        if self.active:
+            return
+        self.active = True
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.active = False
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    def close(self):
+        self.stop()
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def millis(self):
+        elapsed = (time.monotonic() - self.started_at) * (1 + self.clock_drift / 1e6)
+        return (self.millis_start + int(elapsed * 1000)) % (1 << 32)
+
+    def next_interval(self):
+        interval = 1.0 / self.rate
+        if self.jitter:
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(interval, 0.0)
+
+    def sensor_line(self):
+        """arduino.ino 출력 형식의 센서 줄 생성"""
+        self.sequence += 1
+        soil = random.randint(30, 80)
+        light = self.sequence if self.tag_sequence else random.randint(0, 100)
+        temperature = round(random.uniform(18.0, 32.0), 2)
+        humidity = round(random.uniform(40.0, 80.0), 2)
+        if self.binary:
+            return encode_reading(self.sequence, self.millis(), soil, light, temperature, humidity)
+        if self.line_format == 'json':
+            return (f'{{"soil_moisture":{soil},"light_intensity":{light},"temperature":{temperature:.2f},'
+                    f'"humidity":{humidity:.2f},"timestamp":{self.millis()}}}\r\n')
+        return f"수분량: {soil}  조도: {light}  온도: {temperature:.2f}  습도: {humidity:.2f}\r\n"
+
+    def write(self, text):
+        """마스터 쪽에 쓰기 (수신 측이 읽지 않아 버퍼가 가득 차면 UART 오버런처럼 버림)"""
+        data = text if isinstance(text, bytes) else text.encode('utf-8')
+        try:
+            os.write(self.master_fd, data)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return False
+            raise
+        if self.baudrate:
+            time.sleep(len(data) * 10 / self.baudrate)
+        return True
+
+    def reply(self, text):
+        """응답/상태 메시지 한 줄 출력 (이진 모드에서는 텍스트 프레임)"""
+        return self.write(encode_text(text) if self.binary else text + "\r\n")
+
+    def run(self):
+        if self.boot_delay:
+            time.sleep(self.boot_delay)
+        if self.start_banner:
+            self.write("스마트팜 START!\r\n")
+        next_line_at = time.monotonic()
+        while self.active:
+            # rate가 0이면 센서 줄 없이 명령에만 응답 (나중에 rate를 바꾸면 출력 시작)
+            timeout = max(next_line_at - time.monotonic(), 0) if self.rate else 0.1
+            try:
+                readable, _, _ = select.select([self.master_fd], [], [], timeout)
+            except (OSError, ValueError):
+                return
+            if readable:
+                self.read_commands()
+            if self.rate and time.monotonic() >= next_line_at:
+                sequence = self.sequence + 1
+                sent_at = time.time()
+                if self.write(self.sensor_line()):
+                    self.lines_sent += 1
+                    self.sent_at[sequence] = sent_at
+                else:
+                    self.lines_dropped += 1
+                next_line_at += self.next_interval()
+                # 출력이 크게 밀리면 따라잡지 않고 현재 시각부터 다시 계산
+                if next_line_at < time.monotonic() - 1.0:
+                    next_line_at = time.monotonic()
+
+    def read_commands(self):
+        try:
+            chunk = os.read(self.master_fd, 1024)
+        except OSError:
+            return
+        self.inbound.extend(chunk)
+        while True:
+            # 임계치 문자열은 "//"로, 제어 명령은 줄바꿈으로 끝남
+            end, length = self.find_terminator()
+            if end < 0:
+                break
+            message = bytes(self.inbound[:end]).decode('utf-8', errors='replace').strip()
+            del self.inbound[:end + length]
+            if message:
+                self.handle_command(message)
+
+    def find_terminator(self):
+        candidates = [(self.inbound.find(b'//'), 2), (self.inbound.find(b'\n'), 1)]
+        candidates = [candidate for candidate in candidates if candidate[0] >= 0]
+        return min(candidates) if candidates else (-1, 0)
+
+    def handle_command(self, message):
+        """임계치 설정과 제어 명령 응답 (farmlink_esp8266 펌웨어의 응답 형식)"""
+        self.commands_received += 1
+        if message.startswith('M:'):
+            self.thresholds_received += 1
+            self.thresholds = message
+            self.reply("=== 임계치 설정 데이터 수신 ===")
+            self.reply(f"수신된 데이터: {message}//")
+        elif message.startswith('control:'):
+            self.reply(f"OK {message}")
+        elif message == 'status':
+            self.reply(f"STATUS thresholds={self.thresholds or 'default'} uptime={self.millis()}")
+        elif message.startswith('binary:') and message[7:].isdigit():
+            # 확인 응답은 현재 형식/속도로 보낸 뒤 전환
+            self.reply(f"BINARY OK {message[7:]}")
+            self.binary = True
+            if self.baudrate:
+                self.baudrate = int(message[7:])
+        else:
+            self.reply(f"UNKNOWN {message}")
+
+    def get_stats(self):
+        return {
+            'port': self.port,
+            'lines_sent': self.lines_sent,
+            'lines_dropped': self.lines_dropped,
+            'commands_received': self.commands_received,
+            'thresholds_received': self.thresholds_received,
+            'binary': self.binary,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Farm Link 가상 아두이노 (pty)')
+    parser.add_argument('--rate', type=float, default=1.0, help='초당 센서 줄 수 (기본: 1)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='출력 간격 지터 비율 (예: 0.1)')
+    parser.add_argument('--format', dest='line_format', choices=['text', 'json'], default='text',
+                        help='센서 줄 형식 (기본: text, arduino.ino와 동일)')
+    parser.add_argument('--baud', type=int, help='출력 속도를 실제 보드레이트로 제한 (예: 9600)')
+    parser.add_argument('--clock-drift', type=float, default=0.0, help='millis() 시계 오차 (ppm, 예: 500)')
+    parser.add_argument('--millis-start', type=int, default=0, help='시작 시 millis() 값 (롤오버 시험용)')
+    args = parser.parse_args()
+
+    arduino = VirtualArduino(rate=args.rate, jitter=args.jitter, line_format=args.line_format,
+                             baudrate=args.baud, clock_drift=args.clock_drift, millis_start=args.millis_start)
+    arduino.start()
+    print(f"🔌 가상 아두이노 포트: {arduino.port}")
+    print("Ctrl+C로 종료")
+    try:
+        while True:
+            time.sleep(5)
+            stats = arduino.get_stats()
+            print(f"📡 출력 {stats['lines_sent']}줄 (버림 {stats['lines_dropped']}줄), "
+                  f"명령 수신 {stats['commands_received']}건")
+    except KeyboardInterrupt:
+        print("\n가상 아두이노를 종료합니다...")
+    finally:
+        arduino.close()
+
+
+if __name__ == "__main__":
+    main()
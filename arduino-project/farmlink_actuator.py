@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Farm Link 구동기 명령 스케줄러
+"06:00에 farmlink-001~006 물펌프 5000ms"처럼 시각이 정해진 제어 작업을 받아 호출자를 막지 않고 실행
+- 같은 장치/동작의 작업이 작동 시간 구간에서 겹치면 하나로 합치고, 이미 작동 중인 구간에 포함되는 작업은 버림
+- 전송 스레드 하나가 실행 시각 순서(힙)로 장치별 시리얼에 명령을 쓰며 응답을 기다리지 않음
+- 제어 로그는 모았다가 POST /api/control-logs/batch 한 번으로 업로드
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+
+# 작동 시간이 있는 동작 (겹치는 작업 병합 대상)
+TIMED_ACTIONS = ('water_pump', 'fan', 'led')
+
+
+def parse_at(value, now=None):
+    """실행 시각 인자를 epoch 초로 변환 ("06:00"이면 다음 06:00, ISO 8601이면 그 시각, 로컬 시간)"""
+    if not value or value == 'now':
+        return time.time()
+    now = now or datetime.now()
+    if len(value) <= 5 and ':' in value:
+        hour, minute = (int(part) for part in value.split(':'))
+        moment = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if moment <= now:
+            moment += timedelta(days=1)
+        return moment.timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+class ActuatorJob:
+    def __init__(self, device_id, action, duration, run_at, triggered_by='manual'):
+        self.device_id = device_id
+        self.action = action
+        self.duration = int(duration)
+        self.run_at = run_at
+        self.triggered_by = triggered_by
+        # 병합되어 다른 작업으로 대체되면 True (힙에서는 꺼낼 때 건너뜀)
+        self.cancelled = False
+
+    @property
+    def end_at(self):
+        return self.run_at + self.duration / 1000
+
+    @property
+    def command(self):
+        return f"control:{self.action}:{self.duration}"
+
+    def __repr__(self):
+        at = datetime.fromtimestamp(self.run_at).strftime('%Y-%m-%d %H:%M:%S')
+        return f"{self.device_id} {self.action} {self.duration}ms @ {at}"
+
+
+class ControlLogBatcher:
+    """제어 로그를 모아 batch_size건 또는 batch_age초마다 한 번에 업로드"""
+
+    def __init__(self, session, batch_size=50, batch_age=2.0):
+        self.http = session
+        self.batch_size = batch_size
+        self.batch_age = batch_age
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.pending = []
+        self.oldest_at = None
+        self.active = False
+        self.thread = None
+        # 서버에 일괄 저장 API가 없으면 (404) 한 건씩 전송
+        self.batch_supported = True
+
+        # 업로드 통계
+        self.requests_sent = 0
+        self.logs_sent = 0
+        self.logs_failed = 0
+
+    def start(self):
+        if self.thread is None:
+            self.active = True
+            self.thread = threading.Thread(target=self.worker, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """남은 로그를 모두 업로드한 뒤 종료"""
+        if self.thread is not None:
+            with self.lock:
+                self.active = False
+                self.wakeup.notify()
+            self.thread.join(timeout=10)
+            self.thread = None
+        self.flush()
+
+    def add(self, device_id, action, duration, triggered_by='manual', executed_at=None):
+        record = {
+            'device_id': device_id,
+            'action': action,
+            'duration': duration,
+            'triggered_by': triggered_by,
+            'executed_at': datetime.fromtimestamp(executed_at or time.time()).astimezone().isoformat(),
+        }
+        with self.lock:
+            if not self.pending:
+                self.oldest_at = time.monotonic()
+            self.pending.append(record)
+            if len(self.pending) >= self.batch_size:
+                self.wakeup.notify()
+
+    def worker(self):
+        while True:
+            with self.lock:
+                while self.active and not self.due():
+                    timeout = self.batch_age if not self.pending else \
+                        max(self.oldest_at + self.batch_age - time.monotonic(), 0.01)
+                    self.wakeup.wait(timeout)
+                if not self.active:
+                    return
+            self.flush()
+
+    def due(self):
+        return bool(self.pending) and (len(self.pending) >= self.batch_size or
+                                       time.monotonic() - self.oldest_at >= self.batch_age)
+
+    def flush(self):
+        """모은 로그 업로드 (실패하면 다음 주기에 다시 시도)"""
+        with self.lock:
+            records, self.pending = self.pending, []
+        if not records:
+            return 0
+        failed = records
+        try:
+            if self.batch_supported:
+                self.requests_sent += 1
+                response = self.http.post('/api/control-logs/batch', json={'logs': records})
+                if response.status_code == 200 and response.json().get('success'):
+                    failed = []
+                elif response.status_code == 404:
+                    self.batch_supported = False
+                    print("⚠️ 서버에 제어 로그 일괄 저장 API가 없어 한 건씩 전송합니다.")
+                else:
+                    print(f"⚠️ 제어 로그 기록 실패: {response.status_code}")
+            if not self.batch_supported:
+                failed = [record for record in records if not self.post_one(record)]
+        except Exception as e:
+            print(f"⚠️ 제어 로그 기록 오류: {e}")
+        sent = len(records) - len(failed)
+        self.logs_sent += sent
+        if sent:
+            print(f"📝 제어 로그 {sent}건 기록 완료")
+        if failed:
+            self.requeue(failed)
+        return sent
+
+    def post_one(self, record):
+        self.requests_sent += 1
+        response = self.http.post('/api/control-logs', json=record)
+        return response.status_code == 200 and response.json().get('success')
+
+    def requeue(self, records):
+        with self.lock:
+            if not self.pending:
+                self.oldest_at = time.monotonic()
+            self.pending[:0] = records
+            # 서버가 계속 실패해도 메모리가 무한히 늘지 않도록 오래된 기록부터 버림
+            overflow = len(self.pending) - self.batch_size * 20
+            if overflow > 0:
+                del self.pending[:overflow]
+                self.logs_failed += overflow
+
+    def get_stats(self):
+        return {
+            'requests_sent': self.requests_sent,
+            'logs_sent': self.logs_sent,
+            'logs_pending': len(self.pending),
+            'logs_failed': self.logs_failed,
+        }
+
+
+class ActuatorScheduler:
+    """장치별 제어 작업을 실행 시각 순으로 실행 (senders: 장치 ID -> 명령 전송 함수)"""
+
+    def __init__(self, senders, log_batcher=None):
+        self.senders = senders
+        self.log_batcher = log_batcher
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        # (실행 시각, 순번, 작업) 힙과 (장치, 동작)별 대기 작업 목록
+        self.heap = []
+        self.sequence = itertools.count()
+        self.pending = {}
+        # (장치, 동작) -> 마지막으로 보낸 명령의 작동 종료 시각
+        self.active_until = {}
+        self.active = False
+        self.thread = None
+
+        # 스케줄링 통계
+        self.jobs_scheduled = 0
+        self.jobs_merged = 0
+        self.jobs_redundant = 0
+        self.commands_sent = 0
+        self.commands_failed = 0
+        self.max_lateness = 0.0
+
+    def start(self):
+        if self.thread is None:
+            self.active = True
+            self.thread = threading.Thread(target=self.dispatch_worker, daemon=True)
+            self.thread.start()
+        if self.log_batcher:
+            self.log_batcher.start()
+
+    def stop(self):
+        """전송 스레드 종료 (실행하지 않은 작업은 버림) 후 남은 제어 로그 업로드"""
+        if self.thread is not None:
+            with self.lock:
+                self.active = False
+                self.wakeup.notify()
+            self.thread.join(timeout=5)
+            self.thread = None
+        if self.log_batcher:
+            self.log_batcher.stop()
+
+    def schedule(self, action, duration=5000, device_ids=None, at=None, triggered_by='manual'):
+        """device_ids(기본: 모든 장치)에 작업을 등록하고 바로 반환 (at: epoch 초, None이면 즉시)
+        실제로 대기열에 남은 작업 목록을 반환 (병합/중복 제거된 작업은 제외)
+        """
+        run_at = time.time() if at is None else at
+        device_ids = device_ids or list(self.senders)
+        unknown = [device_id for device_id in device_ids if device_id not in self.senders]
+        if unknown:
+            raise ValueError(f"연결되지 않은 장치입니다: {', '.join(unknown)}")
+        scheduled = []
+        with self.lock:
+            for device_id in device_ids:
+                job = self.add_job(ActuatorJob(device_id, action, duration, run_at, triggered_by))
+                if job:
+                    scheduled.append(job)
+            self.wakeup.notify()
+        return scheduled
+
+    def add_job(self, job):
+        """겹치는 작업 병합 후 힙에 추가 (self.lock 안에서 호출)"""
+        self.jobs_scheduled += 1
+        key = (job.device_id, job.action)
+        pending = [other for other in self.pending.get(key, []) if not other.cancelled]
+
+        if job.action not in TIMED_ACTIONS:
+            # all_off 등 작동 시간이 없는 명령은 같은 시각의 같은 명령만 중복으로 처리
+            if any(other.run_at == job.run_at for other in pending):
+                self.jobs_redundant += 1
+                return None
+        else:
+            # 이미 보낸 명령의 작동 구간 안에서 시작하고 끝나는 작업은 보낼 필요가 없음
+            active_until = self.active_until.get(key, 0)
+            if job.run_at < active_until and job.end_at <= active_until:
+                self.jobs_redundant += 1
+                return None
+            for other in pending:
+                if job.run_at <= other.end_at and other.run_at <= job.end_at:
+                    if other.run_at <= job.run_at and job.end_at <= other.end_at:
+                        # 기존 작업에 완전히 포함됨
+                        self.jobs_redundant += 1
+                        return None
+                    # 겹치는 두 구간을 하나의 명령으로 합침 (이른 시작 ~ 늦은 종료)
+                    start = min(job.run_at, other.run_at)
+                    end = max(job.end_at, other.end_at)
+                    other.cancelled = True
+                    self.jobs_merged += 1
+                    job = ActuatorJob(job.device_id, job.action, round((end - start) * 1000), start, job.triggered_by)
+            pending = [other for other in pending if not other.cancelled]
+
+        pending.append(job)
+        self.pending[key] = pending
+        heapq.heappush(self.heap, (job.run_at, next(self.sequence), job))
+        return job
+
+    def dispatch_worker(self):
+        """실행 시각이 된 작업을 꺼내 전송 (다음 작업 시각까지 대기, 새 작업이 들어오면 다시 계산)"""
+        while True:
+            with self.lock:
+                while self.active:
+                    while self.heap and self.heap[0][2].cancelled:
+                        heapq.heappop(self.heap)
+                    if self.heap and self.heap[0][0] <= time.time():
+                        break
+                    timeout = self.heap[0][0] - time.time() if self.heap else None
+                    self.wakeup.wait(timeout)
+                if not self.active:
+                    return
+                _, _, job = heapq.heappop(self.heap)
+                key = (job.device_id, job.action)
+                self.pending[key] = [other for other in self.pending.get(key, []) if other is not job]
+            self.execute(job)
+
+    def execute(self, job):
+        now = time.time()
+        self.max_lateness = max(self.max_lateness, now - job.run_at)
+        try:
+            success = self.senders[job.device_id](job.command)
+        except Exception as e:
+            print(f"❌ [{job.device_id}] 명령 전송 실패: {e}")
+            success = False
+        if not success:
+            self.commands_failed += 1
+            return
+        self.commands_sent += 1
+        with self.lock:
+            if job.action in TIMED_ACTIONS:
+                self.active_until[(job.device_id, job.action)] = now + job.duration / 1000
+            elif job.action == 'all_off':
+                for key in [key for key in self.active_until if key[0] == job.device_id]:
+                    del self.active_until[key]
+        if self.log_batcher and job.action != 'status':
+            self.log_batcher.add(job.device_id, job.action, job.duration, job.triggered_by, executed_at=now)
+
+    def pending_jobs(self):
+        """대기 중인 작업 목록 (실행 시각 순)"""
+        with self.lock:
+            return sorted((job for jobs in self.pending.values() for job in jobs if not job.cancelled),
+                          key=lambda job: job.run_at)
+
+    def wait_idle(self, timeout=None):
+        """대기 중인 작업이 모두 실행될 때까지 대기 (남은 작업이 없으면 True)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending_jobs():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def get_stats(self):
+        return {
+            'jobs_scheduled': self.jobs_scheduled,
+            'jobs_merged': self.jobs_merged,
+            'jobs_redundant': self.jobs_redundant,
+            'jobs_pending': len(self.pending_jobs()),
+            'commands_sent': self.commands_sent,
+            'commands_failed': self.commands_failed,
+            'max_lateness_ms': self.max_lateness * 1000,
+            'logs': self.log_batcher.get_stats() if self.log_batcher else None,
+        }
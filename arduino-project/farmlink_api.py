@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Farm Link API 클라이언트
+모든 API 호출이 공유하는 keep-alive 연결 풀 위에 재시도(지터 백오프), 서킷 브레이커,
+엔드포인트별 지연 히스토그램을 제공
+requests.Session과 같은 get/post 형태로 호출하므로 session 인자로 그대로 넘길 수 있음
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from farmlink_metrics import REGISTRY
+
+# 지연 히스토그램 구간 상한 (ms, 마지막 구간은 그 이상)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# 엔드포인트 이름에서 그대로 남길 경로 조각 (나머지 ID 자리는 :id로 묶음)
+ENDPOINT_SEGMENTS = {'api', 'sensor-data', 'sensor-rollups', 'batch', 'stats', 'devices', 'control-logs',
+                     'threshold-configs', 'active', 'device-status', 'health'}
+
+# 재시도해도 되는 서버 오류 (게이트웨이/일시적 장애)
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+# 모든 클라이언트가 함께 기록하는 /metrics용 요청 지연 (시도 단위, 재시도 포함)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'farmlink_http_request_seconds',
+    'API 요청 한 번의 지연 (초)',
+    ['endpoint', 'outcome'],
+    buckets=[bound / 1000 for bound in LATENCY_BUCKETS_MS]
+)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """서킷이 열려 있어 요청을 보내지 않음 (기존 RequestException 처리로 함께 잡힘)"""
+
+
+def endpoint_name(method, url):
+    """통계용 엔드포인트 이름 (예: "GET /api/threshold-configs/:id/active")"""
+    path = urlsplit(url).path
+    segments = [segment if segment in ENDPOINT_SEGMENTS else ':id'
+                for segment in path.strip('/').split('/') if segment]
+    return f"{method} /" + '/'.join(segments)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, latency_ms, error=False):
+        """요청 한 건의 지연 기록"""
+        index = 0
+        while index < len(LATENCY_BUCKETS_MS) and latency_ms > LATENCY_BUCKETS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+        if error:
+            self.errors += 1
+
+    def percentile(self, fraction):
+        """구간 상한 기준 근사 백분위수 (ms)"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return min(LATENCY_BUCKETS_MS[index], self.max_ms)
+                return self.max_ms
+        return self.max_ms
+
+    def get_stats(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': self.max_ms,
+            'buckets': dict(zip([f"<={bound}" for bound in LATENCY_BUCKETS_MS] + ['>5000'], self.buckets)),
+        }
+
+
+class FarmLinkApiClient:
+    def __init__(self, api_base_url="http://localhost:3000", pool_size=10, timeout=5.0, retries=2,
+                 backoff=0.5, max_backoff=5.0, failure_threshold=5, reset_timeout=30.0):
+        self.api_base_url = api_base_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        # keep-alive 연결 풀 (재시도는 아래에서 직접 처리하므로 urllib3 재시도는 끔)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # 서킷 브레이커 상태: 연속 실패가 failure_threshold에 도달하면 reset_timeout 동안 요청 차단,
+        # 이후 한 건만 시험 요청(half-open)하여 성공하면 닫음
+        self.lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.circuit_open_until = None
+        self.trial_in_progress = False
+        self.circuit_opened = 0
+        self.requests_rejected = 0
+        self.retries_attempted = 0
+
+        self.histograms = {}
+        REGISTRY.register_collector(self.collect_metrics)
+
+    def url(self, path):
+        """경로("/api/...")를 전체 URL로 변환 (이미 전체 URL이면 그대로)"""
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f"{self.api_base_url}{path}"
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def request(self, method, url, retries=None, **kwargs):
+        """재시도와 서킷 브레이커를 적용한 요청 (재시도 후에도 실패하면 마지막 응답 반환 또는 예외 발생)"""
+        url = self.url(url)
+        endpoint = endpoint_name(method, url)
+        kwargs.setdefault('timeout', self.timeout)
+        retries = self.retries if retries is None else retries
+
+        attempt = 0
+        while True:
+            self.before_request(endpoint)
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self.observe(endpoint, started, error=True)
+                self.record_result(success=False)
+                # 읽기 시간 초과는 서버가 이미 처리했을 수 있으므로 GET만 재시도
+                retryable = not isinstance(e, requests.exceptions.ReadTimeout) or method == 'GET'
+                # 이번 실패로 서킷이 열렸으면 재시도하지 않고 실제 오류를 그대로 전달
+                if not retryable or attempt >= retries or self.circuit_state() == 'open':
+                    raise
+            else:
+                failed = response.status_code in RETRY_STATUS_CODES
+                self.observe(endpoint, started, error=failed)
+                self.record_result(success=not failed)
+                if not failed or attempt >= retries or self.circuit_state() == 'open':
+                    return response
+
+            attempt += 1
+            self.retries_attempted += 1
+            time.sleep(self.backoff_delay(attempt))
+
+    def backoff_delay(self, attempt):
+        """지터 백오프: 0 ~ min(max_backoff, backoff * 2^(attempt-1)) 사이의 임의 시간 (full jitter)"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** (attempt - 1))))
+
+    def before_request(self, endpoint):
+        """서킷이 열려 있으면 요청을 보내지 않고 CircuitOpenError 발생"""
+        with self.lock:
+            if self.circuit_open_until is None:
+                return
+            if time.monotonic() >= self.circuit_open_until and not self.trial_in_progress:
+                self.trial_in_progress = True
+                return
+            self.requests_rejected += 1
+        raise CircuitOpenError(f"API 서버 서킷 열림: {endpoint} 요청 차단")
+
+    def record_result(self, success):
+        """요청 결과로 서킷 상태 갱신"""
+        with self.lock:
+            self.trial_in_progress = False
+            if success:
+                self.consecutive_failures = 0
+                if self.circuit_open_until is not None:
+                    self.circuit_open_until = None
+                    print("✅ API 서버 복구, 서킷 닫힘")
+                return
+            self.consecutive_failures += 1
+            if self.circuit_open_until is not None or self.consecutive_failures >= self.failure_threshold:
+                if self.circuit_open_until is None:
+                    self.circuit_opened += 1
+                    print(f"⚠️ API 서버 연속 {self.consecutive_failures}회 실패, {self.reset_timeout:.0f}초 동안 요청 차단")
+                self.circuit_open_until = time.monotonic() + self.reset_timeout
+
+    def observe(self, endpoint, started, error=False):
+        latency_ms = (time.perf_counter() - started) * 1000
+        HTTP_REQUEST_SECONDS.observe(latency_ms / 1000, endpoint=endpoint, outcome='error' if error else 'ok')
+        with self.lock:
+            histogram = self.histograms.get(endpoint)
+            if histogram is None:
+                histogram = self.histograms[endpoint] = LatencyHistogram()
+            histogram.observe(latency_ms, error=error)
+
+    def circuit_state(self):
+        """서킷 상태 (closed / open / half-open)"""
+        with self.lock:
+            if self.circuit_open_until is None:
+                return 'closed'
+            if time.monotonic() >= self.circuit_open_until:
+                return 'half-open'
+            return 'open'
+
+    def get_stats(self):
+        """서킷 상태와 엔드포인트별 지연 통계 조회"""
+        with self.lock:
+            endpoints = {endpoint: histogram.get_stats() for endpoint, histogram in self.histograms.items()}
+        return {
+            'circuit_state': self.circuit_state(),
+            'circuit_opened': self.circuit_opened,
+            'requests_rejected': self.requests_rejected,
+            'retries': self.retries_attempted,
+            'endpoints': endpoints,
+        }
+
+    def collect_metrics(self):
+        """/metrics용 서킷/재시도 통계"""
+        labels = {'api': self.api_base_url}
+        return [
+            ('farmlink_http_circuit_open', 'gauge', '서킷이 열려 요청을 차단 중이면 1',
+             [(labels, 1 if self.circuit_state() == 'open' else 0)]),
+            ('farmlink_http_circuit_opened_total', 'counter', '서킷이 열린 횟수',
+             [(labels, self.circuit_opened)]),
+            ('farmlink_http_requests_rejected_total', 'counter', '서킷이 열려 보내지 않은 요청 수',
+             [(labels, self.requests_rejected)]),
+            ('farmlink_http_retries_total', 'counter', '재시도한 요청 수',
+             [(labels, self.retries_attempted)]),
+        ]
+
+    def print_stats(self):
+        """엔드포인트별 지연 통계 출력"""
+        stats = self.get_stats()
+        print(f"🌐 API 클라이언트: 서킷 {stats['circuit_state']}, 재시도 {stats['retries']}회, "
+              f"차단 {stats['requests_rejected']}회")
+        for endpoint, histogram in sorted(stats['endpoints'].items()):
+            print(f"  {endpoint}: {histogram['count']}회 (오류 {histogram['errors']}회), "
+                  f"평균 {histogram['avg_ms']:.0f}ms, p50 {histogram['p50_ms']:.0f}ms, "
+                  f"p95 {histogram['p95_ms']:.0f}ms, 최대 {histogram['max_ms']:.0f}ms")
+
+    def close(self):
+        """연결 풀 정리"""
+        REGISTRY.unregister_collector(self.collect_metrics)
+        self.session.close()
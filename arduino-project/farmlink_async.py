@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Farm Link asyncio 엔진
+시리얼 수신, API 업로드, 임계치 동기화 타이머를 하나의 이벤트 루프에서 실행
+"""
+
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncFarmLinkEngine:
+    def __init__(self, controller, threshold_interval=7.0, max_concurrent_uploads=4):
+        self.controller = controller
+        self.threshold_interval = threshold_interval
+        # 업로드는 파이프라인의 업로드 출력 스레드(이 개수만큼)가 담당
+        self.max_concurrent_uploads = max_concurrent_uploads
+        self.loop = None
+        self.loop_thread = None
+        self.loop_ready = threading.Event()
+        self.tasks = {}
+        # requests는 블로킹 API이므로 HTTP 호출은 전용 스레드 풀에서 실행
+        self.http_executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_uploads,
+            thread_name_prefix='farmlink-http'
+        )
+        # 파일 디스크립터를 지원하지 않는 포트(Windows)용 readline 스레드
+        self.serial_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='farmlink-serial')
+
+    def start(self):
+        """이벤트 루프 스레드 시작"""
+        if self.loop_thread and self.loop_thread.is_alive():
+            return
+        self.loop_ready.clear()
+        self.loop_thread = threading.Thread(target=self.run_loop, daemon=True)
+        self.loop_thread.start()
+        self.loop_ready.wait()
+
+    def run_loop(self):
+        """이벤트 루프 스레드 본체"""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self.loop_ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def stop(self):
+        """모든 작업을 취소하고 이벤트 루프 종료"""
+        if not self.loop or not self.loop.is_running():
+            return
+        for name in list(self.tasks):
+            self.stop_task(name)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join(timeout=5)
+        self.http_executor.shutdown(wait=False)
+        self.serial_executor.shutdown(wait=False)
+
+    def start_task(self, name, coroutine_function):
+        """이벤트 루프에 작업 등록 (동기 코드에서 호출)"""
+        self.start()
+
+        async def create():
+            if name in self.tasks and not self.tasks[name].done():
+                return False
+            self.tasks[name] = asyncio.create_task(coroutine_function(), name=name)
+            return True
+
+        return asyncio.run_coroutine_threadsafe(create(), self.loop).result()
+
+    def stop_task(self, name):
+        """등록된 작업 취소 후 종료될 때까지 대기 (동기 코드에서 호출)"""
+        if not self.loop or not self.loop.is_running():
+            return False
+
+        async def cancel():
+            task = self.tasks.pop(name, None)
+            if task is None:
+                return False
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return True
+
+        return asyncio.run_coroutine_threadsafe(cancel(), self.loop).result(timeout=15)
+
+    def is_running(self, name):
+        """작업 실행 여부"""
+        task = self.tasks.get(name)
+        return task is not None and not task.done()
+
+    async def read_serial_frames(self, frame_reader, frames_ready):
+        """시리얼 포트에서 읽은 바이트를 프레임으로 분리하여 링 버퍼에 넣음"""
+        serial_conn = self.controller.serial_conn
+        try:
+            fd = serial_conn.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            fd = None
+
+        if fd is None:
+            await self.read_serial_frames_blocking(serial_conn, frame_reader, frames_ready)
+            return
+
+        # POSIX: 포트의 fd를 이벤트 루프에 등록하여 데이터가 도착할 때만 읽음
+        def on_readable():
+            try:
+                chunk = serial_conn.read(serial_conn.in_waiting or 1)
+            except Exception as e:
+                frame_reader.read_errors += 1
+                self.loop.remove_reader(fd)
+                frame_reader.mark_lost(e)
+                return
+            frame_reader.feed(chunk)
+            frames_ready.set()
+
+        self.loop.add_reader(fd, on_readable)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self.loop.remove_reader(fd)
+
+    async def read_serial_frames_blocking(self, serial_conn, frame_reader, frames_ready):
+        """fd가 없는 포트는 전용 스레드에서 readline (timeout=1초이므로 취소 지연은 최대 1초)"""
+        while True:
+            try:
+                raw_data = await self.loop.run_in_executor(self.serial_executor, serial_conn.readline)
+            except Exception as e:
+                frame_reader.read_errors += 1
+                frame_reader.mark_lost(e)
+                return
+            if raw_data:
+                frame_reader.feed(raw_data)
+                frames_ready.set()
+
+    async def data_collection(self):
+        """센서 데이터 수집 작업: 수신 즉시 파이프라인으로 처리하고 업로드는 출력 스레드가 동시에 진행"""
+        print("📊 센서 데이터 수집 시작... (asyncio)")
+        # 멀티플렉서의 수신 스레드 대신 이벤트 루프가 읽어서 넘김 (응답 연결과 쓰기 큐는 그대로 사용)
+        frame_reader = self.controller.serial_mux
+        frames_ready = asyncio.Event()
+        reader = asyncio.create_task(self.read_serial_frames(frame_reader, frames_ready))
+        pipeline = self.controller.pipeline
+        try:
+            while True:
+                await frames_ready.wait()
+                frames_ready.clear()
+                while True:
+                    # 출력 큐가 가득 차면 이벤트 루프를 막지 않고 자리가 날 때까지 기다림 (그동안 프레임은 링 버퍼에 쌓임)
+                    while pipeline.is_backlogged():
+                        await asyncio.sleep(0.05)
+                    frame = frame_reader.get(timeout=0)
+                    if frame is None:
+                        break
+                    frame_reader.mark_consumed(frame)
+                    try:
+                        pipeline.process(frame)
+                    except Exception as e:
+                        print(f"데이터 수집 오류: {e}")
+        finally:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+
+    async def threshold_sync(self):
+        """임계치 동기화 작업: 작업 소요 시간과 무관하게 고정 주기로 실행 (long-poll이면 응답 즉시 재요청)"""
+        long_poll = self.controller.threshold_long_poll
+        if long_poll:
+            print(f"🔄 임계치 동기화 시작... (asyncio, 변경 대기 최대 {long_poll}초)")
+        else:
+            print(f"🔄 임계치 동기화 시작... (asyncio, {self.threshold_interval}초 주기)")
+        next_run = self.loop.time()
+        while True:
+            try:
+                await self.loop.run_in_executor(
+                    self.http_executor, self.controller.sync_threshold_config, long_poll
+                )
+            except Exception as e:
+                print(f"❌ 임계치 동기화 오류: {e}")
+                # 오류 시에는 long-poll이어도 주기만큼 쉬고 재시도
+                await asyncio.sleep(self.threshold_interval)
+                next_run = self.loop.time()
+                continue
+            if long_poll:
+                # 서버가 변경 시까지 응답을 보류하므로 짧게 쉬고 바로 다시 요청
+                await asyncio.sleep(1)
+                continue
+            next_run += self.threshold_interval
+            # 작업이 주기보다 오래 걸린 경우 밀린 실행은 건너뜀
+            while next_run <= self.loop.time():
+                next_run += self.threshold_interval
+            await asyncio.sleep(next_run - self.loop.time())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Farm Link 배치 업로드 모듈
+센서 데이터를 버퍼에 모아 한 번의 요청으로 API 서버에 전송
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import requests
+
+from farmlink_api import FarmLinkApiClient
+from farmlink_metrics import STAGE_SECONDS
+
+
+def stamp_received_time(data):
+    """아두이노의 millis() 값 또는 누락된 타임스탬프를 수신 시각으로 변환"""
+    # 버퍼링/재전송 지연과 무관하게 수신 시각을 유지 (서버 시간대와 섞이지 않도록 시간대 포함)
+    if not isinstance(data.get('timestamp'), str):
+        data['timestamp'] = datetime.now().astimezone().isoformat()
+    return data
+
+
+class SensorBatchUploader:
+    def __init__(self, api_base_url="http://localhost:3000", max_batch_size=50,
+                 max_batch_age=5.0, max_buffer_size=1000, session=None,
+                 endpoint="/api/sensor-data/batch", payload_key='readings', stamp_timestamps=True):
+        self.api_base_url = api_base_url
+        # 같은 배치 전송 방식을 집계(rollup) 업로드에도 사용 (엔드포인트와 본문 키만 다름)
+        self.endpoint = endpoint
+        self.payload_key = payload_key
+        self.stamp_timestamps = stamp_timestamps
+        # 여러 장치가 연결 풀을 공유할 수 있도록 공유 API 클라이언트(FarmLinkApiClient)를 받을 수 있음
+        self.http = session or FarmLinkApiClient(api_base_url)
+        self.max_batch_size = max_batch_size
+        self.max_batch_age = max_batch_age
+        # 버퍼가 가득 차면 가장 오래된 데이터부터 버림
+        self.buffer = deque(maxlen=max_buffer_size)
+        self.condition = threading.Condition()
+        self.oldest_added_at = None
+        self.active = False
+        self.flush_thread = None
+
+        # 배치 전송 통계
+        self.batches_sent = 0
+        self.batches_failed = 0
+        self.rows_sent = 0
+        self.rows_failed = 0
+        self.rows_dropped = 0
+        self.total_latency = 0.0
+        self.last_latency = 0.0
+        self.last_status_code = None
+
+    def start(self):
+        """배치 전송 스레드 시작"""
+        if self.active:
+            return
+        self.active = True
+        self.flush_thread = threading.Thread(target=self.flush_worker, daemon=True)
+        self.flush_thread.start()
+        print(f"📦 배치 전송 모드 시작 (최대 {self.max_batch_size}건 / {self.max_batch_age}초)")
+
+    def stop(self):
+        """배치 전송 스레드 중지 (남은 데이터 전송)"""
+        if not self.active:
+            return
+        with self.condition:
+            self.active = False
+            self.condition.notify()
+        if self.flush_thread:
+            self.flush_thread.join(timeout=15)
+        self.flush()
+        self.print_stats()
+
+    def add(self, data):
+        """센서 데이터를 버퍼에 추가"""
+        if self.stamp_timestamps:
+            stamp_received_time(data)
+
+        with self.condition:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.rows_dropped += 1
+            self.buffer.append(data)
+            if self.oldest_added_at is None:
+                self.oldest_added_at = time.monotonic()
+            if len(self.buffer) >= self.max_batch_size:
+                self.condition.notify()
+        return True
+
+    def take_batch(self):
+        """버퍼에서 한 배치 분량을 꺼냄"""
+        with self.condition:
+            count = min(len(self.buffer), self.max_batch_size)
+            batch = [self.buffer.popleft() for _ in range(count)]
+            self.oldest_added_at = time.monotonic() if self.buffer else None
+            return batch
+
+    def flush_worker(self):
+        """배치 크기 또는 경과 시간 조건이 되면 전송하는 워커 스레드"""
+        while True:
+            with self.condition:
+                while self.active and not self.is_due():
+                    self.condition.wait(timeout=self.time_until_due())
+                if not self.active:
+                    return
+            self.flush()
+
+    def is_due(self):
+        """전송 조건 충족 여부 (condition 잠금 상태에서 호출)"""
+        if not self.buffer:
+            return False
+        if len(self.buffer) >= self.max_batch_size:
+            return True
+        return time.monotonic() - self.oldest_added_at >= self.max_batch_age
+
+    def time_until_due(self):
+        """다음 전송 조건까지 남은 시간 (condition 잠금 상태에서 호출)"""
+        if self.oldest_added_at is None:
+            return self.max_batch_age
+        remaining = self.max_batch_age - (time.monotonic() - self.oldest_added_at)
+        return max(remaining, 0.01)
+
+    def flush(self):
+        """버퍼에 남은 데이터를 모두 전송"""
+        while True:
+            batch = self.take_batch()
+            if not batch:
+                return True
+            if not self.send_batch(batch):
+                return False
+
+    def send_batch(self, batch):
+        """여러 건의 센서 데이터를 한 번의 요청으로 전송"""
+        started = time.perf_counter()
+        self.last_status_code = None
+        try:
+            response = self.http.post(
+                f"{self.api_base_url}{self.endpoint}",
+                headers={'Content-Type': 'application/json'},
+                json={self.payload_key: batch},
+                timeout=10
+            )
+            latency = time.perf_counter() - started
+            STAGE_SECONDS.observe(latency, stage='upload_batch')
+            self.last_status_code = response.status_code
+
+            if response.status_code == 200:
+                result = response.json()
+                if result.get('success'):
+                    self.record_success(len(batch), latency)
+                    print(f"✓ 배치 전송 성공: {len(batch)}건, {latency * 1000:.0f}ms")
+                    return True
+                print(f"✗ 배치 전송 실패: {result.get('error', 'Unknown error')}")
+            else:
+                print(f"✗ API 서버 오류: {response.status_code} - {response.text}")
+
+        except requests.exceptions.RequestException as e:
+            print(f"✗ 네트워크 오류: {e}")
+        except Exception as e:
+            print(f"✗ 예상치 못한 오류: {e}")
+
+        self.batches_failed += 1
+        self.rows_failed += len(batch)
+        return False
+
+    def record_success(self, rows, latency):
+        """배치 전송 성공 통계 기록"""
+        self.batches_sent += 1
+        self.rows_sent += rows
+        self.total_latency += latency
+        self.last_latency = latency
+
+    def get_stats(self):
+        """배치 전송 통계 조회"""
+        return {
+            'batches_sent': self.batches_sent,
+            'batches_failed': self.batches_failed,
+            'rows_sent': self.rows_sent,
+            'rows_failed': self.rows_failed,
+            'rows_dropped': self.rows_dropped,
+            'rows_buffered': len(self.buffer),
+            'rows_per_request': self.rows_sent / self.batches_sent if self.batches_sent else 0.0,
+            'avg_latency_ms': self.total_latency / self.batches_sent * 1000 if self.batches_sent else 0.0,
+            'last_latency_ms': self.last_latency * 1000,
+        }
+
+    def print_stats(self):
+        """배치 전송 통계 출력"""
+        stats = self.get_stats()
+        print(f"📊 배치 전송 통계: {stats['batches_sent']}회 / {stats['rows_sent']}건 "
+              f"(요청당 {stats['rows_per_request']:.1f}건, 평균 {stats['avg_latency_ms']:.0f}ms, "
+              f"실패 {stats['batches_failed']}회, 버림 {stats['rows_dropped']}건)")
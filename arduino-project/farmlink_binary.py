@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Farm Link 이진 시리얼 프레임
+센서 값을 고정 배치 struct로 묶고 CRC-16과 일련번호를 붙여 COBS로 인코딩 (프레임 구분자 0x00)
+샘플당 19바이트로 텍스트 줄(약 57바이트)의 3분의 1이며, 파싱은 struct.unpack 한 번으로 끝남
+보드와는 텍스트 명령("binary:<baud>")으로 협상하며, 협상에 실패하면 기존 텍스트 형식을 그대로 사용
+
+프레임 (COBS 인코딩 전, 리틀 엔디언):
+    [종류 1B][본문][CRC-16/CCITT-FALSE 2B]  (CRC는 종류+본문에 대해 계산)
+    종류 0x01 센서 값: 일련번호 u16, millis u32, 수분량 u16, 조도 u16, 온도*100 i16, 습도*100 u16
+    종류 0x02 텍스트: UTF-8 문자열 (임계치 수신 확인, 명령 응답, 상태 메시지)
+"""
+
+import binascii
+import struct
+
+from farmlink_parser import SensorReading
+
+FRAME_DELIMITER = b'\x00'
+FRAME_READING = 0x01
+FRAME_TEXT = 0x02
+
+READING_STRUCT = struct.Struct('<BHIHHhH')
+CRC_STRUCT = struct.Struct('<H')
+
+# 협상 명령과 보드의 확인 응답 ("BINARY OK 115200")
+BINARY_COMMAND = 'binary:{baudrate}\n'
+BINARY_ACK_TOKEN = b'BINARY OK'
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE (다항식 0x1021, 초기값 0xFFFF)"""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def cobs_encode(data):
+    """0x00이 없는 바이트열로 인코딩 (구분자는 붙이지 않음)"""
+    encoded = bytearray()
+    for block in data.split(b'\x00'):
+        # 0x00 사이 구간을 최대 254바이트씩 [길이+1][데이터]로 기록
+        while len(block) >= 254:
+            encoded.append(0xFF)
+            encoded.extend(block[:254])
+            block = block[254:]
+        encoded.append(len(block) + 1)
+        encoded.extend(block)
+    return bytes(encoded)
+
+
+def cobs_decode(encoded):
+    """cobs_encode의 역변환 (형식 오류면 ValueError)"""
+    decoded = bytearray()
+    index = 0
+    length = len(encoded)
+    while index < length:
+        code = encoded[index]
+        end = index + code
+        if code == 0 or end > length:
+            raise ValueError("COBS 형식 오류")
+        block = encoded[index + 1:end]
+        if b'\x00' in block:
+            raise ValueError("COBS 형식 오류")
+        decoded.extend(block)
+        index = end
+        # 최대 길이 블록(0xFF) 뒤와 마지막 블록 뒤에는 0x00이 없음
+        if code != 0xFF and index < length:
+            decoded.append(0)
+    return bytes(decoded)
+
+
+def encode_frame(frame_type, body):
+    """종류+본문에 CRC를 붙여 COBS 인코딩한 프레임 (구분자 포함)"""
+    payload = bytes([frame_type]) + body
+    return cobs_encode(payload + CRC_STRUCT.pack(crc16(payload))) + FRAME_DELIMITER
+
+
+def encode_reading(sequence, millis, soil_moisture, light_intensity, temperature, humidity):
+    """센서 값 프레임 (펌웨어 구현 참고용, 가상 아두이노에서 사용)"""
+    body = READING_STRUCT.pack(
+        FRAME_READING, sequence & 0xFFFF, millis & 0xFFFFFFFF,
+        int(soil_moisture), int(light_intensity),
+        int(round(temperature * 100)), int(round(humidity * 100))
+    )[1:]
+    return encode_frame(FRAME_READING, body)
+
+
+def encode_text(text):
+    """텍스트 프레임 (명령 응답, 상태 메시지)"""
+    return encode_frame(FRAME_TEXT, text.encode('utf-8'))
+
+
+class BinaryFrameDecoder:
+    """수신 프레임을 검증/해석하고 일련번호로 유실 프레임 수를 셈"""
+
+    delimiter = FRAME_DELIMITER
+
+    def __init__(self):
+        self.last_sequence = None
+
+        # 디코딩 통계
+        self.frames_decoded = 0
+        self.readings_decoded = 0
+        self.text_frames = 0
+        self.bytes_received = 0
+        self.cobs_errors = 0
+        self.crc_errors = 0
+        self.unknown_frames = 0
+        self.sequence_gaps = 0
+        self.frames_lost = 0
+
+    def decode(self, raw):
+        """구분자를 포함한 프레임 하나를 (raw, reading)으로 변환 (손상된 프레임이면 None)
+        센서 값이면 reading에 SensorReading, 텍스트면 raw에 줄바꿈을 붙인 텍스트 바이트
+        """
+        self.bytes_received += len(raw)
+        encoded = raw[:-1] if raw.endswith(FRAME_DELIMITER) else raw
+        if not encoded:
+            return None
+        try:
+            payload = cobs_decode(encoded)
+        except ValueError:
+            self.cobs_errors += 1
+            return None
+        if len(payload) < 3 or CRC_STRUCT.unpack_from(payload, len(payload) - 2)[0] != crc16(payload[:-2]):
+            self.crc_errors += 1
+            return None
+        self.frames_decoded += 1
+        payload = payload[:-2]
+
+        frame_type = payload[0]
+        if frame_type == FRAME_READING and len(payload) == READING_STRUCT.size:
+            _, sequence, millis, soil, light, temperature, humidity = READING_STRUCT.unpack(payload)
+            self.track_sequence(sequence)
+            self.readings_decoded += 1
+            reading = SensorReading(float(soil), float(light), temperature / 100, humidity / 100, millis)
+            return payload, reading
+        if frame_type == FRAME_TEXT:
+            self.text_frames += 1
+            return payload[1:] + b'\n', None
+        self.unknown_frames += 1
+        return None
+
+    def track_sequence(self, sequence):
+        """일련번호가 건너뛴 만큼 유실로 기록 (16비트 순환)"""
+        if self.last_sequence is not None:
+            missing = (sequence - self.last_sequence - 1) & 0xFFFF
+            # 보드 재시작 등으로 번호가 크게 뒤로 가면 유실이 아닌 재동기화로 취급
+            if missing and missing < 0x8000:
+                self.sequence_gaps += 1
+                self.frames_lost += missing
+        self.last_sequence = sequence
+
+    def get_stats(self):
+        """디코딩/유실 통계 조회"""
+        return {
+            'frames_decoded': self.frames_decoded,
+            'readings_decoded': self.readings_decoded,
+            'text_frames': self.text_frames,
+            'cobs_errors': self.cobs_errors,
+            'crc_errors': self.crc_errors,
+            'unknown_frames': self.unknown_frames,
+            'sequence_gaps': self.sequence_gaps,
+            'frames_lost': self.frames_lost,
+            'bytes_per_frame': self.bytes_received / self.frames_decoded if self.frames_decoded else 0.0,
+        }
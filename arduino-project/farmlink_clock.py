@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Farm Link 보드 시계 모델
+아두이노 millis()(부팅 후 경과 ms, 32비트라 약 49.7일마다 0으로 돌아감)를 장치별로 호스트 시각에 대응시켜
+측정값마다 수신/업로드 시각이 아닌 실제 측정 시각을 붙임 (버퍼링, 배치, 재전송 지연과 무관)
+- 도착 시각 = 측정 시각 + 전송 지연(항상 0 이상)이므로, 최근 창을 구간으로 나눠 구간마다 지연이 가장 작은 점만
+  골라 기울기(보드 시계 빠르기, drift)를 최소제곱으로 추정하고 절편은 지연이 가장 작았던 점(하한선)에 맞춤
+  (백로그로 지연이 몰려도 기울기가 치우치지 않음)
+- 값이 범위 끝 근처에서 작은 값으로 돌아오면 롤오버로 보고 이어 붙이고,
+  그 외에 값이 줄었거나 모델보다 훨씬 이르게 도착하면 보드 재시작으로 보고 모델을 새로 시작
+- 호스트 시계가 조정되어도(NTP) 흔들리지 않도록 time.monotonic() 기준으로 맞춘 뒤 프레임별로 벽시계로 변환
+"""
+
+from collections import deque
+
+MILLIS_RANGE = 1 << 32
+# 이전 값이 범위 끝에서 이 안쪽(1시간)이고 새 값이 시작 근처일 때만 롤오버로 봄 (그 외 감소는 재시작)
+ROLLOVER_MARGIN = 3600 * 1000
+# 세라믹 공진자 보드의 오차는 ±0.5% 정도이므로 이보다 큰 기울기 추정은 버림
+MAX_DRIFT = 0.02
+
+
+class BoardClock:
+    """장치 하나의 millis() → 측정 시각 모델
+    window: 기울기/절편 추정에 쓰는 최근 점 수, min_span: 기울기를 추정하기 시작하는 최소 구간 (초)
+    max_error: 모델보다 이만큼(초) 이르게 도착하면 모델이 틀린 것으로 보고 새로 시작
+    """
+
+    def __init__(self, window=300, min_span=10.0, max_error=1.0, refit_every=8, segment=10, envelope=0.05):
+        self.window = window
+        # 기울기 추정: segment개 점마다 지연 최소점을 고르고, 하한선에서 envelope초 안쪽의 점만 사용
+        self.segment = segment
+        self.envelope = envelope
+        self.min_span = min_span
+        self.max_error = max_error
+        self.refit_every = refit_every
+        # (보드 경과 초, 도착 monotonic) 최근 점
+        self.points = deque(maxlen=window)
+        self.last_millis = None
+        # 롤오버로 더해 줄 ms (롤오버 횟수 × 2^32)
+        self.epoch = 0
+        # 정밀도를 위해 모델 시작 시점의 millis를 0으로 둠
+        self.origin = None
+        # 보드 1초당 호스트 초, 보드 경과 0초일 때의 monotonic 시각
+        self.slope = 1.0
+        self.intercept = None
+        self.since_fit = 0
+
+        self.samples = 0
+        self.rollovers = 0
+        self.resets = 0
+
+    def reset(self):
+        """모델을 버리고 다음 값부터 새로 시작"""
+        self.points.clear()
+        self.last_millis = None
+        self.epoch = 0
+        self.origin = None
+        self.slope = 1.0
+        self.intercept = None
+        self.since_fit = 0
+
+    def board_seconds(self, millis):
+        """롤오버를 이어 붙인 모델 시작 이후 보드 경과 초 (재시작이면 모델을 새로 시작)"""
+        millis = int(millis) % MILLIS_RANGE
+        if self.last_millis is not None and millis < self.last_millis:
+            if self.last_millis >= MILLIS_RANGE - ROLLOVER_MARGIN and millis < ROLLOVER_MARGIN:
+                self.epoch += MILLIS_RANGE
+                self.rollovers += 1
+            else:
+                self.resets += 1
+                self.reset()
+        if self.origin is None:
+            self.origin = millis
+        self.last_millis = millis
+        return (self.epoch + millis - self.origin) / 1000
+
+    def to_monotonic(self, millis, received_monotonic):
+        """millis 값의 측정 시각 추정 (time.monotonic() 기준, 도착 시각보다 늦지 않음)"""
+        self.samples += 1
+        board = self.board_seconds(millis)
+        if self.intercept is not None and received_monotonic - self.slope * board < self.intercept - self.max_error:
+            # 모델보다 훨씬 이르게 도착: 같은 범위로 재시작했거나 호스트가 절전에서 깨어남
+            self.resets += 1
+            self.reset()
+            board = self.board_seconds(millis)
+        self.points.append((board, received_monotonic))
+        self.since_fit += 1
+        if self.intercept is None or self.since_fit >= self.refit_every or len(self.points) < 16:
+            self.fit()
+        else:
+            # 지연이 더 작은 점이면 그 사이에는 절편만 낮춤
+            self.intercept = min(self.intercept, received_monotonic - self.slope * board)
+        return min(self.intercept + self.slope * board, received_monotonic)
+
+    def fit(self):
+        """창 안의 점으로 기울기(최소제곱)와 절편(하한선) 다시 계산"""
+        self.since_fit = 0
+        points = self.points
+        count = len(points)
+        if count >= 2 and points[-1][0] - points[0][0] >= self.min_span:
+            ordered = list(points)
+            # 구간별 지연 최소점 (기울기 1 기준의 차이로 비교하면 drift 영향은 무시할 만큼 작음)
+            lows = [min(ordered[i:i + self.segment], key=lambda point: point[1] - point[0])
+                    for i in range(0, count, self.segment)]
+            slope = least_squares_slope(lows)
+            if slope is not None:
+                # 구간 전체가 백로그로 밀린 점은 하한선에서 멀리 떨어지므로 빼고 한 번 더 맞춤
+                base = min(host - slope * board for board, host in lows)
+                near = [(board, host) for board, host in lows if host - slope * board - base <= self.envelope]
+                slope = least_squares_slope(near) or slope
+                if abs(slope - 1) <= MAX_DRIFT:
+                    self.slope = slope
+        self.intercept = min(host - self.slope * board for board, host in points)
+
+    def drift_ppm(self):
+        """보드 시계가 호스트보다 빠른 정도 (ppm, 양수면 보드 millis가 빠르게 증가)"""
+        return (1 / self.slope - 1) * 1e6
+
+    def get_stats(self):
+        delays = []
+        if self.intercept is not None:
+            delays = [host - self.slope * board - self.intercept for board, host in self.points]
+        return {
+            'samples': self.samples,
+            'rollovers': self.rollovers,
+            'resets': self.resets,
+            'drift_ppm': self.drift_ppm(),
+            'window_points': len(self.points),
+            'avg_delay_ms': sum(delays) / len(delays) * 1000 if delays else 0.0,
+        }
+
+
+def least_squares_slope(points):
+    """(x, y) 점들의 최소제곱 기울기 (점이 부족하면 None)"""
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    sxx = sum((x - mean_x) ** 2 for x, _ in points)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    return sxy / sxx if sxx > 0 else None
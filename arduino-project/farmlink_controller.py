@@ -8,24 +8,153 @@ import serial
 import time
 import sys
 import argparse
-import json
-import requests
+import random
 import threading
-from datetime import datetime
+
+from farmlink_api import FarmLinkApiClient
+from farmlink_binary import BINARY_ACK_TOKEN, BINARY_COMMAND, BinaryFrameDecoder
+from farmlink_clock import BoardClock
+from farmlink_deadband import DeadbandReporter, parse_deadbands
+from farmlink_filter import SensorFilter, load_filters
+from farmlink_metrics import REGISTRY, STAGE_SECONDS, MetricsServer, SamplingProfiler, install_profile_signal
+from farmlink_parser import looks_like_sensor_line
+from farmlink_pipeline import (HttpWriter, Parser, Pipeline, Sampler, Sink, Stage, clock_stage, decode,
+                               deadband_stage, enrich_stage, filter_stage, frame_source, output_sink, rollup_sink,
+                               store_sink)
+from farmlink_ports import PortLocator, claim_port, parse_usb_ids, release_port
+from farmlink_queue import UploadPipeline
+from farmlink_rollup import RollupUploader, parse_resolutions
+from farmlink_rules import RulesEngine, load_rules
+from farmlink_scheduler import JobScheduler
+from farmlink_store import TimeSeriesStore
+from farmlink_serial import PRIORITY_CONTROL, PRIORITY_STATUS, PRIORITY_THRESHOLD, SerialPortMux, wait_until_ready
+from farmlink_threshold import THRESHOLD_ACK_TOKEN, ThresholdCache, build_threshold_string
+
+# 포트 연결이 끊긴 시점부터 재연결하여 수집을 다시 시작하기까지의 시간 (평균 = 평균 복구 시간)
+RECOVERY_SECONDS = REGISTRY.histogram(
+    'farmlink_serial_recovery_seconds', '시리얼 포트가 끊긴 뒤 재연결까지 걸린 시간',
+    labelnames=('device_id',), buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
 
 class FarmLinkController:
-    def __init__(self, port='COM7', baudrate=9600):
+    def __init__(self, port='COM7', baudrate=9600, device_id='farmlink-001', batch_size=0,
+                 batch_age=5.0, queue_path=None, use_async=False, api_base_url="http://localhost:3000",
+                 session=None, upload_pipeline=None, sample_interval=5.0, threshold_long_poll=0,
+                 http_retries=2, rollup_resolutions=None, upload_raw=True, rollup_uploader=None,
+                 binary_baudrate=0, rules=None, store=None, auto_reconnect=True, usb_ids=None,
+                 stall_timeout=0, filters=None, filter_action='correct', deadbands=None, heartbeat=300.0,
+                 scheduler=None, ready_timeout=3.0, outputs=None):
         self.port = port
         self.baudrate = baudrate
+        # 포트를 연 뒤 보드의 시작 메시지를 기다리는 최대 시간 (준비되면 바로 진행)
+        self.ready_timeout = ready_timeout
+        self.ready_seconds = None
+        # port가 "auto"이면 USB VID:PID와 보드 확인으로 포트를 찾고, 포트를 지정했으면 그 포트가 다시 나타나길 기다림
+        # (usb_ids를 지정한 경우에만 지정한 포트 대신 같은 VID:PID의 다른 포트를 사용)
+        self.port_locator = PortLocator(port, baudrate, usb_ids=usb_ids)
+        # 포트가 끊기면(케이블 분리, 보드 재시작) 포트를 다시 찾아 백오프로 재연결하고 수집을 이어감
+        # stall_timeout > 0이면 연결은 살아 있어도 그 시간 동안 센서 데이터가 없을 때 재연결
+        self.auto_reconnect = auto_reconnect
+        self.stall_timeout = stall_timeout
+        self.max_reconnect_delay = 10.0
+        self.port_lost = threading.Event()
+        self.lost_at = None
+        self.connected_at = None
+        self.reconnect_lock = threading.Lock()
+        self.reconnect_job = None
+        self.reconnect_delay = None
+        self.stall_job = None
+        # 주기/1회 작업(임계치 동기화, 재연결, 데이터 끊김 확인)은 스케줄러의 워커 풀에서 실행
+        # 게이트웨이 모드에서는 모든 장치가 하나의 스케줄러를 공유 (시작/중지는 소유자가 담당)
+        self.owns_scheduler = scheduler is None
+        self.scheduler = scheduler or JobScheduler(workers=2)
+        # 0보다 크면 연결 시 보드와 협상하여 이 속도의 이진 프레임 모드로 전환 (실패하면 텍스트 유지)
+        self.binary_baudrate = binary_baudrate
+        self.device_id = device_id
         self.serial_conn = None
-        self.api_base_url = "http://localhost:3000"
+        self.api_base_url = api_base_url
+        # 모든 API 호출은 keep-alive 연결 풀과 재시도/서킷 브레이커를 갖춘 클라이언트 하나로 전송
+        # 게이트웨이 모드에서는 여러 장치가 하나의 클라이언트를 공유
+        self.owns_http = session is None
+        self.http = session or FarmLinkApiClient(api_base_url, retries=http_retries)
         self.data_collection_active = False
         self.data_thread = None
         self.threshold_sync_active = False
         self.threshold_sync_thread = None
+        self.threshold_sync_job = None
+        # 장치별 임계치 설정 캐시 (ETag 조건부 조회, 변경 시에만 아두이노에 전송)
+        self.threshold_cache = ThresholdCache(api_base_url=api_base_url, session=self.http)
+        # 0보다 크면 고정 주기 대신 서버 long-poll로 변경을 기다림 (초)
+        self.threshold_long_poll = threshold_long_poll
+        # 수신은 모든 프레임을 빠짐없이 읽고, 업로드 주기는 sample_interval로 별도 결정 (0이면 모두 업로드)
+        # 포트 읽기/쓰기는 연결 시 만드는 SerialPortMux 하나만 담당 (frame_reader와 같은 객체)
+        self.serial_mux = None
+        self.frame_reader = None
+        self.sample_interval = sample_interval
+        self.sampler = Sampler(sample_interval)
+        # deadbands(측정값별 폭 dict, {}이면 기본값)를 넘기면 값이 데드밴드 이상 바뀌었거나 heartbeat가 지났을 때만 업로드
+        self.deadband = DeadbandReporter(deadbands, heartbeat) if deadbands is not None else None
+        # 배치/큐 설정이 없으면 기존처럼 한 건씩 바로 전송
+        # upload_pipeline을 넘겨받은 경우 시작/중지는 소유자(게이트웨이)가 담당
+        self.owns_upload_pipeline = upload_pipeline is None
+        self.upload_pipeline = upload_pipeline
+        if upload_pipeline is None and (batch_size > 0 or queue_path):
+            self.upload_pipeline = UploadPipeline(
+                api_base_url=api_base_url,
+                batch_size=batch_size,
+                batch_age=batch_age,
+                queue_path=queue_path,
+                session=self.http
+            )
+        # 엣지 집계: 파싱한 모든 측정값을 구간별 min/max/avg/count로 요약하여 별도 업로드
+        # upload_raw가 False이면 원본 데이터는 올리지 않고 요약만 업로드
+        self.upload_raw = upload_raw
+        self.owns_rollup_uploader = rollup_uploader is None
+        self.rollup_uploader = rollup_uploader
+        if rollup_uploader is None and rollup_resolutions:
+            self.rollup_uploader = RollupUploader(
+                api_base_url=api_base_url,
+                resolutions=rollup_resolutions,
+                session=self.http,
+                queue_path=queue_path
+            )
+        # 장치별 처리량 통계 (수신/파싱 건수는 파이프라인의 parse 단계가 집계)
+        self.started_at = time.monotonic()
+        # 재연결 통계
+        self.port_losses = 0
+        self.reconnects = 0
+        self.reconnect_attempts = 0
+        self.total_recovery = 0.0
+        self.max_recovery = 0.0
+        # 로컬 시계열 저장소 (TimeSeriesStore): 파싱한 모든 측정값을 기록, 닫기는 소유자(main/게이트웨이)가 담당
+        self.store = store
+        # filters(측정값별 설정 dict, {}이면 기본값)를 넘기면 규칙/저장/업로드 전에 이상값을 보정하거나 버림
+        self.sensor_filter = SensorFilter(filters, filter_action) if filters is not None else None
+        # 규칙 목록을 넘기면 수신한 센서 데이터마다 바로 평가하여 제어 명령 전송 (None이면 사용 안 함)
+        self.rules_engine = RulesEngine(self, rules) if rules else None
+        # use_async가 True이면 스레드 대신 asyncio 이벤트 루프 하나에서 모든 작업 실행
+        self.async_engine = None
+        if use_async:
+            # asyncio는 불러오는 데만 수십 ms가 걸리므로 asyncio 모드에서만 로드
+            from farmlink_async import AsyncFarmLinkEngine
+            self.async_engine = AsyncFarmLinkEngine(self)
+        # 보드 millis()를 측정 시각으로 바꾸는 시계 모델 (롤오버/재시작은 값으로 감지하므로 재연결해도 유지)
+        self.board_clock = BoardClock()
+        # 수신 프레임 처리 경로: decode → parse → clock → filter → rules → 출력(로컬 이력, 집계, 업로드, 파일)
+        # outputs: 파싱한 모든 측정값을 JSON Lines로 기록할 파일 경로 목록 ('-'이면 표준 출력)
+        self.parser = Parser(on_fault=self.sensor_filter.record_fault if self.sensor_filter else None)
+        self.upload_writer = HttpWriter(self.http, api_base_url, batcher=self.upload_pipeline)
+        self.pipeline = self.build_pipeline(outputs or [])
+        # /metrics 엔드포인트에 장치별 통계 노출 (게이트웨이에서는 device_id 레이블로 구분)
+        REGISTRY.register_collector(self.collect_metrics)
         
     def connect(self):
         """시리얼 포트 연결"""
+        port = self.port_locator.locate()
+        if port is None:
+            print(f"❌ [{self.device_id}] 연결할 시리얼 포트를 찾지 못했습니다.")
+            return False
+        self.port = port
         try:
             self.serial_conn = serial.Serial(
                 port=self.port, 
@@ -38,52 +167,167 @@ class FarmLinkController:
                 rtscts=False,
                 dsrdtr=False
             )
-            time.sleep(2)  # 연결 안정화 대기
+            # 포트를 열면 보드가 재시작되므로 고정 시간 대신 시작 메시지(또는 센서 데이터)가 올 때까지만 대기
+            opened_at = time.monotonic()
+            ready, received = wait_until_ready(self.serial_conn, self.ready_timeout)
+            self.ready_seconds = time.monotonic() - opened_at
+            if ready:
+                print(f"⚡ 보드 준비 완료 ({self.ready_seconds:.2f}초)")
+            else:
+                print(f"⚠️ {self.ready_timeout}초 동안 보드 시작 메시지가 없어 그대로 진행합니다.")
+            # 이후 포트 접근은 모두 멀티플렉서를 거침 (asyncio 모드는 이벤트 루프가 수신 담당)
+            self.serial_mux = SerialPortMux(self.serial_conn)
+            # 대기 중에 읽은 줄(센서 데이터 포함)은 수신 경로로 넘김
+            if received:
+                self.serial_mux.feed(received)
+            self.serial_mux.on_port_lost = self.handle_port_lost
+            self.frame_reader = self.serial_mux
+            if self.binary_baudrate:
+                self.negotiate_binary_mode()
+            self.serial_mux.start(read=self.async_engine is None)
+            # 포트를 열면 보드가 재시작되므로 임계치 설정을 다시 보내야 함
+            self.threshold_cache.invalidate_sent(self.device_id)
+            claim_port(self.port)
+            self.port_locator.last_port = self.port
+            self.connected_at = time.monotonic()
+            self.port_lost.clear()
             print(f"✅ {self.port} 포트에 연결되었습니다.")
             return True
         except Exception as e:
             print(f"❌ 시리얼 포트 연결 실패: {e}")
+            if self.serial_conn and self.serial_conn.is_open:
+                self.serial_conn.close()
+            return False
+    
+    def handle_port_lost(self, error):
+        """포트 읽기/쓰기 오류 또는 데이터 끊김 시 호출 (수집 중이면 재연결 예약)"""
+        if self.lost_at is None:
+            self.lost_at = time.monotonic()
+            self.port_losses += 1
+        self.port_lost.set()
+        if self.auto_reconnect and self.data_collection_active:
+            self.schedule_reconnect(0)
+    
+    def schedule_reconnect(self, delay):
+        """재연결 시도를 delay초 뒤로 예약 (이미 예약되어 있으면 무시)"""
+        with self.reconnect_lock:
+            if self.reconnect_job is None:
+                self.reconnect_job = self.scheduler.call_later(delay, self.reconnect_attempt, 'reconnect',
+                                                               self.device_id)
+    
+    def close_port(self):
+        """멀티플렉서를 멈추고 포트를 닫음 (수집/동기화 작업은 유지)"""
+        if self.serial_mux:
+            self.serial_mux.stop()
+        if self.serial_conn:
+            try:
+                self.serial_conn.close()
+            except Exception:
+                pass
+        release_port(self.port)
+    
+    def check_stall(self):
+        """포트는 열려 있지만 보드가 멈춰 stall_timeout 동안 데이터가 오지 않으면 재연결 (주기 작업)"""
+        last_activity = max(self.parser.last_parsed_at or 0, self.connected_at or 0)
+        if not self.port_lost.is_set() and last_activity and time.monotonic() - last_activity > self.stall_timeout:
+            print(f"⚠️ [{self.device_id}] {self.stall_timeout}초 동안 센서 데이터가 없어 다시 연결합니다.")
+            self.handle_port_lost("센서 데이터 없음")
+    
+    def reconnect_attempt(self):
+        """재연결 한 번 시도 (1회 작업, 실패하면 지터 백오프 0.5초 → 최대 10초 뒤 다시 예약)"""
+        with self.reconnect_lock:
+            self.reconnect_job = None
+        if not self.data_collection_active or not self.port_lost.is_set():
             return False
+        if self.reconnect_delay is None:
+            # 끊긴 뒤 첫 시도: 이전 포트를 정리
+            self.close_port()
+            self.reconnect_delay = 0.5
+        self.reconnect_attempts += 1
+        if not self.connect():
+            delay = random.uniform(self.reconnect_delay / 2, self.reconnect_delay)
+            self.reconnect_delay = min(self.reconnect_delay * 2, self.max_reconnect_delay)
+            self.schedule_reconnect(delay)
+            return False
+        self.reconnect_delay = None
+        
+        recovery = time.monotonic() - (self.lost_at or time.monotonic())
+        self.lost_at = None
+        self.reconnects += 1
+        self.total_recovery += recovery
+        self.max_recovery = max(self.max_recovery, recovery)
+        RECOVERY_SECONDS.observe(recovery, device_id=self.device_id)
+        print(f"🔁 [{self.device_id}] {self.port} 재연결 완료 ({recovery:.1f}초 만에 복구)")
+        # asyncio 모드는 수신 작업이 이전 포트의 fd를 등록하고 있으므로 다시 시작
+        if self.async_engine and self.data_collection_active:
+            self.async_engine.stop_task('data_collection')
+            self.async_engine.start_task('data_collection', self.async_engine.data_collection)
+        return True
+    
+    def negotiate_binary_mode(self, timeout=2.0):
+        """보드에 이진 프레임 모드와 통신 속도 전환을 요청 (수신 스레드 시작 전, 연결 직후에만 호출)"""
+        self.serial_conn.write(BINARY_COMMAND.format(baudrate=self.binary_baudrate).encode('utf-8'))
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            line = self.serial_conn.readline()
+            if not line:
+                continue
+            if BINARY_ACK_TOKEN in line and not looks_like_sensor_line(line):
+                # 보드는 확인 응답을 보낸 뒤 전환하므로 응답을 받은 다음 속도를 바꿈
+                self.serial_conn.baudrate = self.binary_baudrate
+                self.serial_mux.use_frame_decoder(BinaryFrameDecoder())
+                print(f"⚡ 이진 프레임 모드: {self.baudrate} → {self.binary_baudrate} bps")
+                return True
+            # 협상 중 도착한 센서 데이터도 빠뜨리지 않고 데이터 경로로 넘김
+            self.serial_mux.feed(line)
+        print("⚠️ 보드가 이진 프레임 모드에 응답하지 않아 텍스트 형식을 사용합니다.")
+        return False
     
     def disconnect(self):
         """시리얼 포트 연결 해제"""
         self.stop_data_collection()
         self.stop_threshold_sync()
+        if self.owns_scheduler:
+            self.scheduler.stop()
+        REGISTRY.unregister_collector(self.collect_metrics)
+        self.pipeline.close()
+        if self.async_engine:
+            self.async_engine.stop()
+        if self.upload_pipeline is not None and self.owns_upload_pipeline:
+            self.upload_pipeline.close()
+        if self.rollup_uploader and self.owns_rollup_uploader:
+            self.rollup_uploader.close()
+        if self.owns_http:
+            self.http.close()
+        if self.serial_mux:
+            self.serial_mux.stop()
+        release_port(self.port)
         if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.close()
             print("🔌 시리얼 포트 연결이 해제되었습니다.")
     
-    def get_active_threshold_config(self, device_id='farmlink-001'):
-        """활성화된 임계치 설정 조회"""
+    def get_active_threshold_config(self, device_id=None, wait=0):
+        """활성화된 임계치 설정 조회 (캐시된 ETag로 조건부 조회, wait > 0이면 long-poll)"""
+        device_id = device_id or self.device_id
         try:
-            response = requests.get(
-                f"{self.api_base_url}/api/threshold-configs/{device_id}/active",
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('success') and result.get('data'):
-                    print(f"✅ 활성화된 임계치 설정 조회 성공: {result['data']['config_name']}")
-                    return result['data']
-                else:
-                    print(f"⚠️ 활성화된 임계치 설정이 없습니다: {result.get('message', 'Unknown error')}")
-                    return None
-            else:
-                print(f"⚠️ API 서버 오류: {response.status_code}")
-                return None
-                
-        except requests.exceptions.RequestException as e:
-            print(f"⚠️ 네트워크 오류: {e}")
-            return None
+            config, changed = self.threshold_cache.fetch(device_id, wait=wait)
         except Exception as e:
             print(f"⚠️ 임계치 설정 조회 오류: {e}")
-            return None
+            return self.threshold_cache.get(device_id)
+        
+        if changed:
+            if config:
+                print(f"✅ 활성화된 임계치 설정 변경 감지: {config['config_name']}")
+            else:
+                print("⚠️ 활성화된 임계치 설정이 없습니다.")
+        return config
     
-    def send_threshold_config_to_arduino(self, device_id='farmlink-001'):
-        """활성화된 임계치 설정을 아두이노에 전송"""
-        # API에서 활성화된 임계치 설정 조회
-        threshold_config = self.get_active_threshold_config(device_id)
+    def send_threshold_config_to_arduino(self, device_id=None, threshold_config=None):
+        """활성화된 임계치 설정을 아두이노에 전송 (마지막으로 보낸 값과 같으면 건너뜀)"""
+        device_id = device_id or self.device_id
+        # 조회한 설정을 넘겨받지 않은 경우에만 캐시/API에서 가져옴
+        if threshold_config is None:
+            threshold_config = self.threshold_cache.get(device_id) or self.get_active_threshold_config(device_id)
         
         if not threshold_config:
             print("❌ 전송할 임계치 설정이 없습니다.")
@@ -91,168 +335,298 @@ class FarmLinkController:
         
         # 아두이노에 전송할 간단한 문자열 데이터 구성
         # 형식: "M:69,D:68,T:30,H:66//"
-        soil_moisture = int(threshold_config.get('soil_moisture_threshold', 20))
-        light_intensity = int(threshold_config.get('light_intensity_threshold', 60))
-        temperature = int(threshold_config.get('temperature_threshold', 30.0))
-        humidity = int(threshold_config.get('humidity_threshold', 70.0))
-        
-        threshold_string = f"M:{soil_moisture},D:{light_intensity},T:{temperature},H:{humidity}//"
+        threshold_string = build_threshold_string(threshold_config)
+        if not self.threshold_cache.needs_push(device_id, threshold_string):
+            return True
         
-        if not self.serial_conn or not self.serial_conn.is_open:
+        if not self.serial_mux or not self.serial_conn.is_open:
             print("❌ 시리얼 포트가 연결되지 않았습니다.")
             return False
         
-        try:
-            # 간단한 문자열 데이터를 시리얼로 전송
-            command_bytes = threshold_string.encode('utf-8')
-            self.serial_conn.write(command_bytes)
-            print(f"📤 임계치 설정 전송: {threshold_config['config_name']}")
-            print(f"📋 전송 데이터: {threshold_string}")
-            
-            # 응답 대기
-            time.sleep(1)
-            if self.serial_conn.in_waiting > 0:
-                response = self.serial_conn.readline().decode('utf-8').strip()
-                print(f"📥 아두이노 응답: {response}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ 임계치 설정 전송 실패: {e}")
-            return False
+        # 쓰기 큐에 넣고 바로 반환 (응답 줄은 멀티플렉서가 이 명령에 연결하고 왕복 지연을 기록)
+        # 보드의 '임계치' 응답이 와야 전송 완료로 기록 (깨지거나 응답이 없으면 다음 동기화에서 다시 전송)
+        self.threshold_cache.mark_pending(device_id, threshold_string)
+        self.serial_mux.submit(threshold_string, name='threshold', priority=PRIORITY_THRESHOLD,
+                               expect=THRESHOLD_ACK_TOKEN,
+                               on_done=lambda command: self.threshold_push_done(device_id, threshold_string, command))
+        print(f"📤 임계치 설정 전송: {threshold_config['config_name']}")
+        print(f"📋 전송 데이터: {threshold_string}")
+        return True
     
-    def parse_sensor_data(self, line):
-        """시리얼 데이터에서 센서 값 파싱 (JSON 형태)"""
-        try:
-            # JSON 형태의 데이터인지 확인
-            if line.startswith('{') and line.endswith('}'):
-                data = json.loads(line)
-                return data
-            else:
-                # 기존 텍스트 형태의 데이터 처리 (백업)
-                data = {}
-                
-                # 수분량 추출
-                if "수분량:" in line:
-                    moisture_start = line.find("수분량:") + 4
-                    moisture_end = line.find("%", moisture_start)
-                    data['soil_moisture'] = float(line[moisture_start:moisture_end].strip())
-                
-                # 조도 추출
-                if "조도:" in line:
-                    light_start = line.find("조도:") + 3
-                    light_end = line.find("ph", light_start)
-                    data['light_intensity'] = float(line[light_start:light_end].strip())
-                
-                # 온도 추출
-                if "온도:" in line:
-                    temp_start = line.find("온도:") + 3
-                    temp_end = line.find("°C", temp_start)
-                    data['temperature'] = float(line[temp_start:temp_end].strip())
-                
-                # 습도 추출
-                if "습도:" in line:
-                    humidity_start = line.find("습도:") + 3
-                    humidity_end = line.find("%", humidity_start)
-                    data['humidity'] = float(line[humidity_start:humidity_end].strip())
-                
-                return data if len(data) == 4 else None
-                
-        except (ValueError, IndexError, json.JSONDecodeError) as e:
-            print(f"데이터 파싱 오류: {e}")
+    def threshold_push_done(self, device_id, threshold_string, command):
+        """임계치 전송 명령 종료 처리 (쓰기 스레드에서 호출)"""
+        if command.response is not None and command.error is None:
+            self.threshold_cache.mark_sent(device_id, threshold_string)
+        else:
+            self.threshold_cache.invalidate_sent(device_id)
+            print(f"⚠️ 임계치 설정 응답 없음: {command.error or '시간 초과'} (다음 동기화에서 다시 전송)")
+    
+    def send_command(self, command, wait=True, timeout=2.0):
+        """아두이노에 제어 명령 전송 (wait이면 응답 줄을 기다려 반환)"""
+        if not self.serial_mux or not self.serial_conn.is_open:
+            print("❌ 시리얼 포트가 연결되지 않았습니다.")
+            return None
+        
+        priority = PRIORITY_CONTROL if command.startswith('control:') else PRIORITY_STATUS
+        serial_command = self.serial_mux.submit(command + '\n', name=command.split(':')[0],
+                                                priority=priority, timeout=timeout)
+        print(f"📤 명령 전송: {command}")
+        if not wait:
+            return serial_command
+        
+        response = serial_command.wait()
+        if serial_command.error:
             return None
+        if response:
+            print(f"📥 응답: {self.decode_line(response.raw)} ({serial_command.round_trip * 1000:.0f}ms)")
+        return serial_command
     
-    def send_to_api(self, data):
-        """API 서버를 통해 데이터 전송"""
+    def log_control_action(self, action, duration, triggered_by='manual'):
+        """API 서버를 통해 제어 로그 기록"""
         try:
-            # 타임스탬프 처리
-            if 'timestamp' in data:
-                # 아두이노의 millis() 값이면 현재 시간으로 변환
-                if isinstance(data['timestamp'], (int, float)):
-                    data['timestamp'] = datetime.now().isoformat()
-            else:
-                # 타임스탬프가 없으면 현재 시간 추가
-                data['timestamp'] = datetime.now().isoformat()
-            
-            # API 서버 호출
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.post(
-                f"{self.api_base_url}/api/sensor-data",
-                headers=headers,
-                json=data,
-                timeout=10
+            response = self.http.post(
+                f"{self.api_base_url}/api/control-logs",
+                json={
+                    'device_id': self.device_id,
+                    'action': action,
+                    'duration': duration,
+                    'triggered_by': triggered_by
+                }
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('success'):
-                    print(f"✓ API 전송 성공: {data.get('soil_moisture', 'N/A')}% 수분, {data.get('temperature', 'N/A')}°C")
-                    return True
-                else:
-                    print(f"✗ API 전송 실패: {result.get('error', 'Unknown error')}")
-                    return False
-            else:
-                print(f"✗ API 서버 오류: {response.status_code} - {response.text}")
-                return False
-                
-        except requests.exceptions.RequestException as e:
-            print(f"✗ 네트워크 오류: {e}")
+            if response.status_code == 200 and response.json().get('success'):
+                return True
+            print(f"⚠️ 제어 로그 기록 실패: {response.status_code}")
             return False
         except Exception as e:
-            print(f"✗ 예상치 못한 오류: {e}")
+            print(f"⚠️ 제어 로그 기록 오류: {e}")
             return False
     
+    def build_pipeline(self, outputs):
+        """장치의 수집 파이프라인 구성 (단계와 출력은 사용하는 기능에 따라 추가)"""
+        stages = [Stage('decode_text', decode), Stage('parse', self.parser), clock_stage(self.board_clock)]
+        # 이상값은 규칙 평가, 로컬 이력/집계, 업로드 전에 보정하거나 버림
+        if self.sensor_filter:
+            stages.append(filter_stage(self.sensor_filter))
+        # 규칙 평가는 업로드/샘플링을 기다리지 않고 수신 즉시 수행
+        if self.rules_engine:
+            stages.append(Stage('rules', self.evaluate_rules))
+        
+        # 로컬 이력과 집계는 샘플링과 무관하게 파싱한 모든 측정값을 사용
+        sinks = []
+        if self.store:
+            sinks.append(store_sink(self.store, self.device_id))
+        if self.rollup_uploader:
+            sinks.append(rollup_sink(self.rollup_uploader, self.device_id))
+        sinks.extend(output_sink(path, self.device_id) for path in outputs)
+        # 원본 업로드: 샘플링 주기와 변화 보고로 고른 측정값만, 측정 시각을 붙여 업로드
+        # 한 건씩 전송할 때는 큐 뒤의 전송 스레드가 담당하여 느린 서버가 수신/규칙 평가를 막지 않음 (큐가 차면 수신 쪽이 기다림)
+        # 배치/디스크 큐(upload_pipeline)는 넣기만 하므로 바로 넘김
+        if self.upload_raw or not self.rollup_uploader:
+            upload_stages = [Stage('sample', self.sampler)]
+            if self.deadband:
+                upload_stages.append(deadband_stage(self.deadband))
+            upload_stages.append(enrich_stage(self.device_id))
+            queue_size = 0 if self.upload_pipeline is not None else 100
+            workers = self.async_engine.max_concurrent_uploads if self.async_engine else 1
+            sinks.append(Sink('upload', self.upload_writer, upload_stages, queue_size=queue_size, workers=workers))
+        return Pipeline(stages, sinks)
+    
+    def evaluate_rules(self, record):
+        # mark 모드의 튄 값은 보정 없이 표시만 되므로 제어 판단에 쓰지 않음 (순간 수분 급락으로 펌프가 돌지 않도록)
+        # 업로드/로컬 이력에는 flags와 함께 그대로 남음
+        if record.data.get('flags') and self.sensor_filter.action == 'mark':
+            self.rules_engine.outliers_skipped += 1
+            return record
+        self.rules_engine.evaluate(record.data, record.received_monotonic)
+        return record
+
+    def decode_line(self, raw_data):
+        """시리얼 바이트 데이터를 로그 출력용 문자열로 변환"""
+        # 파싱은 bytes에서 바로 하므로 디코딩은 출력용으로 한 번만 수행
+        return raw_data.decode('utf-8', errors='replace').strip()
+    
+    def upload_stats(self):
+        """업로드 출력의 (전송 성공, 실패) 건수"""
+        upload = self.pipeline.sink('upload')
+        return (upload.written, upload.failed) if upload else (0, 0)
+    
+    def get_stats(self):
+        """장치별 처리량 통계 조회"""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        parser = self.parser
+        uploaded, upload_failures = self.upload_stats()
+        return {
+            'device_id': self.device_id,
+            'port': self.port,
+            'ready_sec': self.ready_seconds,
+            'lines_received': parser.lines_received,
+            'readings_parsed': parser.readings_parsed,
+            'parse_failures': parser.parse_failures,
+            'readings_uploaded': uploaded,
+            'upload_failures': upload_failures,
+            'readings_skipped': self.sampler.skipped,
+            'readings_per_min': parser.readings_parsed / elapsed * 60,
+            'last_reading_age_sec': time.monotonic() - parser.last_parsed_at if parser.last_parsed_at else None,
+            'pipeline': self.pipeline.get_stats(),
+            'clock': self.board_clock.get_stats(),
+            'serial': self.frame_reader.get_stats() if self.frame_reader else None,
+            'threshold': self.threshold_cache.get_stats(),
+            'rollup': self.rollup_uploader.get_stats() if self.rollup_uploader and self.owns_rollup_uploader else None,
+            'rules': self.rules_engine.get_stats() if self.rules_engine else None,
+            'store': self.store.get_stats() if self.store else None,
+            'filter': self.sensor_filter.get_stats() if self.sensor_filter else None,
+            'deadband': self.deadband.get_stats() if self.deadband else None,
+            'scheduler': self.scheduler.get_stats() if self.owns_scheduler else None,
+            'reconnect': {
+                'connected': not self.port_lost.is_set() and self.serial_mux is not None,
+                'port_losses': self.port_losses,
+                'reconnects': self.reconnects,
+                'attempts': self.reconnect_attempts,
+                'mttr_sec': self.total_recovery / self.reconnects if self.reconnects else None,
+                'max_recovery_sec': self.max_recovery,
+            },
+        }
+    
+    def collect_metrics(self):
+        """/metrics용 장치별 카운터/게이지"""
+        labels = {'device_id': self.device_id}
+        threshold = self.threshold_cache.get_stats()
+        parser = self.parser
+        uploaded, upload_failures = self.upload_stats()
+        metrics = [
+            ('farmlink_lines_received_total', 'counter', '시리얼에서 받은 줄 수', [(labels, parser.lines_received)]),
+            ('farmlink_readings_parsed_total', 'counter', '파싱한 센서 데이터 수', [(labels, parser.readings_parsed)]),
+            ('farmlink_parse_failures_total', 'counter', '센서 형식이지만 파싱하지 못한 줄 수',
+             [(labels, parser.parse_failures)]),
+            ('farmlink_readings_skipped_total', 'counter', '샘플링 주기로 업로드하지 않은 데이터 수',
+             [(labels, self.sampler.skipped)]),
+            ('farmlink_readings_uploaded_total', 'counter', '업로드 경로에 넘긴 센서 데이터 수',
+             [(labels, uploaded)]),
+            ('farmlink_upload_failures_total', 'counter', '업로드에 실패한 센서 데이터 수',
+             [(labels, upload_failures)]),
+            ('farmlink_threshold_requests_total', 'counter', '임계치 설정 조회 수',
+             [(labels, threshold['requests_sent'])]),
+            ('farmlink_threshold_not_modified_total', 'counter', '변경 없음(304) 응답 수',
+             [(labels, threshold['not_modified'])]),
+            ('farmlink_threshold_pushes_total', 'counter', '아두이노에 전송한 임계치 설정 수',
+             [(labels, threshold['pushes'])]),
+            ('farmlink_serial_connected', 'gauge', '시리얼 포트 연결 여부 (1: 연결, 0: 재연결 중)',
+             [(labels, 0 if self.port_lost.is_set() or self.serial_mux is None else 1)]),
+            ('farmlink_serial_port_losses_total', 'counter', '시리얼 포트 연결이 끊긴 횟수', [(labels, self.port_losses)]),
+            ('farmlink_serial_reconnect_attempts_total', 'counter', '재연결 시도 횟수',
+             [(labels, self.reconnect_attempts)]),
+            ('farmlink_serial_mttr_seconds', 'gauge', '평균 복구 시간 (끊김부터 재연결까지)',
+             [(labels, self.total_recovery / self.reconnects if self.reconnects else 0.0)]),
+        ]
+        metrics.extend(self.pipeline.collect_metrics(labels))
+        clock = self.board_clock.get_stats()
+        metrics.extend([
+            ('farmlink_board_clock_drift_ppm', 'gauge', '호스트 시계 대비 보드 millis() 오차 (ppm)',
+             [(labels, clock['drift_ppm'])]),
+            ('farmlink_board_clock_rollovers_total', 'counter', 'millis() 32비트 롤오버 횟수',
+             [(labels, clock['rollovers'])]),
+            ('farmlink_board_clock_resets_total', 'counter', '보드 재시작으로 시계 모델을 새로 시작한 횟수',
+             [(labels, clock['resets'])]),
+        ])
+        mux = self.serial_mux
+        if mux:
+            metrics.extend([
+                ('farmlink_serial_bytes_read_total', 'counter', '시리얼에서 읽은 바이트 수', [(labels, mux.bytes_read)]),
+                ('farmlink_serial_frames_overwritten_total', 'counter', '링 버퍼가 가득 차 버린 프레임 수',
+                 [(labels, mux.frames_overwritten)]),
+                ('farmlink_serial_read_errors_total', 'counter', '시리얼 읽기 오류 수', [(labels, mux.read_errors)]),
+                ('farmlink_serial_backlog_frames', 'gauge', '처리를 기다리는 프레임 수', [(labels, mux.backlog_depth())]),
+                ('farmlink_serial_os_backlog_bytes', 'gauge', 'OS 시리얼 버퍼에 남은 바이트 수',
+                 [(labels, mux.os_backlog_bytes())]),
+                ('farmlink_serial_oldest_frame_age_seconds', 'gauge', '가장 오래 기다린 프레임의 대기 시간',
+                 [(labels, mux.oldest_frame_age())]),
+                ('farmlink_serial_write_queue_depth', 'gauge', '전송을 기다리는 명령 수',
+                 [(labels, mux.write_queue_depth())]),
+                ('farmlink_serial_response_timeouts_total', 'counter', '응답 없이 시간 초과된 명령 수',
+                 [(labels, mux.response_timeouts)]),
+                ('farmlink_serial_round_trip_seconds_max', 'gauge', '명령 종류별 최대 왕복 지연',
+                 [(dict(labels, command=name), maximum) for name, (_, _, maximum) in list(mux.round_trips.items())]),
+            ])
+        if self.sensor_filter:
+            sensor_filter = self.sensor_filter.get_stats()
+            metrics.extend([
+                ('farmlink_filter_readings_total', 'counter', '이상값 처리 결과별 센서 데이터 수',
+                 [(dict(labels, result=result), sensor_filter[result]) for result in ('dropped', 'corrected', 'marked')]),
+                ('farmlink_filter_samples_total', 'counter', '측정값별 이상값 판정 수 (reason: invalid/range/rate/hampel)',
+                 [(dict(labels, metric=name, reason=reason), count)
+                  for name, metric in sensor_filter['metrics'].items()
+                  for reason, count in list(metric['rejected'].items()) + list(metric['spikes'].items())]),
+                ('farmlink_sensor_faults_total', 'counter', '센서 읽기 실패 메시지 수',
+                 [(labels, sensor_filter['sensor_faults'])]),
+            ])
+        if self.deadband:
+            deadband = self.deadband.get_stats()
+            metrics.extend([
+                ('farmlink_deadband_readings_total', 'counter', '변화 보고 판정 결과별 센서 데이터 수',
+                 [(dict(labels, result=reason), count) for reason, count in deadband['reported'].items()]
+                 + [(dict(labels, result='suppressed'), deadband['suppressed'])]),
+                ('farmlink_deadband_suppression_ratio', 'gauge', '변화가 없어 업로드하지 않은 비율',
+                 [(labels, deadband['suppression_ratio'])]),
+            ])
+        if self.rules_engine:
+            metrics.append(('farmlink_rule_fired_total', 'counter', '규칙이 제어 명령을 보낸 횟수',
+                            [(dict(labels, rule=rule.name), rule.fired) for rule in self.rules_engine.rules]))
+        if mux and mux.frame_decoder:
+            binary = mux.frame_decoder.get_stats()
+            metrics.extend([
+                ('farmlink_binary_frames_decoded_total', 'counter', '검증을 통과한 이진 프레임 수',
+                 [(labels, binary['frames_decoded'])]),
+                ('farmlink_binary_crc_errors_total', 'counter', 'CRC/COBS 오류로 버린 이진 프레임 수',
+                 [(labels, binary['crc_errors'] + binary['cobs_errors'])]),
+                ('farmlink_binary_frames_lost_total', 'counter', '일련번호로 확인한 유실 프레임 수',
+                 [(labels, binary['frames_lost'])]),
+            ])
+        return metrics
+    
     def data_collection_worker(self):
         """데이터 수집 워커 스레드"""
         print("📊 센서 데이터 수집 시작...")
         
+        # 멀티플렉서의 수신 스레드가 포트에서 모든 프레임을 읽어 링 버퍼에 보관 (명령 응답은 제외)
+        # 이 스레드는 링 버퍼에서 꺼낸 프레임을 파이프라인 단계에 통과시켜 출력으로 넘김
         while self.data_collection_active:
             try:
-                if self.serial_conn and self.serial_conn.in_waiting > 0:
-                    # 바이트 데이터 읽기
-                    raw_data = self.serial_conn.readline()
-                    if raw_data:
-                        # 여러 인코딩 시도
-                        line = None
-                        for encoding in ['utf-8', 'latin-1', 'cp1252']:
-                            try:
-                                line = raw_data.decode(encoding).strip()
-                                break
-                            except UnicodeDecodeError:
-                                continue
-                        
-                        # 모든 인코딩 실패 시 에러 무시하고 처리
-                        if line is None:
-                            line = raw_data.decode('utf-8', errors='ignore').strip()
-                        
-                        # JSON 데이터 또는 텍스트 데이터 처리
-                        if line and (line.startswith('{') or "수분량:" in line):
-                            print(f"📡 수신된 데이터: {line}")
-                            
-                            # 데이터 파싱
-                            sensor_data = self.parse_sensor_data(line)
-                            
-                            if sensor_data and len(sensor_data) >= 4:
-                                # API 서버로 전송
-                                self.send_to_api(sensor_data)
-                            else:
-                                print(f"✗ 데이터 파싱 실패: {line}")
-                
-                time.sleep(5)  # 5초마다 데이터 수집
-                
+                self.pipeline.run(frame_source(lambda: self.frame_reader, lambda: self.data_collection_active,
+                                               idle=self.wait_for_port))
             except Exception as e:
                 print(f"데이터 수집 오류: {e}")
                 time.sleep(1)
     
+    def wait_for_port(self):
+        """재연결 중에는 멈춘 멀티플렉서가 바로 반환하므로 잠시 대기"""
+        if self.port_lost.is_set():
+            time.sleep(0.5)
+    
     def start_data_collection(self):
         """데이터 수집 시작"""
         if not self.data_collection_active:
             self.data_collection_active = True
-            self.data_thread = threading.Thread(target=self.data_collection_worker, daemon=True)
-            self.data_thread.start()
+            if self.upload_pipeline is not None and self.owns_upload_pipeline:
+                self.upload_pipeline.start()
+            self.pipeline.start()
+            if self.rollup_uploader and self.owns_rollup_uploader:
+                self.rollup_uploader.start()
+            if self.rules_engine:
+                self.rules_engine.start()
+            if self.async_engine:
+                if self.serial_mux:
+                    self.async_engine.start_task('data_collection', self.async_engine.data_collection)
+            else:
+                self.data_thread = threading.Thread(target=self.data_collection_worker, daemon=True)
+                self.data_thread.start()
+            if self.owns_scheduler:
+                self.scheduler.start()
+            if self.auto_reconnect:
+                # 아직 연결되지 않은 장치는 보드가 꽂히면 연결 (핫플러그)
+                if self.serial_mux is None:
+                    self.handle_port_lost("연결 안 됨")
+                if self.stall_timeout:
+                    self.stall_job = self.scheduler.every(1.0, self.check_stall, 'stall_check', self.device_id)
             print("✅ 데이터 수집이 시작되었습니다.")
         else:
             print("⚠️ 데이터 수집이 이미 실행 중입니다.")
@@ -261,30 +635,53 @@ class FarmLinkController:
         """데이터 수집 중지"""
         if self.data_collection_active:
             self.data_collection_active = False
+            if self.async_engine:
+                self.async_engine.stop_task('data_collection')
             if self.data_thread:
-                self.data_thread.join(timeout=1)
+                self.data_thread.join(timeout=3)
+            self.scheduler.cancel(self.stall_job)
+            with self.reconnect_lock:
+                self.scheduler.cancel(self.reconnect_job)
+                self.reconnect_job = None
+                self.reconnect_delay = None
+            # 출력 큐에 남은 측정값을 업로드 경로에 모두 넘긴 뒤 업로드 경로 정리
+            self.pipeline.stop()
+            if self.upload_pipeline is not None and self.owns_upload_pipeline:
+                self.upload_pipeline.stop()
+            if self.rollup_uploader and self.owns_rollup_uploader:
+                self.rollup_uploader.stop()
+            if self.rules_engine:
+                self.rules_engine.stop()
             print("⏹️ 데이터 수집이 중지되었습니다.")
     
+    def sync_threshold_config(self, wait=0):
+        """활성화된 임계치 설정을 재검증하고 값이 바뀐 경우에만 아두이노에 전송"""
+        config = self.get_active_threshold_config(self.device_id, wait=wait)
+        
+        # long-poll 대기는 제외하고 비교/전송만 측정 (조회 지연은 farmlink_http_request_seconds)
+        if config:
+            with STAGE_SECONDS.time(stage='threshold_sync'):
+                return self.send_threshold_config_to_arduino(self.device_id, config)
+        return False
+    
+    def run_threshold_sync(self):
+        """임계치 동기화 한 번 실행 (7초 주기 예약 작업)"""
+        try:
+            self.sync_threshold_config()
+        except Exception as e:
+            print(f"❌ 임계치 동기화 오류: {e}")
+    
     def threshold_sync_worker(self):
-        """임계치 동기화 워커 스레드 (7초마다 실행)"""
-        print("🔄 임계치 동기화 시작...")
+        """long-poll 임계치 동기화 워커 스레드 (응답을 최대 long-poll 시간까지 기다리므로 워커 풀 대신 전용 스레드)"""
+        print(f"🔄 임계치 동기화 시작... (변경 대기 최대 {self.threshold_long_poll}초)")
         
         while self.threshold_sync_active:
             try:
-                # 활성화된 임계치 설정 조회
-                print("📋 활성화된 임계치 설정 조회 중...")
-                config = self.get_active_threshold_config()
-                
-                if config:
-                    # 아두이노에 임계치 설정 전송
-                    print("📤 임계치 설정을 아두이노에 전송 중...")
-                    self.send_threshold_config_to_arduino()
-                else:
-                    print("⚠️ 활성화된 임계치 설정이 없습니다.")
-                
-                # 7초 대기
-                time.sleep(7)
+                self.sync_threshold_config(wait=self.threshold_long_poll)
                 
+                # long-poll은 서버가 변경 시까지 응답을 보류하므로 바로 다시 요청
+                time.sleep(1)
+            
             except Exception as e:
                 print(f"❌ 임계치 동기화 오류: {e}")
                 time.sleep(7)
@@ -293,8 +690,19 @@ class FarmLinkController:
         """임계치 동기화 시작"""
         if not self.threshold_sync_active:
             self.threshold_sync_active = True
-            self.threshold_sync_thread = threading.Thread(target=self.threshold_sync_worker, daemon=True)
-            self.threshold_sync_thread.start()
+            if self.async_engine:
+                self.async_engine.start_task('threshold_sync', self.async_engine.threshold_sync)
+            elif self.threshold_long_poll:
+                self.threshold_sync_thread = threading.Thread(target=self.threshold_sync_worker, daemon=True)
+                self.threshold_sync_thread.start()
+            else:
+                # 작업 소요 시간과 무관하게 7초 주기로 실행 (장치가 많으면 지터로 분산), 밀린 실행은 건너뜀
+                print("🔄 임계치 동기화 시작... (7초 주기)")
+                if self.owns_scheduler:
+                    self.scheduler.start()
+                self.threshold_sync_job = self.scheduler.every(
+                    7.0, self.run_threshold_sync, 'threshold_sync', self.device_id, jitter=0.5, first_delay=0
+                )
             print("✅ 임계치 동기화가 시작되었습니다.")
         else:
             print("⚠️ 임계치 동기화가 이미 실행 중입니다.")
@@ -303,32 +711,138 @@ class FarmLinkController:
         """임계치 동기화 중지"""
         if self.threshold_sync_active:
             self.threshold_sync_active = False
+            if self.async_engine:
+                self.async_engine.stop_task('threshold_sync')
             if self.threshold_sync_thread:
                 self.threshold_sync_thread.join(timeout=1)
+            self.scheduler.cancel(self.threshold_sync_job)
+            self.threshold_sync_job = None
             print("⏹️ 임계치 동기화가 중지되었습니다.")
     
 
 def main():
     parser = argparse.ArgumentParser(description='Farm Link 자동화 제어 시스템')
-    parser.add_argument('--port', default='COM7', help='시리얼 포트 (기본: COM7)')
+    parser.add_argument('--port', default='COM7', help='시리얼 포트 (기본: COM7, auto이면 연결된 보드를 찾음)')
+    parser.add_argument('--usb-ids', type=parse_usb_ids,
+                        help='포트 탐색에 사용할 USB VID:PID (쉼표로 구분, 예: 2341:0043,1a86:7523, 기본: 흔한 보드 칩). '
+                             '--port를 지정한 경우 이 값을 주어야만 포트가 사라졌을 때 다른 포트를 찾음')
+    parser.add_argument('--no-reconnect', dest='auto_reconnect', action='store_false',
+                        help='포트가 끊겨도 재연결하지 않음')
+    parser.add_argument('--ready-timeout', type=float, default=3.0,
+                        help='포트를 연 뒤 보드 시작 메시지를 기다리는 최대 시간 (초, 기본: 3, 준비되면 바로 진행)')
+    parser.add_argument('--stall-timeout', type=float, default=0,
+                        help='N초 동안 센서 데이터가 없으면 재연결 (기본: 0, 사용 안 함)')
+    parser.add_argument('--api-url', default="http://localhost:3000", help='API 서버 주소 (기본: http://localhost:3000)')
     parser.add_argument('--device-id', default='farmlink-001', help='장치 ID (기본: farmlink-001)')
+    parser.add_argument('--batch-size', type=int, default=0, help='배치 전송 최대 건수 (기본: 0, 개별 전송)')
+    parser.add_argument('--batch-age', type=float, default=5.0, help='배치 전송 최대 대기 시간 (초, 기본: 5)')
+    parser.add_argument('--queue-path', help='미전송 데이터를 보관할 디스크 큐 파일 (예: farmlink_queue.db)')
+    parser.add_argument('--sample-interval', type=float, default=5.0,
+                        help='센서 데이터 업로드 주기 (초, 기본: 5, 0이면 수신한 모든 데이터 업로드)')
+    parser.add_argument('--threshold-long-poll', type=int, default=0,
+                        help='임계치 변경을 서버에서 최대 N초 동안 기다림 (기본: 0, 7초 주기 조회)')
+    parser.add_argument('--rollup', type=parse_resolutions, metavar='SECONDS',
+                        help='엣지 집계 구간 (초, 쉼표로 구분, 예: 60,900)')
+    parser.add_argument('--no-raw-upload', dest='upload_raw', action='store_false',
+                        help='원본 센서 데이터는 업로드하지 않고 집계 결과만 업로드 (--rollup과 함께 사용)')
+    parser.add_argument('--http-retries', type=int, default=2, help='API 요청 실패 시 재시도 횟수 (기본: 2)')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='asyncio 이벤트 루프 엔진 사용')
+    parser.add_argument('--rules', action='store_true',
+                        help='엣지 규칙 엔진 사용 (활성 임계치 기준 펌프/팬/LED 기본 규칙)')
+    parser.add_argument('--rules-file', help='규칙 파일 (JSON 목록, 지정하면 --rules 없이도 사용)')
+    parser.add_argument('--filter', action='store_true',
+                        help='이상값 필터 사용 (범위, 변화율, Hampel 검사로 튄 값을 보정하고 잘못된 값은 버림)')
+    parser.add_argument('--filter-file', help='측정값별 필터 설정 파일 (JSON 객체, 지정하면 --filter 없이도 사용)')
+    parser.add_argument('--filter-action', choices=('correct', 'mark', 'drop'), default='correct',
+                        help='튄 값 처리: correct(중앙값으로 보정), mark(flags 표시, 규칙 평가에서는 제외), drop(버림) '
+                             '(기본: correct)')
+    parser.add_argument('--deadband', type=parse_deadbands, nargs='?', const='', metavar='FIELD=WIDTH,...',
+                        help='변화 보고 모드: 값이 데드밴드 이상 바뀔 때만 업로드 '
+                             '(예: --deadband 또는 --deadband temperature=0.3,humidity=1)')
+    parser.add_argument('--heartbeat', type=float, default=300.0,
+                        help='변화 보고 모드에서 값이 그대로여도 업로드하는 간격 (초, 기본: 300, 0이면 사용 안 함)')
+    parser.add_argument('--store', help='로컬 시계열 저장소 디렉터리 (예: farmlink_tsdb, farmlink_store.py로 조회)')
+    parser.add_argument('--store-retention', type=int, default=30, help='로컬 시계열 보관 기간 (일, 기본: 30)')
+    parser.add_argument('--output', dest='outputs', action='append', metavar='PATH',
+                        help='파싱한 모든 측정값을 JSON Lines로 기록할 파일 (-이면 표준 출력, 여러 번 지정 가능)')
+    parser.add_argument('--binary-baud', type=int, default=0,
+                        help='이진 프레임 모드로 전환할 통신 속도 (예: 115200, 기본: 0, 텍스트 형식)')
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help='Prometheus 계측 엔드포인트 포트 (기본: 0, 사용 안 함, 예: 9108)')
+    parser.add_argument('--profile', action='store_true',
+                        help='샘플링 프로파일러 사용 (/debug/profile, SIGUSR1을 받으면 5초 덤프)')
     
     args = parser.parse_args()
     
-    controller = FarmLinkController(port=args.port)
+    try:
+        rules = load_rules(args.rules_file) if args.rules or args.rules_file else None
+    except (OSError, ValueError) as e:
+        print(f"❌ 규칙 파일 오류: {e}")
+        sys.exit(1)
     
-    if not controller.connect():
+    try:
+        filters = load_filters(args.filter_file) if args.filter_file else ({} if args.filter else None)
+    except (OSError, ValueError) as e:
+        print(f"❌ 필터 설정 파일 오류: {e}")
         sys.exit(1)
     
+    store = TimeSeriesStore(args.store, retention_days=args.store_retention) if args.store else None
+    
+    controller = FarmLinkController(
+        port=args.port,
+        device_id=args.device_id,
+        api_base_url=args.api_url,
+        batch_size=args.batch_size,
+        batch_age=args.batch_age,
+        queue_path=args.queue_path,
+        use_async=args.use_async,
+        sample_interval=args.sample_interval,
+        threshold_long_poll=args.threshold_long_poll,
+        http_retries=args.http_retries,
+        rollup_resolutions=args.rollup,
+        upload_raw=args.upload_raw,
+        binary_baudrate=args.binary_baud,
+        rules=rules,
+        store=store,
+        auto_reconnect=args.auto_reconnect,
+        usb_ids=args.usb_ids,
+        stall_timeout=args.stall_timeout,
+        filters=filters,
+        filter_action=args.filter_action,
+        deadbands=args.deadband,
+        heartbeat=args.heartbeat,
+        ready_timeout=args.ready_timeout,
+        outputs=args.outputs
+    )
+    
+    if not controller.connect():
+        if not args.auto_reconnect:
+            sys.exit(1)
+        print("⏳ 보드가 연결되면 자동으로 연결합니다.")
+    
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = MetricsServer(port=args.metrics_port, profile=args.profile).start()
+    if args.profile:
+        install_profile_signal(metrics_server.profiler if metrics_server else SamplingProfiler())
+    
     try:
         # 자동화 모드
         print("🌱 Farm Link 자동화 시스템 시작")
-        print("📊 센서 데이터 수집: 5초마다 실행")
-        print("🔄 임계치 동기화: 7초마다 실행")
+        if args.sample_interval:
+            print(f"📊 센서 데이터 수집: 모든 프레임 수신, {args.sample_interval}초마다 업로드")
+        else:
+            print("📊 센서 데이터 수집: 수신한 모든 데이터 업로드")
+        if args.deadband is not None:
+            print(f"📉 변화 보고: 값이 바뀌었거나 {args.heartbeat}초가 지났을 때만 업로드")
+        if args.threshold_long_poll:
+            print("🔄 임계치 동기화: 변경 시 즉시 반영 (long-poll)")
+        else:
+            print("🔄 임계치 동기화: 7초마다 변경 확인")
         print("Ctrl+C로 종료")
         print("-" * 50)
         
-        # 데이터 수집 시작 (5초마다)
+        # 데이터 수집 시작
         controller.start_data_collection()
         
         # 임계치 동기화 시작 (7초마다)
@@ -341,7 +855,12 @@ def main():
             print("\n프로그램을 종료합니다...")
     
     finally:
+        controller.http.print_stats()
         controller.disconnect()
+        if store:
+            store.close()
+        if metrics_server:
+            metrics_server.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Farm Link 변화 보고(deadband + heartbeat)
+온실 환경은 천천히 바뀌므로 마지막으로 보고한 값보다 측정값이 데드밴드 이상 바뀌었거나
+heartbeat 간격이 지났을 때만 업로드 (서버의 sensor_data 저장과 devices.last_seen 갱신 횟수를 줄임)
+로컬 저장소와 엣지 집계는 이 판단과 무관하게 모든 측정값을 받음
+"""
+
+import threading
+
+from farmlink_parser import SENSOR_FIELDS
+
+# 측정값별 기본 데드밴드 (마지막 보고 값과의 차이가 이보다 커야 보고)
+DEFAULT_DEADBANDS = {
+    'soil_moisture': 2.0,
+    'light_intensity': 5.0,
+    'temperature': 0.5,
+    'humidity': 2.0,
+}
+
+
+def parse_deadbands(text):
+    """"temperature=0.3,humidity=1" 형식을 측정값별 데드밴드 dict로 변환 (빈 문자열이면 기본값)"""
+    deadbands = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        name, _, value = part.partition('=')
+        name = name.strip()
+        if name not in SENSOR_FIELDS or not value:
+            raise ValueError(f"데드밴드 형식은 측정값=폭 입니다 (측정값: {', '.join(SENSOR_FIELDS)}): {part}")
+        deadbands[name] = float(value)
+    return deadbands
+
+
+class DeadbandReporter:
+    """센서 데이터를 보고할지 결정 (처음 값, 데드밴드 초과 변화, heartbeat 경과)"""
+
+    def __init__(self, deadbands=None, heartbeat=300.0):
+        # deadbands: DEFAULT_DEADBANDS를 덮어쓸 측정값별 폭 (장치마다 다르게 설정 가능)
+        unknown = set(deadbands or {}) - set(SENSOR_FIELDS)
+        if unknown:
+            raise ValueError(f"데드밴드를 지정할 수 없는 측정값입니다: {', '.join(sorted(unknown))}")
+        self.deadbands = {name: float(value) for name, value in dict(DEFAULT_DEADBANDS, **(deadbands or {})).items()}
+        # heartbeat: 값이 바뀌지 않아도 이 간격(초)마다 한 번은 보고 (0이면 변화가 있을 때만)
+        self.heartbeat = heartbeat
+        self.last_reported = None
+        self.last_reported_at = None
+        self.lock = threading.Lock()
+
+        # 보고 사유별 통계
+        self.considered = 0
+        self.reported = {'first': 0, 'change': 0, 'heartbeat': 0}
+        self.suppressed = 0
+
+    def changed_fields(self, sensor_data):
+        return [name for name, deadband in self.deadbands.items()
+                if name in sensor_data and name in self.last_reported
+                and abs(float(sensor_data[name]) - self.last_reported[name]) > deadband]
+
+    def should_report(self, sensor_data, now):
+        """보고 사유('first'|'change'|'heartbeat') 반환, 보고하지 않으면 None"""
+        with self.lock:
+            self.considered += 1
+            if self.last_reported is None:
+                reason = 'first'
+            elif self.changed_fields(sensor_data):
+                reason = 'change'
+            elif self.heartbeat and now - self.last_reported_at >= self.heartbeat:
+                reason = 'heartbeat'
+            else:
+                self.suppressed += 1
+                return None
+            self.reported[reason] += 1
+            self.last_reported = {name: float(sensor_data[name]) for name in self.deadbands if name in sensor_data}
+            self.last_reported_at = now
+            return reason
+
+    def suppression_ratio(self):
+        """보고하지 않은 비율 (0~1)"""
+        return self.suppressed / self.considered if self.considered else 0.0
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'deadbands': dict(self.deadbands),
+                'heartbeat_sec': self.heartbeat,
+                'considered': self.considered,
+                'reported': dict(self.reported),
+                'suppressed': self.suppressed,
+                'suppression_ratio': self.suppression_ratio(),
+            }
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Farm Link 센서 데이터 내보내기
+start~end 기간을 시간 구간(shard)으로 나눠 여러 작업자가 동시에 keyset 페이지 조회(GET /api/sensor-data?order=asc)로 받고,
+페이지마다 바로 구간별 압축 파일(CSV gzip 또는 Parquet)에 기록하여 전체를 메모리에 올리지 않음
+완료한 구간은 manifest.json에 기록하므로 중단 후 같은 명령으로 다시 실행하면 남은 구간만 받음
+
+사용법:
+    python farmlink_export.py --start 2024-01-01 --end 2024-02-01 --device-id farmlink-001 --out export_202401
+    python farmlink_export.py --start 2024-01-01 --end 2024-02-01 --out export_202401 --format parquet --workers 8
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+from farmlink_api import FarmLinkApiClient
+
+# Parquet은 pyarrow가 설치되어 있을 때만 사용 (pip install pyarrow, 선택 사항)
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+COLUMNS = ('id', 'device_id', 'timestamp', 'soil_moisture', 'light_intensity', 'temperature', 'humidity',
+           'created_at')
+FORMAT_SUFFIXES = {'csv': '.csv.gz', 'parquet': '.parquet'}
+MANIFEST_NAME = 'manifest.json'
+
+
+def parse_time(value):
+    """날짜/시각 인자를 UTC datetime으로 변환 (시간대가 없으면 UTC로 간주)"""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def make_shards(start, end, shard_hours):
+    """[start, end) 기간을 shard_hours 단위 [구간 시작, 구간 끝) 목록으로 분할"""
+    shards = []
+    step = timedelta(hours=shard_hours)
+    shard_start = start
+    while shard_start < end:
+        shard_end = min(shard_start + step, end)
+        shards.append((shard_start, shard_end))
+        shard_start = shard_end
+    return shards
+
+
+class CsvShardWriter:
+    """gzip 압축 CSV (페이지마다 바로 기록)"""
+
+    def __init__(self, path):
+        self.file = gzip.open(path, 'wt', encoding='utf-8', newline='', compresslevel=6)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows([row.get(column) for column in COLUMNS] for row in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetShardWriter:
+    """Parquet (페이지 하나를 row group 하나로 기록, zstd 압축)"""
+
+    SCHEMA = None
+
+    def __init__(self, path):
+        if ParquetShardWriter.SCHEMA is None:
+            ParquetShardWriter.SCHEMA = pyarrow.schema([
+                ('id', pyarrow.int64()),
+                ('device_id', pyarrow.string()),
+                ('timestamp', pyarrow.string()),
+                ('soil_moisture', pyarrow.float64()),
+                ('light_intensity', pyarrow.float64()),
+                ('temperature', pyarrow.float64()),
+                ('humidity', pyarrow.float64()),
+                ('created_at', pyarrow.string()),
+            ])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.SCHEMA, compression='zstd')
+
+    def write(self, rows):
+        columns = {column: [row.get(column) for row in rows] for column in COLUMNS}
+        self.writer.write_table(pyarrow.Table.from_pydict(columns, schema=self.SCHEMA))
+
+    def close(self):
+        self.writer.close()
+
+
+SHARD_WRITERS = {'csv': CsvShardWriter, 'parquet': ParquetShardWriter}
+
+
+class SensorDataExporter:
+    def __init__(self, api_base_url, out_dir, start, end, device_id=None, shard_hours=6, workers=4,
+                 page_size=1000, output_format='csv', session=None):
+        if output_format == 'parquet' and pyarrow is None:
+            raise ValueError("Parquet 형식은 pyarrow가 필요합니다 (pip install pyarrow).")
+        self.out_dir = out_dir
+        self.start = start
+        self.end = end
+        self.device_id = device_id
+        self.workers = workers
+        self.page_size = page_size
+        self.output_format = output_format
+        self.shards = make_shards(start, end, shard_hours)
+        self.http = session or FarmLinkApiClient(api_base_url, pool_size=workers, timeout=30.0, retries=3)
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+
+        # 같은 인자로 다시 실행했을 때만 이어 받기 (기간/형식이 바뀌면 구간 경계가 달라짐)
+        self.params = {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'device_id': device_id,
+            'shard_hours': shard_hours,
+            'format': output_format,
+        }
+        os.makedirs(out_dir, exist_ok=True)
+        self.manifest = self.load_manifest()
+
+        # 진행 통계
+        self.rows_exported = 0
+        self.pages_fetched = 0
+        self.shards_skipped = 0
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.out_dir, MANIFEST_NAME)
+
+    def load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'params': self.params, 'completed': {}}
+        with open(self.manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('params') != self.params:
+            raise ValueError(f"{self.out_dir}에 다른 조건의 내보내기가 있습니다: {manifest.get('params')}")
+        return manifest
+
+    def save_manifest(self):
+        """manifest를 임시 파일에 쓴 뒤 교체 (중단되어도 이전 내용 유지)"""
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def shard_name(self, shard_start):
+        prefix = self.device_id or 'all'
+        return f"{prefix}_{shard_start.strftime('%Y%m%dT%H%M%SZ')}{FORMAT_SUFFIXES[self.output_format]}"
+
+    def fetch_pages(self, shard_start, shard_end):
+        """구간의 행을 페이지 단위로 반환 (다음 페이지는 마지막 행의 (timestamp, id) 다음부터)"""
+        params = {
+            'order': 'asc',
+            'limit': self.page_size,
+            'start_date': shard_start.isoformat(),
+            'end_before': shard_end.isoformat(),
+        }
+        if self.device_id:
+            params['device_id'] = self.device_id
+        while not self.stop_event.is_set():
+            response = self.http.get('/api/sensor-data', params=params)
+            if response.status_code != 200:
+                raise RuntimeError(f"조회 실패: {response.status_code} {response.text[:200]}")
+            body = response.json()
+            if not body.get('success'):
+                raise RuntimeError(f"조회 실패: {body.get('error')}")
+            with self.lock:
+                self.pages_fetched += 1
+            if body['data']:
+                yield body['data']
+            cursor = body.get('next_cursor')
+            if not cursor:
+                return
+            params.update(cursor)
+
+    def export_shard(self, shard_start, shard_end):
+        """구간 하나를 임시 파일에 받은 뒤 완료되면 이름을 바꾸고 manifest에 기록"""
+        name = self.shard_name(shard_start)
+        path = os.path.join(self.out_dir, name)
+        temp_path = path + '.part'
+        started = time.perf_counter()
+        rows = 0
+        writer = SHARD_WRITERS[self.output_format](temp_path)
+        try:
+            for page in self.fetch_pages(shard_start, shard_end):
+                writer.write(page)
+                rows += len(page)
+                with self.lock:
+                    self.rows_exported += len(page)
+        except BaseException:
+            # 실패한 구간은 버리고 다음 실행에서 처음부터 다시 받음
+            writer.close()
+            os.remove(temp_path)
+            raise
+        writer.close()
+        if self.stop_event.is_set():
+            # 중단된 구간도 마찬가지
+            os.remove(temp_path)
+            return None
+        os.replace(temp_path, path)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.manifest['completed'][name] = {'rows': rows, 'seconds': round(elapsed, 3)}
+            self.save_manifest()
+        return name, rows, elapsed
+
+    def run(self):
+        """남은 구간을 작업자 수만큼 동시에 내보내고 (내보낸 행 수, 소요 시간) 반환"""
+        pending = [(shard_start, shard_end) for shard_start, shard_end in self.shards
+                   if self.shard_name(shard_start) not in self.manifest['completed']]
+        self.shards_skipped = len(self.shards) - len(pending)
+        if self.shards_skipped:
+            print(f"↩️ 이전 실행에서 완료한 {self.shards_skipped}개 구간은 건너뜁니다.")
+        print(f"📤 내보내기 시작: {len(pending)}개 구간, 작업자 {self.workers}개, 형식 {self.output_format}")
+        self.save_manifest()
+
+        started = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='farmlink-export')
+        futures = [executor.submit(self.export_shard, shard_start, shard_end) for shard_start, shard_end in pending]
+        failures = 0
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failures += 1
+                    print(f"❌ 구간 내보내기 실패: {e}")
+                    continue
+                if result:
+                    name, rows, elapsed = result
+                    total_elapsed = time.perf_counter() - started
+                    print(f"✅ [{done}/{len(pending)}] {name}: {rows}행, {elapsed:.1f}초 "
+                          f"(누적 {self.rows_exported}행, {self.rows_exported / total_elapsed:.0f}행/초)")
+        except KeyboardInterrupt:
+            print("\n⏹️ 중단합니다. 같은 명령으로 다시 실행하면 남은 구간부터 이어 받습니다.")
+            self.stop_event.set()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if failures:
+            print(f"⚠️ {failures}개 구간이 실패했습니다. 다시 실행하면 실패한 구간만 받습니다.")
+        return self.rows_exported, time.perf_counter() - started, failures
+
+    def close(self):
+        self.http.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Farm Link 센서 데이터 내보내기')
+    parser.add_argument('--api-url', default="http://localhost:3000", help='API 서버 주소 (기본: http://localhost:3000)')
+    parser.add_argument('--start', required=True, help='시작 시각 (ISO 8601, 예: 2024-01-01, 시간대가 없으면 UTC)')
+    parser.add_argument('--end', required=True, help='종료 시각 (포함하지 않음, 예: 2024-02-01)')
+    parser.add_argument('--device-id', help='장치 ID (기본: 모든 장치)')
+    parser.add_argument('--out', required=True, help='출력 디렉터리 (구간별 파일과 manifest.json)')
+    parser.add_argument('--format', dest='output_format', choices=['csv', 'parquet'], default='csv',
+                        help='출력 형식 (csv: gzip 압축 CSV, parquet: pyarrow 필요)')
+    parser.add_argument('--shard-hours', type=float, default=6, help='구간 길이 (시간, 기본: 6)')
+    parser.add_argument('--workers', type=int, default=4, help='동시에 받을 구간 수 (기본: 4)')
+    parser.add_argument('--page-size', type=int, default=1000, help='페이지당 행 수 (기본: 1000, 서버 최대 1000)')
+    args = parser.parse_args()
+
+    try:
+        start, end = parse_time(args.start), parse_time(args.end)
+        if start >= end:
+            raise ValueError("--end는 --start보다 뒤여야 합니다.")
+        exporter = SensorDataExporter(
+            api_base_url=args.api_url,
+            out_dir=args.out,
+            start=start,
+            end=end,
+            device_id=args.device_id,
+            shard_hours=args.shard_hours,
+            workers=args.workers,
+            page_size=args.page_size,
+            output_format=args.output_format
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    try:
+        rows, elapsed, failures = exporter.run()
+        print(f"📊 완료: {rows}행, {elapsed:.1f}초, {rows / elapsed if elapsed else 0:.0f}행/초, "
+              f"페이지 {exporter.pages_fetched}회")
+        if failures:
+            sys.exit(1)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    finally:
+        exporter.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Farm Link 센서 이상값 필터
+업로드/저장/규칙 평가 전에 측정값마다 범위, 변화율, Hampel(이동 중앙값 ± MAD) 검사를 수행
+아날로그 센서(수분, 조도)의 순간 튐은 창의 중앙값으로 보정하고, 범위를 벗어나거나 숫자가 아닌 값은 버림
+측정값별 최근 값은 고정 크기 링 버퍼(array)에 보관하여 statistics.median 대신 정렬로 직접 중앙값/MAD를 계산
+"""
+
+import json
+import math
+import re
+import threading
+from array import array
+
+# 펌웨어가 DHT 센서 읽기에 실패하면 센서 데이터 대신 출력하는 문구
+# (arduino.ino는 "DHT센서 값 읽기 실패!", ESP8266 펌웨어는 "DHT 센서 값 읽기 실패!"로 띄어쓰기가 다름)
+SENSOR_FAULT_PATTERN = re.compile(r'DHT\s*센서 값 읽기 실패'.encode('utf-8'))
+
+# 정규 분포에서 MAD를 표준편차로 환산하는 계수
+MAD_SCALE = 1.4826
+
+
+def median(values):
+    """작은 창의 중앙값 (statistics 모듈은 불러오는 비용이 커서 정렬로 직접 계산)"""
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+# 측정값별 기본 필터 (min/max: 허용 범위, max_rate: 초당 최대 변화량, min_mad: 값이 일정할 때 과민 반응 방지)
+DEFAULT_FILTERS = {
+    'soil_moisture': {'min': 0, 'max': 100, 'max_rate': 20.0, 'window': 7, 'n_sigmas': 3.0, 'min_mad': 1.0},
+    'light_intensity': {'min': 0, 'max': 100, 'max_rate': 50.0, 'window': 7, 'n_sigmas': 3.0, 'min_mad': 2.0},
+    'temperature': {'min': -40, 'max': 80, 'max_rate': 2.0, 'window': 7, 'n_sigmas': 3.0, 'min_mad': 0.2},
+    'humidity': {'min': 0, 'max': 100, 'max_rate': 5.0, 'window': 7, 'n_sigmas': 3.0, 'min_mad': 0.5},
+}
+
+# 튐으로 판정한 값의 처리: correct(창의 중앙값으로 대체), mark(값 유지 + flags 표시), drop(측정값 전체 버림)
+FILTER_ACTIONS = ('correct', 'mark', 'drop')
+
+
+def is_sensor_fault(raw):
+    """센서 읽기 실패 메시지 줄인지 확인"""
+    return SENSOR_FAULT_PATTERN.search(raw) is not None
+
+
+class MetricFilter:
+    """측정값 하나의 최근 값 창과 검사 기준"""
+
+    def __init__(self, name, min=None, max=None, max_rate=None, window=7, n_sigmas=3.0, min_mad=0.0):
+        if window < 3:
+            raise ValueError(f"{name} 필터 창은 3 이상이어야 합니다: {window}")
+        self.name = name
+        self.min = min
+        self.max = max
+        self.max_rate = max_rate
+        self.n_sigmas = n_sigmas
+        self.min_mad = min_mad
+        # 최근 원시 값 링 버퍼 (Hampel 검사는 현재 값을 포함한 창의 중앙값 기준)
+        self.values = array('d', bytes(8 * window))
+        self.size = 0
+        self.index = 0
+        # 변화율 검사 기준: 마지막으로 통과한 값과 그 시각
+        self.last_value = None
+        self.last_at = None
+
+        # 검사 결과 통계
+        self.checked = 0
+        self.rejected = {'invalid': 0, 'range': 0}
+        self.spikes = {'rate': 0, 'hampel': 0}
+
+    def push(self, value):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        self.size = min(self.size + 1, len(self.values))
+
+    def window_median(self):
+        """창의 중앙값과 MAD (창이 덜 찼으면 채워진 부분만 사용)"""
+        window = self.values if self.size == len(self.values) else self.values[:self.size]
+        center = median(window)
+        return center, median([abs(value - center) for value in window])
+
+    def check(self, value, now):
+        """값 검사 결과: (None, 값) 통과, ('invalid'|'range', None) 버림, ('rate'|'hampel', 중앙값) 튐"""
+        self.checked += 1
+        if value is None or not math.isfinite(value):
+            self.rejected['invalid'] += 1
+            return 'invalid', None
+        if (self.min is not None and value < self.min) or (self.max is not None and value > self.max):
+            self.rejected['range'] += 1
+            return 'range', None
+
+        self.push(value)
+        reason = None
+        # 마지막 정상 값과의 변화율 (시간이 지날수록 허용 폭이 커지므로 실제 변화는 결국 통과)
+        if self.max_rate is not None and self.last_at is not None and now > self.last_at:
+            if abs(value - self.last_value) / (now - self.last_at) > self.max_rate:
+                reason = 'rate'
+        center = value
+        if self.size >= 3:
+            center, mad = self.window_median()
+            if reason is None and abs(value - center) > self.n_sigmas * MAD_SCALE * max(mad, self.min_mad):
+                reason = 'hampel'
+        if reason:
+            self.spikes[reason] += 1
+            return reason, center
+        self.last_value = value
+        self.last_at = now
+        return None, value
+
+    def get_stats(self):
+        return {
+            'checked': self.checked,
+            'rejected': dict(self.rejected),
+            'spikes': dict(self.spikes),
+        }
+
+
+class SensorFilter:
+    """센서 데이터 한 건의 측정값을 모두 검사하여 보정/표시한 데이터 반환 (버리면 None)"""
+
+    def __init__(self, filters=None, action='correct'):
+        if action not in FILTER_ACTIONS:
+            raise ValueError(f"action은 {', '.join(FILTER_ACTIONS)} 중 하나여야 합니다: {action}")
+        self.action = action
+        # filters: 측정값별 DEFAULT_FILTERS 항목을 덮어쓸 설정 (None이면 측정값 필터 끔)
+        config = {name: dict(options) for name, options in DEFAULT_FILTERS.items()}
+        for name, options in (filters or {}).items():
+            if options is None:
+                config.pop(name, None)
+            else:
+                config.setdefault(name, {}).update(options)
+        self.metrics = {name: MetricFilter(name, **options) for name, options in config.items()}
+        self.lock = threading.Lock()
+
+        # 측정값 단위 통계
+        self.readings = 0
+        self.dropped = 0
+        self.corrected = 0
+        self.marked = 0
+        self.sensor_faults = 0
+
+    def record_fault(self):
+        """센서 읽기 실패 메시지 수신 기록"""
+        self.sensor_faults += 1
+
+    def apply(self, sensor_data, now):
+        """검사 후 센서 데이터 반환 (범위 밖/숫자가 아닌 값, drop 모드의 튐이면 None)"""
+        flags = []
+        drop = False
+        with self.lock:
+            self.readings += 1
+            # 한 측정값 때문에 버리더라도 나머지 측정값의 창/최근 값이 같은 샘플을 보도록 모두 검사한 뒤 판단
+            for name, metric in self.metrics.items():
+                if name not in sensor_data:
+                    continue
+                value = sensor_data[name]
+                reason, replacement = metric.check(float(value) if value is not None else None, now)
+                if reason is None:
+                    continue
+                if replacement is None or self.action == 'drop':
+                    drop = True
+                    continue
+                flags.append(f"{name}:{reason}")
+                if self.action == 'correct':
+                    sensor_data[name] = round(replacement, 2)
+            if drop:
+                self.dropped += 1
+                return None
+            if flags:
+                if self.action == 'correct':
+                    self.corrected += 1
+                else:
+                    self.marked += 1
+        if flags:
+            print(f"🧹 이상값 {'보정' if self.action == 'correct' else '표시'}: {', '.join(flags)}")
+            sensor_data['flags'] = flags
+        return sensor_data
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'action': self.action,
+                'readings': self.readings,
+                'dropped': self.dropped,
+                'corrected': self.corrected,
+                'marked': self.marked,
+                'sensor_faults': self.sensor_faults,
+                'metrics': {name: metric.get_stats() for name, metric in self.metrics.items()},
+            }
+
+
+def load_filters(path):
+    """필터 설정 파일(JSON 객체: 측정값 → 설정, null이면 끔) 읽기"""
+    with open(path, encoding='utf-8') as f:
+        filters = json.load(f)
+    if not isinstance(filters, dict):
+        raise ValueError("필터 설정 파일은 측정값별 설정을 담은 JSON 객체여야 합니다.")
+    # 잘못된 키/값은 여기서 바로 알림
+    try:
+        SensorFilter(filters)
+    except (TypeError, AttributeError) as e:
+        raise ValueError(f"필터 설정 형식 오류: {e}")
+    return filters
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Farm Link 멀티 디바이스 게이트웨이
+하나의 프로세스에서 여러 (시리얼 포트, 장치 ID) 쌍을 관리하고
+업로드 경로와 HTTP 연결 풀은 모든 장치가 공유
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from farmlink_api import FarmLinkApiClient
+from farmlink_controller import FarmLinkController
+from farmlink_deadband import DeadbandReporter
+from farmlink_filter import load_filters
+from farmlink_metrics import MetricsServer, install_profile_signal
+from farmlink_ports import parse_usb_ids
+from farmlink_queue import UploadPipeline
+from farmlink_rollup import RollupUploader
+from farmlink_rules import load_rules
+from farmlink_scheduler import JobScheduler
+from farmlink_store import TimeSeriesStore
+
+
+class FarmLinkGateway:
+    def __init__(self, config):
+        self.config = config
+        self.api_base_url = config.get('api_base_url', "http://localhost:3000")
+        self.devices = config.get('devices', [])
+        self.stats_interval = config.get('stats_interval', 60)
+        self.threshold_sync = config.get('threshold_sync', True)
+
+        # 모든 장치가 공유하는 API 클라이언트 (keep-alive 연결 풀, 재시도, 서킷 브레이커)
+        self.api_client = FarmLinkApiClient(
+            api_base_url=self.api_base_url,
+            pool_size=max(len(self.devices), 1) + 4,
+            retries=config.get('http_retries', 2)
+        )
+
+        # 모든 장치가 공유하는 업로드 경로 (기본: 50건 / 5초 배치)
+        self.upload_pipeline = UploadPipeline(
+            api_base_url=self.api_base_url,
+            batch_size=config.get('batch_size', 50),
+            batch_age=config.get('batch_age', 5.0),
+            queue_path=config.get('queue_path'),
+            session=self.api_client
+        )
+
+        # 엣지 집계도 모든 장치가 하나의 집계기/업로드 경로를 공유 (장치 ID로 구분)
+        self.rollup_uploader = None
+        if config.get('rollup_resolutions'):
+            self.rollup_uploader = RollupUploader(
+                api_base_url=self.api_base_url,
+                resolutions=config['rollup_resolutions'],
+                session=self.api_client,
+                queue_path=config.get('queue_path')
+            )
+
+        # 로컬 시계열 저장소도 하나를 공유 (장치별 디렉터리로 구분)
+        self.store = None
+        if config.get('store_path'):
+            self.store = TimeSeriesStore(config['store_path'], retention_days=config.get('store_retention_days', 30))
+
+        # 이상값 필터 설정 (장치마다 측정값 창을 따로 가짐)
+        filters = None
+        if config.get('filters_file'):
+            filters = load_filters(config['filters_file'])
+        elif config.get('filter'):
+            filters = {}
+        
+        # 모든 장치의 주기/1회 작업(임계치 동기화, 재연결, 통계 출력)을 고정 크기 워커 풀 하나에서 실행
+        self.scheduler = JobScheduler(workers=config.get('scheduler_workers', 4))
+        
+        self.controllers = []
+        for device in self.devices:
+            self.controllers.append(FarmLinkController(
+                port=device['port'],
+                baudrate=device.get('baudrate', 9600),
+                binary_baudrate=device.get('binary_baudrate', 0),
+                device_id=device['device_id'],
+                use_async=config.get('use_async', False),
+                sample_interval=config.get('sample_interval', 5.0),
+                threshold_long_poll=config.get('threshold_long_poll', 0),
+                api_base_url=self.api_base_url,
+                session=self.api_client,
+                upload_pipeline=self.upload_pipeline,
+                upload_raw=config.get('upload_raw', True),
+                rollup_uploader=self.rollup_uploader,
+                # 규칙은 장치마다 작동 상태/대기 시간을 따로 가지므로 장치별로 생성
+                rules=load_rules(config.get('rules_file')) if config.get('rules') or config.get('rules_file') else None,
+                store=self.store,
+                # port가 "auto"이면 usb_ids(예: "2341:0043")로 보드를 찾고, 포트가 끊기면 다시 찾아 재연결
+                # 포트를 지정한 장치는 usb_ids가 없으면 그 포트가 돌아올 때까지 기다림 (다른 장치의 보드를 가져가지 않음)
+                auto_reconnect=config.get('auto_reconnect', True),
+                usb_ids=parse_usb_ids(device['usb_ids']) if device.get('usb_ids') else None,
+                stall_timeout=config.get('stall_timeout', 0),
+                filters=filters,
+                filter_action=config.get('filter_action', 'correct'),
+                # 변화 보고는 장치 설정이 게이트웨이 설정보다 우선 (deadband: true 또는 측정값별 폭)
+                deadbands=device_deadbands(config, device),
+                heartbeat=device.get('heartbeat', config.get('heartbeat', 300.0)),
+                scheduler=self.scheduler,
+                ready_timeout=config.get('ready_timeout', 3.0)
+            ))
+        # metrics_port를 지정하면 모든 장치의 계측을 한 엔드포인트에서 제공 (device_id 레이블)
+        self.metrics_server = None
+        if config.get('metrics_port'):
+            self.metrics_server = MetricsServer(port=config['metrics_port'], profile=config.get('profile', False))
+        self.active = False
+        self.stats_job = None
+
+    def start(self):
+        """업로드 경로와 모든 장치의 수집 시작"""
+        if self.metrics_server:
+            self.metrics_server.start()
+            if self.metrics_server.profiler:
+                install_profile_signal(self.metrics_server.profiler)
+        self.scheduler.start()
+        self.upload_pipeline.start()
+        if self.rollup_uploader:
+            self.rollup_uploader.start()
+        connected = 0
+        for controller in self.controllers:
+            # 한 장치의 연결 실패가 다른 장치에 영향을 주지 않도록 개별 처리
+            if controller.connect():
+                connected += 1
+            elif controller.auto_reconnect:
+                print(f"⏳ [{controller.device_id}] 연결 실패, 보드가 연결되면 자동으로 연결합니다.")
+            else:
+                print(f"⚠️ [{controller.device_id}] 연결 실패, 이 장치는 건너뜁니다.")
+                continue
+            controller.start_data_collection()
+            if self.threshold_sync:
+                controller.start_threshold_sync()
+        print(f"🌱 게이트웨이 시작: {connected}/{len(self.controllers)}개 장치 연결")
+
+        self.active = True
+        if self.stats_interval:
+            self.stats_job = self.scheduler.every(self.stats_interval, self.print_stats, 'gateway_stats')
+        return connected
+
+    def stop(self):
+        """모든 장치의 수집 중지 후 업로드 경로 정리"""
+        self.active = False
+        self.scheduler.cancel(self.stats_job)
+        for controller in self.controllers:
+            controller.disconnect()
+        self.scheduler.stop()
+        if self.rollup_uploader:
+            self.rollup_uploader.stop()
+            self.rollup_uploader.close()
+        self.upload_pipeline.stop()
+        self.upload_pipeline.close()
+        if self.store:
+            self.store.close()
+        self.print_stats()
+        self.api_client.close()
+        if self.metrics_server:
+            self.metrics_server.stop()
+
+    def get_stats(self):
+        """장치별 처리량과 공유 업로드 경로 통계 조회"""
+        return {
+            'devices': [controller.get_stats() for controller in self.controllers],
+            'upload': self.upload_pipeline.get_stats(),
+            'api': self.api_client.get_stats(),
+            'rollup': self.rollup_uploader.get_stats() if self.rollup_uploader else None,
+            'store': self.store.get_stats() if self.store else None,
+            'scheduler': self.scheduler.get_stats(),
+        }
+
+    def print_stats(self):
+        """장치별 처리량 통계 출력"""
+        stats = self.get_stats()
+        print("📊 장치별 처리량:")
+        for device in stats['devices']:
+            age = device['last_reading_age_sec']
+            age_text = f"{age:.0f}초 전" if age is not None else "없음"
+            print(f"  [{device['device_id']}] {device['port']}: 수신 {device['lines_received']}줄, "
+                  f"파싱 {device['readings_parsed']}건 ({device['readings_per_min']:.1f}건/분), "
+                  f"파싱 실패 {device['parse_failures']}건, 업로드 {device['readings_uploaded']}건, "
+                  f"마지막 수신 {age_text}")
+            threshold_stats = device['threshold']
+            print(f"    임계치 조회 {threshold_stats['requests_sent']}회 (변경 없음 {threshold_stats['not_modified']}회), "
+                  f"전송 {threshold_stats['pushes']}회 / 생략 {threshold_stats['pushes_skipped']}회")
+            serial_stats = device['serial']
+            if serial_stats:
+                print(f"    백로그 {serial_stats['backlog_frames']}프레임 / OS 버퍼 {serial_stats['os_backlog_bytes']}바이트, "
+                      f"최대 지연 {serial_stats['max_staleness_sec'] * 1000:.0f}ms, "
+                      f"덮어쓴 프레임 {serial_stats['frames_overwritten']}개")
+                round_trips = ', '.join(f"{name} {rtt['avg']:.0f}/{rtt['max']:.0f}ms"
+                                        for name, rtt in serial_stats['round_trip_ms'].items())
+                print(f"    명령 {serial_stats['commands_written']}건 (응답 {serial_stats['responses_matched']}건, "
+                      f"시간 초과 {serial_stats['response_timeouts']}건), 왕복 지연 평균/최대: {round_trips or '없음'}")
+        upload = stats['upload']
+        print(f"  [업로드] {upload['batches_sent']}회 / {upload['rows_sent']}건, "
+              f"요청당 {upload['rows_per_request']:.1f}건, 평균 {upload['avg_latency_ms']:.0f}ms")
+        rollup = stats['rollup']
+        if rollup:
+            print(f"  [집계] 측정값 {rollup['readings_aggregated']}건 → 요약 {rollup['rollups_emitted']}행 "
+                  f"(업로드 {rollup['upload_rows_sent']}행, 늦게 도착 {rollup['readings_late']}건, "
+                  f"종료 시 버린 구간 {rollup['windows_discarded']}개)")
+        store = stats['store']
+        if store:
+            print(f"  [로컬 이력] {store['records_written']}건 기록, 삭제한 파티션 {store['partitions_evicted']}개")
+        scheduler = stats['scheduler']
+        jobs = scheduler['jobs'].values()
+        print(f"  [스케줄러] 작업 {scheduler['pending_jobs']}개 / 워커 {scheduler['workers']}개, "
+              f"실행 {sum(job['runs'] for job in jobs)}회, 건너뜀 {sum(job['skipped'] for job in jobs)}회, "
+              f"최대 지연 {max((job['max_lag_ms'] for job in jobs), default=0):.0f}ms")
+        self.api_client.print_stats()
+
+
+def device_deadbands(config, device):
+    """게이트웨이/장치 설정의 deadband 항목을 합친 측정값별 폭 (사용하지 않으면 None)"""
+    layers = [config.get('deadband'), device.get('deadband')]
+    if not any(layers) or device.get('deadband') is False:
+        return None
+    deadbands = {}
+    for layer in layers:
+        if isinstance(layer, dict):
+            deadbands.update(layer)
+    return deadbands
+
+
+def load_config(path):
+    """게이트웨이 설정 파일(JSON) 읽기"""
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+
+    devices = config.get('devices', [])
+    if not devices:
+        raise ValueError("devices 항목에 최소 한 개의 장치가 필요합니다.")
+    for device in devices:
+        if 'port' not in device or 'device_id' not in device:
+            raise ValueError(f"장치 설정에 port와 device_id가 필요합니다: {device}")
+        if device.get('usb_ids'):
+            parse_usb_ids(device['usb_ids'])
+        if device_deadbands(config, device):
+            DeadbandReporter(device_deadbands(config, device))
+    device_ids = [device['device_id'] for device in devices]
+    if len(set(device_ids)) != len(device_ids):
+        raise ValueError("device_id가 중복되었습니다.")
+    if config.get('rules_file'):
+        load_rules(config['rules_file'])
+    if config.get('filters_file'):
+        load_filters(config['filters_file'])
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Farm Link 멀티 디바이스 게이트웨이')
+    parser.add_argument('--config', default='gateway.json', help='게이트웨이 설정 파일 (기본: gateway.json)')
+
+    args = parser.parse_args()
+
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f"❌ 게이트웨이 설정 오류: {e}")
+        sys.exit(1)
+
+    gateway = FarmLinkGateway(config)
+    # 연결된 장치가 없어도 자동 재연결 장치가 있으면 보드가 꽂힐 때까지 계속 실행
+    if not gateway.start() and not any(controller.auto_reconnect for controller in gateway.controllers):
+        gateway.stop()
+        sys.exit(1)
+
+    print("Ctrl+C로 종료")
+    print("-" * 50)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n게이트웨이를 종료합니다...")
+    finally:
+        gateway.stop()
+
+
+if __name__ == "__main__":
+    main()
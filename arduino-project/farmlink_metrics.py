@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Farm Link 계측 모듈
+파이프라인 단계별(디코딩, 파싱, 업로드, 임계치 동기화, 시리얼 쓰기) 카운터/게이지/지연 히스토그램을 모아
+로컬 HTTP 엔드포인트(/metrics)에서 Prometheus 텍스트 형식으로 제공
+선택적으로 샘플링 프로파일러(/debug/profile)로 실행 중인 스레드의 핫 패스를 덤프
+"""
+
+import sys
+import threading
+import time
+from collections import Counter as CallCounter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# 단계별 처리 시간 구간 (초): 파싱 같은 마이크로초 단위부터 HTTP 요청까지
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    labels = list(labels)
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        # 레이블 값 튜플 -> 값
+        self.values = {}
+
+    def label_key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def header(self, kind):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {kind}"]
+
+
+class Counter(Metric):
+    def inc(self, amount=1, **labels):
+        key = self.label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = self.header('counter')
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(zip(self.labelnames, key))} {format_value(value)}")
+        return lines
+
+
+class Gauge(Metric):
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self.label_key(labels)] = value
+
+    def render(self):
+        lines = self.header('gauge')
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(zip(self.labelnames, key))} {format_value(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.label_key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # [구간별 개수..., +Inf 개수], 합계
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = state[0]
+            index = 0
+            while index < len(self.buckets) and value > self.buckets[index]:
+                index += 1
+            counts[index] += 1
+            state[1] += value
+
+    def time(self, **labels):
+        """with 문으로 구간 시간 측정"""
+        return HistogramTimer(self, labels)
+
+    def render(self):
+        lines = self.header('histogram')
+        with self.lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self.values.items())
+        for key, (counts, total) in items:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(labels + [('le', format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {cumulative}")
+        return lines
+
+
+class HistogramTimer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+        # 수집 시점에 (이름, 종류, 설명, [(레이블 dict, 값)]) 목록을 돌려주는 함수
+        # 이미 객체 속성으로 세고 있는 통계(수신 줄 수, 백로그 깊이 등)를 그대로 노출
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self.add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.add(Histogram(name, help_text, labelnames, buckets))
+
+    def add(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        with self.lock:
+            self.collectors.append(collector)
+
+    def unregister_collector(self, collector):
+        with self.lock:
+            if collector in self.collectors:
+                self.collectors.remove(collector)
+
+    def render(self):
+        """Prometheus 텍스트 형식 (exposition format 0.0.4)"""
+        with self.lock:
+            metrics = list(self.metrics)
+            collectors = list(self.collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        # 여러 수집 함수(예: 장치별 컨트롤러)가 같은 이름을 내면 한 묶음으로 출력
+        families = {}
+        for collector in collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                print(f"⚠️ 계측 수집 오류: {e}")
+                continue
+            for name, kind, help_text, values in samples:
+                family = families.setdefault(name, (kind, help_text, []))
+                family[2].extend(values)
+        for name, (kind, help_text, values) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in values:
+                lines.append(f"{name}{format_labels(sorted(labels.items()))} {format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+# 프로세스 전체가 공유하는 기본 레지스트리와 단계별 처리 시간 히스토그램
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.histogram(
+    'farmlink_stage_seconds',
+    '파이프라인 단계/출력별 처리 시간 (decode, parse, filter, enrich, upload, store, threshold_sync, serial_write 등)',
+    ['stage']
+)
+
+
+class SamplingProfiler:
+    """다른 스레드의 현재 스택을 주기적으로 샘플링하여 함수별 점유 비율 집계"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.lock = threading.Lock()
+
+    def sample(self, seconds=5.0, top=25):
+        """seconds 동안 샘플링 후 결과 텍스트 반환 (동시에 하나만 실행)"""
+        if not self.lock.acquire(blocking=False):
+            return "이미 프로파일링 중입니다.\n"
+        try:
+            own_thread = threading.get_ident()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            leaf = CallCounter()
+            inclusive = CallCounter()
+            threads = CallCounter()
+            samples = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    samples += 1
+                    threads[names.get(thread_id, str(thread_id))] += 1
+                    code = frame.f_code
+                    leaf[f"{code.co_filename}:{frame.f_lineno} {code.co_name}"] += 1
+                    # 소스 파일을 읽지 않도록 프레임을 직접 따라감 (재귀 호출은 스택별로 한 번만 셈)
+                    functions = set()
+                    while frame is not None:
+                        functions.add((frame.f_code.co_filename, frame.f_code.co_name))
+                        frame = frame.f_back
+                    for filename, name in functions:
+                        inclusive[f"{filename} {name}"] += 1
+                time.sleep(self.interval)
+        finally:
+            self.lock.release()
+        return self.format(seconds, samples, leaf, inclusive, threads, top)
+
+    @staticmethod
+    def format(seconds, samples, leaf, inclusive, threads, top):
+        lines = [f"# 샘플링 프로파일: {seconds:.1f}초, 스레드 샘플 {samples}개"]
+        if not samples:
+            return '\n'.join(lines) + '\n'
+        lines.append("\n## 스레드별 샘플")
+        for name, count in threads.most_common():
+            lines.append(f"{count / samples * 100:6.1f}%  {name}")
+        lines.append("\n## 자체 시간 (스택 최상단 위치)")
+        for location, count in leaf.most_common(top):
+            lines.append(f"{count / samples * 100:6.1f}%  {location}")
+        lines.append("\n## 누적 시간 (스택에 포함된 함수)")
+        for location, count in inclusive.most_common(top):
+            lines.append(f"{count / samples * 100:6.1f}%  {location}")
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = None
+    profiler = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_text(self, status, text, content_type='text/plain; charset=utf-8'):
+        payload = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/metrics':
+            self.send_text(200, self.registry.render(), 'text/plain; version=0.0.4; charset=utf-8')
+        elif url.path == '/debug/profile':
+            if self.profiler is None:
+                self.send_text(404, "프로파일러가 꺼져 있습니다 (--profile로 실행).\n")
+                return
+            query = parse_qs(url.query)
+            try:
+                seconds = min(float(query.get('seconds', ['5'])[0]), 60.0)
+            except ValueError:
+                self.send_text(400, "seconds는 숫자여야 합니다.\n")
+                return
+            self.send_text(200, self.profiler.sample(seconds))
+        else:
+            self.send_text(404, "/metrics 또는 /debug/profile\n")
+
+
+class MetricsServer:
+    def __init__(self, port=9108, host='127.0.0.1', registry=REGISTRY, profile=False):
+        self.profiler = SamplingProfiler() if profile else None
+        handler = type('BoundMetricsHandler', (MetricsHandler,),
+                       {'registry': registry, 'profiler': self.profiler})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='farmlink-metrics', daemon=True)
+        self.thread.start()
+        host, port = self.server.server_address[:2]
+        print(f"📈 계측 엔드포인트: http://{host}:{port}/metrics"
+              + (" (프로파일: /debug/profile?seconds=5)" if self.profiler else ""))
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def install_profile_signal(profiler, seconds=5.0):
+    """SIGUSR1을 받으면 seconds 동안 샘플링한 결과를 표준 출력에 덤프 (POSIX 전용)"""
+    import signal
+    if not hasattr(signal, 'SIGUSR1'):
+        return False
+
+    def dump(signum, frame):
+        threading.Thread(target=lambda: print(profiler.sample(seconds)), daemon=True).start()
+
+    signal.signal(signal.SIGUSR1, dump)
+    return True
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Farm Link 센서 데이터 파서
+시리얼 한 줄(bytes)을 디코딩 없이 미리 컴파일한 정규식 한 번으로 파싱
+JSON 줄은 orjson이 설치되어 있으면 orjson, 없으면 표준 json으로 파싱
+"""
+
+import json
+import re
+from typing import NamedTuple, Optional, Union
+
+try:
+    import orjson
+    JSON_BACKEND = 'orjson'
+    json_loads = orjson.loads
+except ImportError:
+    JSON_BACKEND = 'json'
+
+    def json_loads(raw):
+        # 표준 json은 bytes보다 str 입력이 빠름 (UnicodeDecodeError도 ValueError)
+        return json.loads(raw.decode('utf-8'))
+
+SENSOR_FIELDS = ('soil_moisture', 'light_intensity', 'temperature', 'humidity')
+
+_NUMBER = r'\s*(-?\d+(?:\.\d+)?)\s*'
+# arduino.ino 출력: "수분량: 70  조도: 15  온도: 31.30  습도: 62.00"
+# 이전 형식의 단위(%, ph, °C)가 붙어 있어도 파싱
+TEXT_PATTERN = re.compile(
+    ('수분량:' + _NUMBER + '%?'
+     r'\s*조도:' + _NUMBER + '(?:ph)?'
+     r'\s*온도:' + _NUMBER + '(?:°C|C)?'
+     r'\s*습도:' + _NUMBER + '%?').encode('utf-8')
+)
+TEXT_MARKER = '수분량:'.encode('utf-8')
+
+
+class SensorReading(NamedTuple):
+    soil_moisture: float
+    light_intensity: float
+    temperature: float
+    humidity: float
+    # 아두이노 millis() 값 또는 ISO 문자열 (텍스트 형식에는 없음)
+    timestamp: Optional[Union[int, float, str]] = None
+
+    def to_dict(self):
+        """API 전송용 dict로 변환"""
+        data = {
+            'soil_moisture': self.soil_moisture,
+            'light_intensity': self.light_intensity,
+            'temperature': self.temperature,
+            'humidity': self.humidity,
+        }
+        if self.timestamp is not None:
+            data['timestamp'] = self.timestamp
+        return data
+
+
+def looks_like_sensor_line(raw):
+    """센서 데이터 형식(JSON 또는 텍스트)으로 보이는 줄인지 확인"""
+    return raw.lstrip().startswith(b'{') or TEXT_MARKER in raw
+
+
+def parse_line(raw, _search=TEXT_PATTERN.search, _new=tuple.__new__):
+    """시리얼 한 줄(bytes)을 SensorReading으로 파싱 (센서 데이터가 아니거나 형식 오류면 None)"""
+    if isinstance(raw, str):
+        raw = raw.encode('utf-8')
+    if raw[:1] == b'{' or raw.lstrip()[:1] == b'{':
+        return parse_json(raw)
+
+    match = _search(raw)
+    if match is None:
+        return None
+    soil_moisture, light_intensity, temperature, humidity = match.groups()
+    # 핫 패스: NamedTuple 생성자(기본값 처리)를 거치지 않고 바로 생성
+    return _new(SensorReading, (float(soil_moisture), float(light_intensity),
+                                float(temperature), float(humidity), None))
+
+
+def parse_json(raw):
+    """JSON 형식 줄 파싱 (필수 센서 값이 모두 숫자여야 함)"""
+    try:
+        data = json_loads(raw)
+    except ValueError:
+        # json.JSONDecodeError, orjson.JSONDecodeError 모두 ValueError의 하위 클래스
+        return None
+    if not isinstance(data, dict):
+        return None
+    try:
+        values = [float(data[field]) for field in SENSOR_FIELDS]
+    except (KeyError, TypeError, ValueError):
+        return None
+    values.append(data.get('timestamp'))
+    return tuple.__new__(SensorReading, values)
@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+Farm Link 수집 파이프라인
+시리얼 수신부터 출력까지를 제너레이터 단계의 연결로 구성:
+    소스(시리얼) → decode → parse → clock → filter → enrich → 출력(HTTP, 로컬 파일, 표준 출력, 로컬 DB)
+단계는 항목 하나를 받아 다음 단계로 넘길 항목(버리면 None)을 반환하는 함수이며, 단계마다 처리 시간을 기록
+Buffer를 단계 사이에 넣거나 출력에 queue_size를 주면 크기가 제한된 큐와 별도 스레드로 나뉘어
+뒤쪽이 느려도 큐가 찬 만큼만 쌓이고 앞쪽이 기다림 (backpressure)
+컨트롤러(farmlink_controller.py)와 backup/usb_data_sender.py는 이 엔진의 단계/출력 구성만 다름
+"""
+
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from farmlink_filter import is_sensor_fault
+from farmlink_metrics import STAGE_SECONDS
+from farmlink_parser import looks_like_sensor_line, parse_line
+from farmlink_serial import SerialFrame
+
+# 큐 끝 표시 (앞쪽 스레드가 끝났거나 출력을 닫는 중)
+END = object()
+
+
+class Record:
+    """파이프라인을 흐르는 항목 하나 (시리얼 프레임과 디코딩/파싱 결과)"""
+
+    __slots__ = ('raw', 'reading', 'received_at', 'received_monotonic', 'sampled_at', 'text', 'data')
+
+    def __init__(self, raw, received_at, received_monotonic, reading=None, text=None, data=None, sampled_at=None):
+        self.raw = raw
+        # 이진 프레임 모드에서 수신 시 디코딩한 SensorReading (텍스트 줄이면 None)
+        self.reading = reading
+        self.received_at = received_at
+        self.received_monotonic = received_monotonic
+        # 측정 시각 (epoch 초, clock 단계가 보드 millis()로 추정, 없으면 도착 시각)
+        self.sampled_at = received_at if sampled_at is None else sampled_at
+        # 로그/파일 출력용 문자열 (decode 단계)
+        self.text = text
+        # 센서 데이터 dict (parse 단계)
+        self.data = data
+
+    def with_data(self, data):
+        """data만 바꾼 복사본 (출력마다 가공이 다를 때 다른 출력에 영향을 주지 않도록)"""
+        return Record(self.raw, self.received_at, self.received_monotonic, self.reading, self.text, data,
+                      self.sampled_at)
+
+
+class Stage:
+    """파이프라인 단계 하나: func(item)이 다음 단계로 넘길 항목을 반환 (None이면 버림)
+    단계에서 난 예외는 해당 항목만 버리고 계속 진행
+    """
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+
+    def __call__(self, item):
+        self.items_in += 1
+        started = time.perf_counter()
+        try:
+            result = self.func(item)
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ 파이프라인 단계 오류 ({self.name}): {e}")
+            result = None
+        elapsed = time.perf_counter() - started
+        self.total_seconds += elapsed
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        if result is not None:
+            self.items_out += 1
+        return result
+
+    def pipe(self, items):
+        """앞쪽 제너레이터의 항목을 처리하여 남은 항목만 넘기는 제너레이터"""
+        for item in items:
+            result = self(item)
+            if result is not None:
+                yield result
+
+    def get_stats(self):
+        return {
+            'in': self.items_in,
+            'out': self.items_out,
+            'dropped': self.items_in - self.items_out - self.errors,
+            'errors': self.errors,
+            'avg_ms': self.total_seconds / self.items_in * 1000 if self.items_in else 0.0,
+        }
+
+
+class Buffer:
+    """단계 사이의 크기 제한 큐: 앞쪽 단계들은 별도 스레드에서 실행되고 큐가 차면 뒤쪽을 기다림"""
+
+    def __init__(self, size=1000, name='buffer'):
+        self.name = name
+        self.size = size
+        self.queue = queue.Queue(maxsize=size)
+        self.active = False
+        self.waits = 0
+        self.max_depth = 0
+
+    def __call__(self, item):
+        # process()로 한 건씩 처리할 때는 그대로 통과
+        return item
+
+    def pipe(self, items):
+        self.active = True
+        filler = threading.Thread(target=self.fill, args=(items,), name=f'farmlink-{self.name}', daemon=True)
+        filler.start()
+        try:
+            while True:
+                item = self.queue.get()
+                if item is END:
+                    return
+                yield item
+        finally:
+            # 뒤쪽이 먼저 끝나면(제너레이터 닫힘) 앞쪽 스레드도 멈추도록 함
+            self.active = False
+
+    def fill(self, items):
+        try:
+            for item in items:
+                if not self.put(item):
+                    return
+        finally:
+            self.put(END)
+
+    def put(self, item):
+        """큐에 넣기 (가득 차면 자리가 날 때까지 대기, 뒤쪽이 끝났으면 False)"""
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.waits += 1
+            while self.active:
+                try:
+                    self.queue.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            else:
+                return False
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    def get_stats(self):
+        return {'depth': self.queue.qsize(), 'max_depth': self.max_depth, 'size': self.size, 'waits': self.waits}
+
+
+class Sink:
+    """파이프라인 출력 하나: write(record)로 내보냄 (False를 반환하면 실패로 집계)
+    stages: 이 출력에만 적용할 선별/가공 단계 (예: 업로드만 샘플링)
+    queue_size > 0이면 workers개 스레드와 크기 제한 큐로 내보내 느린 출력이 수신/다른 출력을 막지 않음
+    (큐가 가득 차면 넣는 쪽이 기다림)
+    """
+
+    def __init__(self, name, write, stages=(), queue_size=0, workers=1, close=None):
+        self.name = name
+        self.write = write
+        self.stages = list(stages)
+        self.queue = queue.Queue(maxsize=queue_size) if queue_size else None
+        self.workers = workers
+        self.close_func = close
+        self.threads = []
+        self.lock = threading.Lock()
+        self.received = 0
+        self.written = 0
+        self.failed = 0
+        self.waits = 0
+        self.max_depth = 0
+        self.total_seconds = 0.0
+
+    def start(self):
+        if self.queue is None or self.threads:
+            return
+        self.threads = [threading.Thread(target=self.run, name=f'farmlink-sink-{self.name}', daemon=True)
+                        for _ in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """큐에 남은 항목을 모두 내보낸 뒤 스레드 종료"""
+        if self.threads:
+            for _ in self.threads:
+                self.queue.put(END)
+            for thread in self.threads:
+                thread.join(timeout=30)
+            self.threads = []
+
+    def close(self):
+        self.stop()
+        if self.close_func:
+            self.close_func()
+
+    def submit(self, record):
+        """출력 전용 단계를 거친 뒤 바로 내보내거나 큐에 넣음"""
+        self.received += 1
+        for stage in self.stages:
+            record = stage(record)
+            if record is None:
+                return
+        if not self.threads:
+            self.emit(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.waits += 1
+            # 큐에 자리가 날 때까지 앞쪽(수신 처리)이 기다림
+            self.queue.put(record)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def is_full(self):
+        return self.queue is not None and self.queue.full()
+
+    def run(self):
+        while True:
+            record = self.queue.get()
+            if record is END:
+                return
+            self.emit(record)
+
+    def emit(self, record):
+        started = time.perf_counter()
+        try:
+            success = self.write(record) is not False
+        except Exception as e:
+            success = False
+            print(f"❌ 출력 오류 ({self.name}): {e}")
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        with self.lock:
+            self.total_seconds += elapsed
+            if success:
+                self.written += 1
+            else:
+                self.failed += 1
+
+    def get_stats(self):
+        with self.lock:
+            emitted = self.written + self.failed
+            return {
+                'received': self.received,
+                'written': self.written,
+                'failed': self.failed,
+                'queued': self.queue.qsize() if self.queue else 0,
+                'max_queued': self.max_depth,
+                'waits': self.waits,
+                'avg_ms': self.total_seconds / emitted * 1000 if emitted else 0.0,
+                'stages': {stage.name: stage.get_stats() for stage in self.stages},
+            }
+
+
+class Pipeline:
+    """소스 → 단계 → 출력(fan-out) 연결
+    run(source)은 소스 제너레이터에 단계를 차례로 이어 끝까지 처리하고 (Buffer마다 스레드 분리),
+    process(item)은 이미 꺼낸 항목 하나를 같은 단계/출력으로 처리 (asyncio 엔진용)
+    """
+
+    def __init__(self, stages, sinks):
+        self.stages = list(stages)
+        self.sinks = list(sinks)
+
+    def start(self):
+        for sink in self.sinks:
+            sink.start()
+        return self
+
+    def stop(self):
+        """큐에 남은 출력을 모두 내보내고 출력 스레드 종료"""
+        for sink in self.sinks:
+            sink.stop()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def sink(self, name):
+        return next((sink for sink in self.sinks if sink.name == name), None)
+
+    def run(self, source):
+        items = source
+        for stage in self.stages:
+            items = stage.pipe(items)
+        for item in items:
+            self.emit(item)
+
+    def process(self, item):
+        """항목 하나를 단계에 통과시키고 남으면 모든 출력에 넘김 (처리된 항목 반환, 버려졌으면 None)"""
+        for stage in self.stages:
+            item = stage(item)
+            if item is None:
+                return None
+        self.emit(item)
+        return item
+
+    def emit(self, record):
+        for sink in self.sinks:
+            sink.submit(record)
+
+    def is_backlogged(self):
+        """출력 큐 중 하나라도 가득 찼는지 (asyncio 엔진이 이벤트 루프를 막지 않고 기다리는 데 사용)"""
+        return any(sink.is_full() for sink in self.sinks)
+
+    def get_stats(self):
+        return {
+            'stages': {stage.name: stage.get_stats() for stage in self.stages},
+            'sinks': {sink.name: sink.get_stats() for sink in self.sinks},
+        }
+
+    def collect_metrics(self, labels):
+        """/metrics용 단계/출력별 처리 수와 출력 큐 깊이"""
+        stages = [(stage.name, stage.get_stats()) for stage in self.stages if isinstance(stage, Stage)]
+        sinks = [(sink.name, sink.get_stats()) for sink in self.sinks]
+        for sink_name, sink in sinks:
+            stages.extend((f"{sink_name}.{name}", stats) for name, stats in sink['stages'].items())
+        return [
+            ('farmlink_pipeline_items_total', 'counter', '파이프라인 단계별 처리 결과 수 (result: out/dropped/errors)',
+             [(dict(labels, stage=name, result=result), stats[result])
+              for name, stats in stages for result in ('out', 'dropped', 'errors')]),
+            ('farmlink_pipeline_sink_items_total', 'counter', '출력별 내보낸 항목 수 (result: written/failed)',
+             [(dict(labels, sink=name, result=result), stats[result])
+              for name, stats in sinks for result in ('written', 'failed')]),
+            ('farmlink_pipeline_sink_queue_depth', 'gauge', '출력 큐에서 기다리는 항목 수',
+             [(dict(labels, sink=name), stats['queued']) for name, stats in sinks]),
+        ]
+
+
+def frame_source(get_reader, is_active, idle=None, timeout=0.5):
+    """SerialFrameReader/SerialPortMux의 링 버퍼에서 프레임을 꺼내는 소스 (is_active()가 False가 되면 끝남)
+    get_reader(): 현재 리더 (재연결하면 바뀌므로 매번 조회), idle(): 프레임이 없을 때 호출
+    """
+    while is_active():
+        reader = get_reader()
+        if reader is None:
+            time.sleep(timeout)
+            continue
+        frame = reader.get(timeout=timeout)
+        if frame is None:
+            if idle:
+                idle()
+            continue
+        reader.mark_consumed(frame)
+        yield frame
+
+
+def readline_source(serial_conn, pending=b''):
+    """pyserial 포트에서 한 줄씩 읽는 소스
+    pending: 먼저 처리할 이미 읽은 바이트 (끝의 미완성 줄은 다음 readline 결과 앞에 붙임)
+    """
+    lines = pending.splitlines(keepends=True)
+    partial = lines.pop() if lines and not lines[-1].endswith(b'\n') else b''
+    for raw in lines:
+        yield SerialFrame(raw, time.time(), time.monotonic())
+    while True:
+        try:
+            raw = serial_conn.readline()
+        except Exception as e:
+            print(f"시리얼 데이터 읽기 오류: {e}")
+            time.sleep(1)
+            continue
+        if not raw:
+            continue
+        yield SerialFrame(partial + raw, time.time(), time.monotonic())
+        partial = b''
+
+
+def decode(frame):
+    """프레임을 Record로 감싸고 텍스트 줄은 로그/파일 출력용 문자열로 디코딩 (파싱은 bytes에서 바로 수행)"""
+    text = frame.raw.decode('utf-8', errors='replace').strip() if frame.reading is None else None
+    return Record(frame.raw, frame.received_at, frame.received_monotonic, frame.reading, text)
+
+
+class Parser:
+    """센서 데이터 파싱 단계 (record.data에 결과를 넣고, 센서 데이터가 아닌 줄은 버림)
+    on_fault: 센서 읽기 실패 메시지(DHT 오류 등)를 받았을 때 호출 (None이면 파싱 실패로 집계)
+    """
+
+    def __init__(self, on_fault=None, verbose=True):
+        self.on_fault = on_fault
+        self.verbose = verbose
+        self.lines_received = 0
+        self.readings_parsed = 0
+        self.parse_failures = 0
+        self.last_parsed_at = None
+
+    def __call__(self, record):
+        self.lines_received += 1
+        reading = record.reading or parse_line(record.raw)
+        if reading is not None:
+            record.data = reading.to_dict()
+            self.readings_parsed += 1
+            self.last_parsed_at = time.monotonic()
+            if self.verbose:
+                print(f"📡 수신된 데이터: {record.text or self.describe(reading)}")
+            return record
+
+        # 센서 데이터 형식인데 파싱하지 못한 경우만 실패로 기록 (시작 메시지 등은 무시)
+        if self.on_fault and is_sensor_fault(record.raw):
+            self.on_fault()
+        elif looks_like_sensor_line(record.raw):
+            self.parse_failures += 1
+            print(f"✗ 데이터 파싱 실패: {record.text}")
+        return None
+
+    def describe(self, reading):
+        """이진 프레임(원본 문자열 없음)의 로그 출력"""
+        return (f"수분량: {reading.soil_moisture:.0f}  조도: {reading.light_intensity:.0f}  "
+                f"온도: {reading.temperature:.2f}  습도: {reading.humidity:.2f}")
+
+
+class Sampler:
+    """interval초마다 한 건만 통과 (0이면 모두 통과)"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_at = None
+        self.skipped = 0
+
+    def __call__(self, record):
+        if not self.interval:
+            return record
+        if self.next_at is not None and record.received_monotonic < self.next_at:
+            self.skipped += 1
+            return None
+        self.next_at = record.received_monotonic + self.interval
+        return record
+
+
+def clock_stage(board_clock):
+    """보드 시계(BoardClock) 단계: 측정값의 millis()로 측정 시각(sampled_at)을 추정 (millis가 없으면 도착 시각 유지)"""
+    def apply(record):
+        millis = record.data.get('timestamp')
+        if isinstance(millis, (int, float)) and not isinstance(millis, bool):
+            sampled = board_clock.to_monotonic(millis, record.received_monotonic)
+            # monotonic 기준 추정값을 이 프레임의 벽시계 오프셋으로 변환 (NTP 조정과 무관)
+            record.sampled_at = record.received_at - (record.received_monotonic - sampled)
+        return record
+    return Stage('clock', apply)
+
+
+def filter_stage(sensor_filter):
+    """이상값 필터(SensorFilter) 단계: 보정하거나 표시하고, 버릴 값이면 항목을 버림"""
+    def apply(record):
+        record.data = sensor_filter.apply(record.data, record.received_monotonic)
+        return record if record.data is not None else None
+    return Stage('filter', apply)
+
+
+def deadband_stage(reporter):
+    """변화 보고(DeadbandReporter) 단계: 마지막 보고 값에서 거의 바뀌지 않았으면 버림"""
+    def apply(record):
+        return record if reporter.should_report(record.data, record.received_monotonic) else None
+    return Stage('deadband', apply)
+
+
+def enrich_stage(device_id=None):
+    """장치 ID와 측정 시각(아두이노 millis() 대신 sampled_at, 시간대 포함 ISO 8601)을 채운 복사본을 넘기는 단계"""
+    def apply(record):
+        data = dict(record.data)
+        if device_id:
+            data.setdefault('device_id', device_id)
+        if not isinstance(data.get('timestamp'), str):
+            data['timestamp'] = datetime.fromtimestamp(record.sampled_at).astimezone().isoformat()
+        return record.with_data(data)
+    return Stage('enrich', apply)
+
+
+class HttpWriter:
+    """센서 데이터를 API 서버로 한 건씩 전송 (batcher가 있으면 배치/디스크 큐에 넣고 전송 스레드가 업로드)"""
+
+    def __init__(self, http, api_base_url, batcher=None):
+        self.http = http
+        self.api_base_url = api_base_url
+        self.batcher = batcher
+
+    def __call__(self, record):
+        data = record.data
+        # 업로드 경로가 디스크 큐를 감쌀 수 있으므로 참/거짓이 아닌 None으로 판단 (빈 큐는 len()이 0)
+        if self.batcher is not None:
+            return self.batcher.add(data)
+        try:
+            response = self.http.post(
+                f"{self.api_base_url}/api/sensor-data",
+                headers={'Content-Type': 'application/json'},
+                json=data
+            )
+            if response.status_code == 200:
+                result = response.json()
+                if result.get('success'):
+                    print(f"✓ API 전송 성공: {data.get('soil_moisture', 'N/A')}% 수분, {data.get('temperature', 'N/A')}°C")
+                    return True
+                print(f"✗ API 전송 실패: {result.get('error', 'Unknown error')}")
+                return False
+            print(f"✗ API 서버 오류: {response.status_code} - {response.text}")
+            return False
+        except requests.exceptions.RequestException as e:
+            print(f"✗ 네트워크 오류: {e}")
+            return False
+
+
+class FileWriter:
+    """센서 데이터를 JSON Lines 파일에 한 줄씩 추가 (path가 '-'이면 표준 출력)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None if path == '-' else open(path, 'a', encoding='utf-8', buffering=1)
+
+    def __call__(self, record):
+        line = json.dumps(record.data, ensure_ascii=False)
+        if self.file is None:
+            print(line, flush=True)
+        else:
+            self.file.write(line + '\n')
+        return True
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def output_sink(path, device_id=None, queue_size=1000):
+    """로컬 파일 또는 표준 출력(path '-') 출력"""
+    writer = FileWriter(path)
+    return Sink('stdout' if path == '-' else 'file', writer, [enrich_stage(device_id)],
+                queue_size=queue_size, close=writer.close)
+
+
+def store_sink(store, device_id):
+    """로컬 시계열 저장소(TimeSeriesStore) 출력"""
+    return Sink('store', lambda record: store.append(device_id, record.sampled_at, record.data))
+
+
+def rollup_sink(rollup_uploader, device_id):
+    """엣지 집계(RollupUploader) 출력"""
+    return Sink('rollup', lambda record: rollup_uploader.add(device_id, record.data, record.sampled_at))
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Farm Link 시리얼 포트 탐색
+USB 재연결로 포트 이름이 바뀌어도(/dev/ttyUSB0 → /dev/ttyUSB1, COM7 → COM8) 보드를 다시 찾기 위해
+연결된 시리얼 장치를 나열하고 USB VID:PID 또는 보드 확인(센서 데이터 줄 수신)으로 후보를 고름
+게이트웨이에서 여러 장치가 같은 포트를 가져가지 않도록 사용 중인 포트를 프로세스 안에서 기록
+
+사용법:
+    python farmlink_ports.py            # 연결된 시리얼 장치 목록
+    python farmlink_ports.py --probe    # 후보 포트마다 보드 확인
+"""
+
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+
+import serial
+
+from farmlink_parser import looks_like_sensor_line
+
+# 아두이노/ESP8266 보드에서 흔히 쓰는 USB 시리얼 칩 (VID, PID), PID가 None이면 제조사 전체
+KNOWN_BOARD_IDS = (
+    (0x2341, None),    # Arduino
+    (0x2A03, None),    # Arduino (arduino.org)
+    (0x1A86, 0x7523),  # CH340
+    (0x1A86, 0x55D4),  # CH9102
+    (0x10C4, 0xEA60),  # CP210x
+    (0x0403, 0x6001),  # FTDI FT232R
+    (0x0403, 0x6015),  # FTDI FT231X
+)
+# VID:PID 정보가 없을 때 (일부 가상/구형 드라이버) 이름으로 찾는 패턴
+PORT_PATTERNS = ('/dev/ttyUSB*', '/dev/ttyACM*', '/dev/cu.usbserial*', '/dev/cu.usbmodem*', '/dev/cu.wchusbserial*')
+
+# 이 프로세스의 장치들이 사용 중인 포트 (다른 장치의 탐색 후보에서 제외)
+claimed_ports = set()
+claimed_lock = threading.Lock()
+
+
+def parse_usb_ids(value):
+    """"2341:0043,1a86:7523" 형식을 [(vid, pid)] 목록으로 변환 (pid 생략 가능: "2341")"""
+    ids = []
+    for item in value.split(','):
+        vid, _, pid = item.strip().partition(':')
+        ids.append((int(vid, 16), int(pid, 16) if pid else None))
+    return ids
+
+
+def matches_ids(port_info, usb_ids):
+    if port_info.vid is None:
+        return False
+    return any(port_info.vid == vid and (pid is None or port_info.pid == pid) for vid, pid in usb_ids)
+
+
+def list_serial_ports():
+    """연결된 시리얼 장치 목록 (pyserial list_ports 정보)"""
+    # 장치 목록 모듈은 시작 시간을 늘리므로 포트를 찾을 때만 로드
+    from serial.tools import list_ports
+    return sorted(list_ports.comports(), key=lambda port_info: port_info.device)
+
+
+def find_candidates(usb_ids=None):
+    """보드일 가능성이 있는 포트 목록 (VID:PID 일치 → 이름 패턴 순, 다른 장치가 사용 중인 포트 제외)
+    usb_ids를 지정하면 그 VID:PID와 일치하는 포트만 (이름 패턴으로 다른 보드를 고르지 않음)
+    """
+    candidates = [port_info.device for port_info in list_serial_ports()
+                  if matches_ids(port_info, usb_ids or KNOWN_BOARD_IDS)]
+    if not usb_ids:
+        for pattern in PORT_PATTERNS:
+            for device in sorted(glob.glob(pattern)):
+                if device not in candidates:
+                    candidates.append(device)
+    with claimed_lock:
+        return [device for device in candidates if device not in claimed_ports]
+
+
+def port_exists(port):
+    """포트가 현재 시스템에 있는지 (Windows COM 포트는 목록으로 확인)"""
+    if os.name == 'nt':
+        return any(port_info.device == port for port_info in list_serial_ports())
+    return os.path.exists(port)
+
+
+def probe_port(port, baudrate=9600, timeout=5.0):
+    """포트를 열어 timeout 안에 센서 데이터 줄이 오는지 확인 (포트를 열면 보드가 재시작될 수 있음)"""
+    try:
+        with serial.Serial(port, baudrate, timeout=0.5) as conn:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                if looks_like_sensor_line(conn.readline()):
+                    return True
+    except (serial.SerialException, OSError):
+        return False
+    return False
+
+
+def is_claimed(port):
+    with claimed_lock:
+        return port in claimed_ports
+
+
+def claim_port(port):
+    with claimed_lock:
+        claimed_ports.add(port)
+
+
+def release_port(port):
+    with claimed_lock:
+        claimed_ports.discard(port)
+
+
+class PortLocator:
+    """장치 하나의 포트를 찾음
+    - 포트를 지정했으면 그 포트만 사용하고, 사라지면 다시 나타날 때까지 기다림
+    - "auto"이거나 usb_ids를 지정했을 때만 후보를 탐색 (지정한 포트가 사라졌을 때 다른 온실의 보드를 가져가
+      그 값을 이 장치 ID로 올리거나 임계치/제어 명령을 엉뚱한 보드에 보내지 않도록)
+    """
+
+    def __init__(self, port='auto', baudrate=9600, usb_ids=None, probe=True, probe_timeout=5.0):
+        self.port = port
+        self.baudrate = baudrate
+        self.usb_ids = usb_ids
+        # 후보가 여러 개일 때 보드 확인으로 고름 (후보가 하나면 바로 사용)
+        self.probe = probe
+        self.probe_timeout = probe_timeout
+        self.last_port = None
+
+    @property
+    def auto(self):
+        return self.port == 'auto'
+
+    def locate(self):
+        """연결할 포트 반환 (찾지 못하면 None)"""
+        if not self.auto:
+            if port_exists(self.port):
+                if not is_claimed(self.port):
+                    return self.port
+                print(f"⚠️ {self.port} 포트는 다른 장치가 사용 중입니다.")
+            if not self.usb_ids:
+                return None
+        candidates = find_candidates(self.usb_ids)
+        # 직전에 쓰던 포트가 다시 나타났으면 우선 사용
+        if self.last_port in candidates:
+            candidates.remove(self.last_port)
+            candidates.insert(0, self.last_port)
+        if not self.auto and os.name != 'nt':
+            print(f"🔍 {self.port} 포트가 없어 같은 USB ID의 포트를 찾습니다: {', '.join(candidates) or '후보 없음'}")
+        if len(candidates) <= 1 or not self.probe:
+            return candidates[0] if candidates else None
+        for candidate in candidates:
+            if probe_port(candidate, self.baudrate, self.probe_timeout):
+                return candidate
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Farm Link 시리얼 포트 탐색')
+    parser.add_argument('--usb-ids', type=parse_usb_ids, help='찾을 USB VID:PID (쉼표로 구분, 예: 2341:0043,1a86:7523)')
+    parser.add_argument('--probe', action='store_true', help='후보 포트마다 센서 데이터 줄이 오는지 확인')
+    parser.add_argument('--baudrate', type=int, default=9600, help='보드 확인 통신 속도 (기본: 9600)')
+    args = parser.parse_args()
+
+    ports = list_serial_ports()
+    if not ports:
+        print("시리얼 장치가 없습니다.")
+    for port_info in ports:
+        usb = f"{port_info.vid:04x}:{port_info.pid:04x}" if port_info.vid is not None else "-"
+        print(f"{port_info.device:<24} {usb:<10} {port_info.description}")
+    candidates = find_candidates(args.usb_ids)
+    print(f"🔍 보드 후보: {', '.join(candidates) or '없음'}")
+    if args.probe:
+        for candidate in candidates:
+            found = probe_port(candidate, args.baudrate)
+            print(f"  {candidate}: {'✅ 센서 데이터 수신' if found else '❌ 응답 없음'}")
+    sys.exit(0 if candidates else 1)
+
+
+if __name__ == "__main__":
+    main()
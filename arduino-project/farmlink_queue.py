@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Farm Link 저장 후 전송(store-and-forward) 큐 모듈
+API 서버 장애 시에도 센서 데이터를 잃지 않도록 디스크(SQLite WAL)에 먼저 기록하고
+백그라운드 드레이너가 순서대로 재전송
+"""
+
+import json
+import random
+import sqlite3
+import threading
+import time
+
+from farmlink_batch import SensorBatchUploader, stamp_received_time
+from farmlink_metrics import REGISTRY
+
+
+class DurableSensorQueue:
+    def __init__(self, path='farmlink_queue.db', max_rows=100000, table='outbound', stamp_timestamps=True):
+        self.path = path
+        self.max_rows = max_rows
+        # 같은 파일에 업로드 경로별 테이블을 둘 수 있음 (예: 집계 행은 outbound_rollups)
+        self.table = table
+        self.stamp_timestamps = stamp_timestamps
+        self.lock = threading.Lock()
+        self.rows_evicted = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # 전원이 꺼져도 커밋된 데이터가 남도록 매 커밋마다 동기화
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " payload TEXT NOT NULL,"
+            " enqueued_at REAL NOT NULL)"
+        )
+        self.size = self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if self.size:
+            print(f"💾 미전송 데이터 {self.size}건을 큐에서 복구했습니다.")
+
+    def put(self, data):
+        """센서 데이터를 큐에 기록 (디스크 사용량 제한 초과 시 가장 오래된 데이터 제거)"""
+        if self.stamp_timestamps:
+            stamp_received_time(data)
+        payload = json.dumps(data, ensure_ascii=False)
+        with self.lock:
+            self.conn.execute(
+                f"INSERT INTO {self.table} (payload, enqueued_at) VALUES (?, ?)",
+                (payload, time.time())
+            )
+            self.size += 1
+            if self.size > self.max_rows:
+                overflow = self.size - self.max_rows
+                self.conn.execute(
+                    f"DELETE FROM {self.table} WHERE id IN "
+                    f"(SELECT id FROM {self.table} ORDER BY id LIMIT ?)",
+                    (overflow,)
+                )
+                self.size -= overflow
+                self.rows_evicted += overflow
+        return True
+
+    def peek(self, limit):
+        """가장 오래된 데이터부터 최대 limit건 조회 (삭제하지 않음)"""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id, payload FROM {self.table} ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def ack(self, ids):
+        """전송 완료된 데이터를 큐에서 삭제"""
+        if not ids:
+            return
+        with self.lock:
+            cursor = self.conn.execute(
+                f"DELETE FROM {self.table} WHERE id IN ({','.join('?' * len(ids))})",
+                ids
+            )
+            self.size -= cursor.rowcount
+
+    def oldest_age(self):
+        """가장 오래된 미전송 데이터의 대기 시간 (초)"""
+        with self.lock:
+            # 닫은 뒤 종료 통계 출력에서 호출될 수 있음
+            if self.conn is None:
+                return 0.0
+            row = self.conn.execute(f"SELECT MIN(enqueued_at) FROM {self.table}").fetchone()
+        return time.time() - row[0] if row and row[0] else 0.0
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        """큐 닫기 (WAL 내용을 본 파일에 반영)"""
+        with self.lock:
+            if self.conn is None:
+                return
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.conn.close()
+            self.conn = None
+
+
+class QueueDrainer:
+    def __init__(self, queue, uploader, batch_size=50, initial_backoff=1.0, max_backoff=60.0):
+        self.queue = queue
+        self.uploader = uploader
+        self.batch_size = batch_size
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.wakeup = threading.Event()
+        self.stop_event = threading.Event()
+        self.active = False
+        self.drain_thread = None
+        self.backoff = 0.0
+        self.rows_rejected = 0
+
+    def start(self):
+        """드레이너 스레드 시작"""
+        if self.active:
+            return
+        self.active = True
+        self.stop_event.clear()
+        self.drain_thread = threading.Thread(target=self.drain_worker, daemon=True)
+        self.drain_thread.start()
+        print(f"💾 큐 재전송 시작 (대기 중 {len(self.queue)}건)")
+
+    def stop(self):
+        """드레이너 스레드 중지 (남은 데이터는 디스크에 유지)"""
+        if not self.active:
+            return
+        self.active = False
+        self.stop_event.set()
+        self.wakeup.set()
+        if self.drain_thread:
+            self.drain_thread.join(timeout=15)
+        print(f"💾 큐 재전송 중지 (미전송 {len(self.queue)}건 보관)")
+
+    def notify(self):
+        """새 데이터가 들어왔음을 알림"""
+        self.wakeup.set()
+
+    def send_next(self):
+        """가장 오래된 배치 하나 전송 (보낼 데이터가 없으면 None, 전송 실패로 큐에 남으면 False)"""
+        entries = self.queue.peek(self.batch_size)
+        if not entries:
+            return None
+
+        ids = [row_id for row_id, _ in entries]
+        if self.uploader.send_batch([data for _, data in entries]):
+            self.queue.ack(ids)
+            return True
+
+        if self.uploader.last_status_code == 400:
+            # 서버가 거부한 데이터는 재전송해도 성공할 수 없으므로 폐기
+            self.queue.ack(ids)
+            self.rows_rejected += len(ids)
+            print(f"⚠️ 서버가 거부한 데이터 {len(ids)}건을 큐에서 제거했습니다.")
+            return True
+        return False
+
+    def flush(self):
+        """남은 데이터를 전송 (실패하면 재시도하지 않고 큐에 남김, 드레이너 스레드를 멈춘 뒤 호출)"""
+        while self.send_next():
+            pass
+        return len(self.queue) == 0
+
+    def drain_worker(self):
+        """큐의 데이터를 순서대로 전송하고, 실패 시 지수 백오프 후 재시도"""
+        while self.active:
+            self.wakeup.clear()
+            sent = self.send_next()
+            if sent is None:
+                self.wakeup.wait(timeout=1.0)
+                continue
+            if sent:
+                self.backoff = 0.0
+                continue
+
+            self.backoff = min(max(self.backoff * 2, self.initial_backoff), self.max_backoff)
+            delay = self.backoff * random.uniform(0.5, 1.0)
+            print(f"⏳ 큐 재전송 대기: {delay:.1f}초 후 재시도 (미전송 {len(self.queue)}건)")
+            # 새 데이터 알림에는 깨어나지 않고, 중지 요청 시에만 바로 깨어남
+            self.stop_event.wait(timeout=delay)
+
+    def get_stats(self):
+        """큐 상태 조회"""
+        return {
+            'queued': len(self.queue),
+            'oldest_age_sec': self.queue.oldest_age(),
+            'rows_evicted': self.queue.rows_evicted,
+            'rows_rejected': self.rows_rejected,
+            'backoff_sec': self.backoff,
+        }
+
+
+class UploadPipeline:
+    """배치 전송과 디스크 큐 전송을 묶은 업로드 경로 (여러 장치가 공유 가능)"""
+
+    def __init__(self, api_base_url="http://localhost:3000", batch_size=0, batch_age=5.0,
+                 queue_path=None, session=None):
+        # batch_size가 0이고 큐도 없으면 수신 즉시 한 건짜리 배치로 전송
+        self.uploader = SensorBatchUploader(
+            api_base_url=api_base_url,
+            max_batch_size=batch_size or 1,
+            max_batch_age=batch_age,
+            session=session
+        )
+        # queue_path가 지정되면 디스크 큐에 먼저 기록하고 드레이너가 순서대로 전송
+        self.queue = None
+        self.drainer = None
+        if queue_path:
+            self.queue = DurableSensorQueue(queue_path)
+            self.drainer = QueueDrainer(self.queue, self.uploader, batch_size=batch_size or 50)
+        REGISTRY.register_collector(self.collect_metrics)
+
+    def add(self, data):
+        """센서 데이터를 업로드 경로에 추가"""
+        # 빈 큐는 len()이 0이라 거짓으로 평가되므로 None과 비교
+        if self.queue is not None:
+            self.queue.put(data)
+            self.drainer.notify()
+            return True
+        return self.uploader.add(data)
+
+    def start(self):
+        """전송 스레드 시작"""
+        if self.drainer:
+            self.drainer.start()
+        else:
+            self.uploader.start()
+
+    def stop(self):
+        """전송 스레드 중지"""
+        if self.drainer:
+            self.drainer.stop()
+        else:
+            self.uploader.stop()
+
+    def close(self):
+        """큐 파일 닫기"""
+        REGISTRY.unregister_collector(self.collect_metrics)
+        if self.queue is not None:
+            self.queue.close()
+
+    def get_stats(self):
+        """업로드 통계 조회"""
+        stats = self.uploader.get_stats()
+        if self.drainer:
+            stats.update(self.drainer.get_stats())
+        return stats
+
+    def collect_metrics(self):
+        """/metrics용 업로드 경로 통계 (메모리 버퍼, 디스크 큐 깊이)"""
+        stats = self.uploader.get_stats()
+        metrics = [
+            ('farmlink_upload_rows_sent_total', 'counter', '업로드에 성공한 센서 데이터 수', [({}, stats['rows_sent'])]),
+            ('farmlink_upload_rows_failed_total', 'counter', '업로드에 실패한 센서 데이터 수', [({}, stats['rows_failed'])]),
+            ('farmlink_upload_rows_dropped_total', 'counter', '버퍼가 가득 차 버린 센서 데이터 수', [({}, stats['rows_dropped'])]),
+            ('farmlink_upload_rows_buffered', 'gauge', '메모리 버퍼에서 전송을 기다리는 센서 데이터 수', [({}, stats['rows_buffered'])]),
+        ]
+        if self.queue is not None:
+            metrics.append(('farmlink_queue_depth', 'gauge', '디스크 큐에 남은 미전송 데이터 수', [({}, len(self.queue))]))
+            metrics.append(('farmlink_queue_oldest_age_seconds', 'gauge', '디스크 큐에서 가장 오래된 데이터의 대기 시간',
+                            [({}, self.queue.oldest_age())]))
+        return metrics
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Farm Link 엣지 집계(rollup) 모듈
+장치/센서별로 시간 구간(예: 1분, 15분) 안의 측정값을 array 버퍼에 모았다가
+구간이 끝나면 최소/최대/평균/개수 한 행으로 요약하여 업로드
+"""
+
+import threading
+import time
+from array import array
+from datetime import datetime
+
+from farmlink_batch import SensorBatchUploader
+from farmlink_parser import SENSOR_FIELDS
+from farmlink_queue import DurableSensorQueue, QueueDrainer
+
+# 기본 집계 구간 (초): 1분, 15분
+DEFAULT_RESOLUTIONS = (60, 900)
+
+
+def parse_resolutions(text):
+    """"60,900" 형식의 집계 구간 문자열을 초 단위 튜플로 변환"""
+    resolutions = tuple(sorted({int(part) for part in text.split(',') if part.strip()}))
+    if not resolutions or min(resolutions) <= 0:
+        raise ValueError(f"집계 구간은 1초 이상이어야 합니다: {text}")
+    return resolutions
+
+
+class RollupWindow:
+    """한 장치의 한 집계 구간: 센서별 측정값을 array('d')에 모음"""
+
+    def __init__(self, bucket_start):
+        self.bucket_start = bucket_start
+        self.values = {field: array('d') for field in SENSOR_FIELDS}
+
+    def add(self, reading):
+        for field in SENSOR_FIELDS:
+            self.values[field].append(reading[field])
+
+    def summarize(self, device_id, resolution):
+        """구간 요약 행 생성 (센서별 min/max/avg, 측정 개수)"""
+        row = {
+            'device_id': device_id,
+            'resolution_sec': resolution,
+            'bucket_start': datetime.fromtimestamp(self.bucket_start).astimezone().isoformat(),
+            'sample_count': len(self.values[SENSOR_FIELDS[0]]),
+        }
+        for field, values in self.values.items():
+            row[f'{field}_min'] = min(values)
+            row[f'{field}_max'] = max(values)
+            row[f'{field}_avg'] = round(sum(values) / len(values), 3)
+        return row
+
+
+class RollupAggregator:
+    def __init__(self, sink, resolutions=DEFAULT_RESOLUTIONS, grace=2.0):
+        # sink: 완성된 요약 행을 받는 함수 (예: SensorBatchUploader.add)
+        self.sink = sink
+        self.resolutions = tuple(resolutions)
+        # 구간이 끝난 뒤 늦게 도착하는 데이터를 기다리는 시간 (초)
+        self.grace = grace
+        self.lock = threading.Lock()
+        # (device_id, 집계 구간) -> RollupWindow
+        self.windows = {}
+        # (device_id, 집계 구간) -> 마지막으로 마감한 구간의 끝 시각 (이전 구간 데이터는 버림)
+        self.closed_until = {}
+        self.active = False
+        self.flush_thread = None
+
+        # 집계 통계
+        self.readings_aggregated = 0
+        self.readings_late = 0
+        self.rollups_emitted = 0
+        self.windows_discarded = 0
+
+    def start(self):
+        """끝난 구간을 주기적으로 내보내는 스레드 시작 (데이터가 끊긴 장치도 구간 마감)"""
+        if self.active:
+            return
+        self.active = True
+        self.flush_thread = threading.Thread(target=self.flush_worker, daemon=True)
+        self.flush_thread.start()
+        print(f"🧮 엣지 집계 시작 (구간: {', '.join(f'{resolution}초' for resolution in self.resolutions)})")
+
+    def stop(self):
+        """스레드 중지 후 끝난 구간만 내보내고 진행 중인 구간은 버림
+        (부분 집계를 올리면 재시작 후 같은 구간을 새 측정값만으로 다시 집계한 행이 upsert로 덮어씀)
+        """
+        if not self.active:
+            return
+        self.active = False
+        if self.flush_thread:
+            self.flush_thread.join(timeout=2)
+        self.flush(final=True)
+
+    def add(self, device_id, reading, received_at=None):
+        """측정값 한 건을 모든 집계 구간에 추가 (received_at: 도착 시각, time.time() 기준)"""
+        received_at = received_at if received_at is not None else time.time()
+        completed = []
+        with self.lock:
+            for resolution in self.resolutions:
+                bucket_start = received_at - received_at % resolution
+                key = (device_id, resolution)
+                window = self.windows.get(key)
+                if bucket_start < self.closed_until.get(key, bucket_start) or \
+                        (window is not None and bucket_start < window.bucket_start):
+                    # 이미 마감했거나 지난 구간의 데이터는 집계하지 않음
+                    self.readings_late += 1
+                    continue
+                if window is None or bucket_start > window.bucket_start:
+                    if window is not None:
+                        completed.append(self.close(key, window))
+                    window = self.windows[key] = RollupWindow(bucket_start)
+                window.add(reading)
+            self.readings_aggregated += 1
+        self.emit(completed)
+
+    def flush(self, now=None, final=False):
+        """끝난 구간을 요약하여 내보냄 (final이면 늦은 데이터를 기다리지 않고, 진행 중인 구간은 버림)"""
+        now = now if now is not None else time.time()
+        completed = []
+        with self.lock:
+            for key, window in list(self.windows.items()):
+                resolution = key[1]
+                bucket_end = window.bucket_start + resolution
+                if now >= bucket_end + (0 if final else self.grace):
+                    completed.append(self.close(key, window))
+                elif final:
+                    del self.windows[key]
+                    self.windows_discarded += 1
+        self.emit(completed)
+
+    def close(self, key, window):
+        """구간 마감 후 요약 행 반환 (lock 잠금 상태에서 호출)"""
+        device_id, resolution = key
+        del self.windows[key]
+        self.closed_until[key] = window.bucket_start + resolution
+        return window.summarize(device_id, resolution)
+
+    def flush_worker(self):
+        while self.active:
+            time.sleep(1)
+            self.flush()
+
+    def emit(self, rows):
+        for row in rows:
+            self.sink(row)
+            self.rollups_emitted += 1
+
+    def get_stats(self):
+        """집계 통계 조회"""
+        return {
+            'readings_aggregated': self.readings_aggregated,
+            'readings_late': self.readings_late,
+            'rollups_emitted': self.rollups_emitted,
+            'windows_discarded': self.windows_discarded,
+            'open_windows': len(self.windows),
+        }
+
+
+class RollupUploader:
+    """집계기와 요약 행 배치 업로드(POST /api/sensor-rollups/batch)를 묶은 업로드 경로
+
+    요약 행은 다시 만들 수 없으므로 큐에 먼저 넣고 드레이너가 전송 (실패하면 백오프 후 재전송)
+    queue_path가 있으면 디스크 큐의 outbound_rollups 테이블에 보관하여 재시작 후에도 이어서 전송하고,
+    없으면 메모리 큐를 사용 (서버 upsert가 (device_id, resolution_sec, bucket_start) 기준이라 다시 보내도 안전)
+    """
+
+    def __init__(self, api_base_url="http://localhost:3000", resolutions=DEFAULT_RESOLUTIONS, session=None,
+                 queue_path=None):
+        self.uploader = SensorBatchUploader(
+            api_base_url=api_base_url,
+            max_batch_size=50,
+            max_batch_age=10.0,
+            session=session,
+            endpoint="/api/sensor-rollups/batch",
+            payload_key='rollups',
+            stamp_timestamps=False
+        )
+        self.queue = DurableSensorQueue(queue_path or ':memory:', table='outbound_rollups', stamp_timestamps=False)
+        self.drainer = QueueDrainer(self.queue, self.uploader, batch_size=50)
+        self.aggregator = RollupAggregator(self.enqueue, resolutions=resolutions)
+
+    def add(self, device_id, reading, received_at=None):
+        self.aggregator.add(device_id, reading, received_at)
+
+    def enqueue(self, row):
+        """완성된 요약 행을 큐에 넣고 드레이너를 깨움"""
+        self.queue.put(row)
+        self.drainer.notify()
+
+    def start(self):
+        self.drainer.start()
+        self.aggregator.start()
+
+    def stop(self):
+        # 끝난 구간을 먼저 큐에 넣고, 드레이너를 멈춘 뒤 남은 행을 한 번 더 전송 시도
+        self.aggregator.stop()
+        self.drainer.stop()
+        if not self.drainer.flush() and self.queue.path == ':memory:':
+            print(f"⚠️ 전송하지 못한 집계 행 {len(self.queue)}건이 종료와 함께 사라집니다 (--queue-path로 보관 가능)")
+
+    def close(self):
+        """큐 닫기 (디스크 큐의 미전송 행은 다음 실행에서 전송)"""
+        self.queue.close()
+
+    def get_stats(self):
+        stats = self.aggregator.get_stats()
+        stats.update({f'upload_{key}': value for key, value in self.uploader.get_stats().items()})
+        stats.update({f'upload_{key}': value for key, value in self.drainer.get_stats().items()})
+        return stats
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Farm Link 엣지 규칙 엔진
+수신한 센서 데이터마다 활성 임계치 설정(sensor_threshold_configs)과 복합 규칙을 바로 평가하여
+조건이 성립하면 시리얼로 제어 명령("control:<장치>:<ms>")을 보내고 제어 로그를 기록
+히스테리시스로 경계값 근처의 반복 작동을 막고, 규칙별 재작동 대기 시간(cooldown)을 둠
+"""
+
+import json
+import queue
+import threading
+import time
+
+from farmlink_threshold import DEFAULT_THRESHOLDS
+
+# 비교 연산자 (값, 기준) -> 성립 여부
+OPERATORS = {
+    '<': lambda value, limit: value < limit,
+    '<=': lambda value, limit: value <= limit,
+    '>': lambda value, limit: value > limit,
+    '>=': lambda value, limit: value >= limit,
+}
+
+# 아두이노 펌웨어(farmlink_esp8266)의 자동 제어와 같은 조건을 기본 규칙으로 사용
+DEFAULT_RULES = [
+    {
+        'name': 'dry_soil',
+        'action': 'water_pump',
+        'duration': 5000,
+        'cooldown': 60,
+        'conditions': [
+            {'field': 'soil_moisture', 'op': '<', 'threshold': 'soil_moisture_threshold', 'hysteresis': 5},
+        ],
+    },
+    {
+        'name': 'hot_or_humid',
+        'action': 'fan',
+        'duration': 5000,
+        'cooldown': 30,
+        'match': 'any',
+        'conditions': [
+            {'field': 'temperature', 'op': '>=', 'threshold': 'temperature_threshold', 'hysteresis': 1.0},
+            {'field': 'humidity', 'op': '>=', 'threshold': 'humidity_threshold', 'hysteresis': 3.0},
+        ],
+    },
+    {
+        'name': 'low_light',
+        'action': 'led',
+        'duration': 60000,
+        'cooldown': 60,
+        'conditions': [
+            {'field': 'light_intensity', 'op': '<', 'threshold': 'light_intensity_threshold', 'hysteresis': 5},
+        ],
+    },
+]
+
+
+class RuleCondition:
+    def __init__(self, field, op, threshold, hysteresis=0.0):
+        if op not in OPERATORS:
+            raise ValueError(f"지원하지 않는 비교 연산자입니다: {op}")
+        self.field = field
+        self.op = op
+        # threshold: 숫자 또는 임계치 설정 키 (예: "soil_moisture_threshold")
+        self.threshold = threshold
+        self.hysteresis = float(hysteresis)
+
+    def limit(self, thresholds):
+        if isinstance(self.threshold, str):
+            value = thresholds.get(self.threshold)
+            if value is None:
+                value = DEFAULT_THRESHOLDS.get(self.threshold)
+            return float(value)
+        return float(self.threshold)
+
+    def holds(self, reading, thresholds, active):
+        """조건 성립 여부 (이미 작동 중이면 히스테리시스 폭만큼 더 벗어나야 해제)"""
+        value = reading.get(self.field)
+        if value is None:
+            return False
+        limit = self.limit(thresholds)
+        if active and self.hysteresis:
+            # "<" 규칙은 기준 + 폭 이상이 되어야, ">=" 규칙은 기준 - 폭 미만이 되어야 해제
+            limit = limit + self.hysteresis if self.op in ('<', '<=') else limit - self.hysteresis
+        return OPERATORS[self.op](float(value), limit)
+
+
+class Rule:
+    def __init__(self, name, action, conditions, duration=5000, cooldown=30.0, match='all'):
+        if match not in ('all', 'any'):
+            raise ValueError(f"match는 all 또는 any여야 합니다: {match}")
+        self.name = name
+        self.action = action
+        self.duration = int(duration)
+        self.cooldown = float(cooldown)
+        self.match = match
+        self.conditions = [condition if isinstance(condition, RuleCondition) else RuleCondition(**condition)
+                           for condition in conditions]
+        # 조건 성립 상태와 마지막 작동 시각 (time.monotonic())
+        self.active = False
+        self.last_fired_at = None
+
+        # 규칙별 통계
+        self.fired = 0
+        self.suppressed = 0
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            name=data['name'],
+            action=data['action'],
+            conditions=data['conditions'],
+            duration=data.get('duration', 5000),
+            cooldown=data.get('cooldown', 30.0),
+            match=data.get('match', 'all'),
+        )
+
+    def evaluate(self, reading, thresholds, now):
+        """조건을 평가하여 제어 명령을 보내야 하면 True"""
+        results = [condition.holds(reading, thresholds, self.active) for condition in self.conditions]
+        self.active = all(results) if self.match == 'all' else any(results)
+        if not self.active:
+            return False
+        # 조건이 계속 성립하면 cooldown마다 다시 작동 (예: 흙이 계속 마르면 1분마다 급수)
+        if self.last_fired_at is not None and now - self.last_fired_at < self.cooldown:
+            self.suppressed += 1
+            return False
+        self.last_fired_at = now
+        self.fired += 1
+        return True
+
+
+def load_rules(path=None):
+    """규칙 파일(JSON 목록) 읽기 (path가 없으면 기본 규칙)"""
+    if not path:
+        return [Rule.from_dict(data) for data in DEFAULT_RULES]
+    with open(path, encoding='utf-8') as f:
+        rules = json.load(f)
+    if not isinstance(rules, list) or not rules:
+        raise ValueError("규칙 파일은 하나 이상의 규칙을 담은 JSON 목록이어야 합니다.")
+    try:
+        return [Rule.from_dict(data) for data in rules]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"규칙 형식 오류: {e}")
+
+
+class RulesEngine:
+    """센서 데이터 한 건마다 규칙을 평가하여 제어 명령 전송 (로그 업로드는 별도 스레드)"""
+
+    def __init__(self, controller, rules):
+        self.controller = controller
+        self.rules = rules
+        self.lock = threading.Lock()
+        # 제어 로그는 API 왕복을 기다리지 않도록 큐에 넣고 전송 스레드가 업로드
+        self.log_queue = queue.Queue(maxsize=1000)
+        self.log_thread = None
+
+        # 평가/반응 통계
+        self.evaluations = 0
+        # 이상값으로 표시만 된(보정되지 않은) 측정값이라 평가하지 않은 수
+        self.outliers_skipped = 0
+        self.commands_sent = 0
+        self.logs_dropped = 0
+        self.total_reaction = 0.0
+        self.max_reaction = 0.0
+
+    def start(self):
+        if self.log_thread is None:
+            self.log_thread = threading.Thread(target=self.log_worker, daemon=True)
+            self.log_thread.start()
+
+    def stop(self):
+        if self.log_thread is not None:
+            self.log_queue.put(None)
+            self.log_thread.join(timeout=5)
+            self.log_thread = None
+
+    def evaluate(self, reading, received_monotonic=None):
+        """센서 데이터 한 건 평가 후 작동시킨 규칙 목록 반환"""
+        thresholds = self.controller.threshold_cache.get(self.controller.device_id) or {}
+        now = time.monotonic()
+        # 처리 시간은 수집 파이프라인의 rules 단계가 기록
+        with self.lock:
+            self.evaluations += 1
+            fired = [rule for rule in self.rules if rule.evaluate(reading, thresholds, now)]
+        for rule in fired:
+            self.actuate(rule, received_monotonic)
+        return fired
+
+    def actuate(self, rule, received_monotonic=None):
+        """제어 명령을 쓰기 큐(제어 우선순위)에 넣고 바로 반환"""
+        command = self.controller.send_command(f"control:{rule.action}:{rule.duration}", wait=False)
+        if command is None:
+            return
+        self.commands_sent += 1
+        if received_monotonic is not None:
+            # 센서 데이터 도착부터 명령이 쓰기 큐에 들어갈 때까지의 시간
+            reaction = time.monotonic() - received_monotonic
+            self.total_reaction += reaction
+            self.max_reaction = max(self.max_reaction, reaction)
+        print(f"⚡ 규칙 작동: {rule.name} → {rule.action} {rule.duration}ms")
+        try:
+            self.log_queue.put_nowait((rule.action, rule.duration))
+        except queue.Full:
+            self.logs_dropped += 1
+
+    def log_worker(self):
+        """제어 로그 업로드 스레드"""
+        while True:
+            item = self.log_queue.get()
+            if item is None:
+                return
+            action, duration = item
+            self.controller.log_control_action(action, duration, triggered_by='auto')
+
+    def get_stats(self):
+        """규칙별 작동/억제 횟수와 반응 시간 조회"""
+        return {
+            'evaluations': self.evaluations,
+            'outliers_skipped': self.outliers_skipped,
+            'commands_sent': self.commands_sent,
+            'logs_pending': self.log_queue.qsize(),
+            'logs_dropped': self.logs_dropped,
+            'avg_reaction_ms': self.total_reaction / self.commands_sent * 1000 if self.commands_sent else 0.0,
+            'max_reaction_ms': self.max_reaction * 1000,
+            'rules': {rule.name: {'fired': rule.fired, 'suppressed': rule.suppressed, 'active': rule.active}
+                      for rule in self.rules},
+        }
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Farm Link 주기 작업 스케줄러
+장치마다 time.sleep(N) 스레드를 두는 대신 모든 장치의 주기/1회 작업을 하나의 힙에서 관리하고
+고정 크기 워커 풀에서 실행 (장치를 늘려도 스레드 수는 그대로, 작업 수만 늘어남)
+주기 작업의 실행 시각은 시작 시각 + n × 주기로 정해 작업 소요 시간만큼 밀리지 않고,
+밀린 실행은 정책에 따라 건너뛰거나(skip) 바로 따라잡음(catch_up)
+작업별 예정 시각 대비 실제 시작 지연(lag)을 기록
+"""
+
+import heapq
+import itertools
+import math
+import queue
+import random
+import threading
+import time
+
+from farmlink_metrics import REGISTRY
+
+# 예정 시각 대비 실제 시작 지연 (초)
+LAG_SECONDS = REGISTRY.histogram(
+    'farmlink_scheduler_lag_seconds', '예약 작업의 예정 시각 대비 실제 시작 지연',
+    labelnames=('job', 'device_id'), buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+# 밀린 주기 작업 처리: skip(다음 예정 시각으로 건너뜀), catch_up(밀린 횟수만큼 바로 실행, max_catch_up까지)
+POLICIES = ('skip', 'catch_up')
+
+
+class ScheduledJob:
+    """예약 작업 하나 (interval이 None이면 1회 작업)"""
+
+    def __init__(self, name, func, interval=None, device_id='', jitter=0.0, policy='skip', max_catch_up=3):
+        if policy not in POLICIES:
+            raise ValueError(f"policy는 {', '.join(POLICIES)} 중 하나여야 합니다: {policy}")
+        if interval is not None and interval <= 0:
+            raise ValueError(f"주기는 0보다 커야 합니다: {interval}")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.device_id = device_id
+        # jitter: 예정 시각에 0~jitter초를 더해 여러 장치의 같은 작업이 한꺼번에 몰리지 않게 함
+        # (다음 예정 시각 계산에는 반영하지 않으므로 주기가 밀리지 않음)
+        self.jitter = jitter
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        # 지터를 뺀 예정 시각 (time.monotonic())
+        self.deadline = None
+        self.cancelled = False
+        self.missed = 0
+
+    @property
+    def key(self):
+        return (self.name, self.device_id)
+
+    def fire_at(self):
+        return self.deadline + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def advance(self, now):
+        """실행을 마친 뒤 다음 예정 시각 계산 (건너뛴 횟수 반환)"""
+        self.deadline += self.interval
+        if self.deadline > now:
+            self.missed = 0
+            return 0
+        behind = math.floor((now - self.deadline) / self.interval) + 1
+        if self.policy == 'catch_up' and self.missed < self.max_catch_up:
+            # 바로 다음 실행으로 밀린 한 번을 따라잡고, 따라잡을 수 있는 횟수를 넘긴 만큼은 건너뜀
+            self.missed += 1
+            return 0
+        self.missed = 0
+        self.deadline += behind * self.interval
+        return behind
+
+    def __repr__(self):
+        every = f"{self.interval}초마다" if self.interval else "1회"
+        return f"ScheduledJob({self.name}, {self.device_id or '-'}, {every})"
+
+
+class JobStats:
+    """작업 이름/장치별 실행 통계 (1회 작업은 같은 이름끼리 누적)"""
+
+    def __init__(self):
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+
+    def to_dict(self):
+        return {
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'avg_lag_ms': self.total_lag / self.runs * 1000 if self.runs else 0.0,
+            'max_lag_ms': self.max_lag * 1000,
+            'avg_duration_ms': self.total_duration / self.runs * 1000 if self.runs else 0.0,
+            'max_duration_ms': self.max_duration * 1000,
+        }
+
+
+class JobScheduler:
+    """여러 장치의 주기/1회 작업을 예정 시각 순으로 워커 풀에서 실행"""
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        # (실행 시각, 순번, 작업, 지터를 뺀 예정 시각) 힙
+        self.heap = []
+        self.sequence = itertools.count()
+        # 실행할 (작업, 예정 시각) 큐: 같은 작업은 실행을 마친 뒤 다시 예약하므로 겹쳐 실행되지 않음
+        self.ready = queue.Queue()
+        self.active = False
+        self.dispatch_thread = None
+        self.worker_threads = []
+        self.busy_workers = 0
+
+        # (작업 이름, 장치) -> JobStats
+        self.job_stats = {}
+
+    def start(self):
+        """디스패치 스레드와 워커 풀 시작 (이미 실행 중이면 무시)"""
+        with self.lock:
+            if self.active:
+                return self
+            self.active = True
+        self.dispatch_thread = threading.Thread(target=self.dispatch_worker, name='farmlink-scheduler', daemon=True)
+        self.dispatch_thread.start()
+        self.worker_threads = [
+            threading.Thread(target=self.run_worker, name=f'farmlink-scheduler-{index}', daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self.worker_threads:
+            thread.start()
+        REGISTRY.register_collector(self.collect_metrics)
+        return self
+
+    def stop(self):
+        """새 작업 실행을 멈추고 실행 중인 작업이 끝날 때까지 대기 (예약된 작업은 버림)"""
+        with self.lock:
+            if not self.active:
+                return
+            self.active = False
+            self.heap.clear()
+            self.wakeup.notify()
+        self.dispatch_thread.join(timeout=5)
+        for _ in self.worker_threads:
+            self.ready.put(None)
+        for thread in self.worker_threads:
+            thread.join(timeout=10)
+        self.worker_threads = []
+        REGISTRY.unregister_collector(self.collect_metrics)
+
+    def every(self, interval, func, name, device_id='', jitter=0.0, policy='skip', first_delay=None,
+              max_catch_up=3):
+        """interval초마다 func 실행 (first_delay: 첫 실행까지 대기, 기본은 한 주기 뒤)"""
+        job = ScheduledJob(name, func, interval, device_id, jitter, policy, max_catch_up)
+        job.deadline = time.monotonic() + (interval if first_delay is None else first_delay)
+        self.add(job)
+        return job
+
+    def call_later(self, delay, func, name, device_id=''):
+        """delay초 뒤 func를 한 번 실행"""
+        job = ScheduledJob(name, func, device_id=device_id)
+        job.deadline = time.monotonic() + delay
+        self.add(job)
+        return job
+
+    def cancel(self, job):
+        """작업 취소 (이미 실행 중이면 이번 실행은 마치고 다시 예약하지 않음)"""
+        if job is not None:
+            job.cancelled = True
+
+    def add(self, job):
+        with self.lock:
+            self.job_stats.setdefault(job.key, JobStats())
+            fire_at = job.fire_at()
+            heapq.heappush(self.heap, (fire_at, next(self.sequence), job))
+            # 새 작업이 가장 빠르면 디스패치 스레드의 대기 시간을 다시 계산
+            if self.heap[0][2] is job:
+                self.wakeup.notify()
+
+    def dispatch_worker(self):
+        """예정 시각이 된 작업을 실행 큐로 넘김"""
+        with self.lock:
+            while self.active:
+                if not self.heap:
+                    self.wakeup.wait()
+                    continue
+                fire_at, _, job = self.heap[0]
+                delay = fire_at - time.monotonic()
+                if delay > 0:
+                    self.wakeup.wait(timeout=delay)
+                    continue
+                heapq.heappop(self.heap)
+                if not job.cancelled:
+                    self.ready.put((job, fire_at))
+
+    def run_worker(self):
+        while True:
+            item = self.ready.get()
+            if item is None:
+                return
+            job, fire_at = item
+            self.run(job, fire_at)
+
+    def run(self, job, fire_at):
+        """작업 한 번 실행 후 주기 작업이면 다음 예정 시각으로 다시 예약"""
+        started = time.monotonic()
+        lag = max(started - fire_at, 0.0)
+        LAG_SECONDS.observe(lag, job=job.name, device_id=job.device_id)
+        with self.lock:
+            self.busy_workers += 1
+        error = None
+        try:
+            job.func()
+        except Exception as e:
+            error = e
+            print(f"❌ 예약 작업 오류 ({job.name} {job.device_id}): {e}")
+        finished = time.monotonic()
+        duration = finished - started
+
+        with self.lock:
+            self.busy_workers -= 1
+            stats = self.job_stats[job.key]
+            stats.runs += 1
+            stats.errors += error is not None
+            stats.total_lag += lag
+            stats.max_lag = max(stats.max_lag, lag)
+            stats.total_duration += duration
+            stats.max_duration = max(stats.max_duration, duration)
+            if job.interval is None or job.cancelled or not self.active:
+                return
+            stats.skipped += job.advance(finished)
+            heapq.heappush(self.heap, (job.fire_at(), next(self.sequence), job))
+            self.wakeup.notify()
+
+    def pending_jobs(self):
+        """예약된 작업 목록 (실행 시각 순)"""
+        with self.lock:
+            return [job for _, _, job in sorted(self.heap) if not job.cancelled]
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'busy_workers': self.busy_workers,
+                'pending_jobs': sum(1 for _, _, job in self.heap if not job.cancelled),
+                'ready_backlog': self.ready.qsize(),
+                'jobs': {f"{name}/{device_id}" if device_id else name: stats.to_dict()
+                         for (name, device_id), stats in self.job_stats.items()},
+            }
+
+    def collect_metrics(self):
+        """/metrics용 작업별 실행/건너뜀/오류 수와 워커 사용량"""
+        with self.lock:
+            items = [({'job': name, 'device_id': device_id}, stats) for (name, device_id), stats in self.job_stats.items()]
+            busy = self.busy_workers
+        return [
+            ('farmlink_scheduler_runs_total', 'counter', '예약 작업 실행 수', [(labels, stats.runs) for labels, stats in items]),
+            ('farmlink_scheduler_skipped_total', 'counter', '밀려서 건너뛴 주기 작업 실행 수',
+             [(labels, stats.skipped) for labels, stats in items]),
+            ('farmlink_scheduler_errors_total', 'counter', '오류로 끝난 예약 작업 실행 수',
+             [(labels, stats.errors) for labels, stats in items]),
+            ('farmlink_scheduler_busy_workers', 'gauge', '작업을 실행 중인 워커 수', [({}, busy)]),
+            ('farmlink_scheduler_ready_backlog', 'gauge', '워커를 기다리는 작업 수', [({}, self.ready.qsize())]),
+        ]
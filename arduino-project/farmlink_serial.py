@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Farm Link 시리얼 수신 모듈
+포트에서 블로킹 읽기로 모든 줄(프레임)을 빠짐없이 꺼내 링 버퍼에 보관하고
+프레임마다 도착 시각을 기록하여 백로그 깊이와 지연(staleness)을 측정
+SerialPortMux는 쓰기까지 맡아 포트의 유일한 소유자가 되며, 명령 응답을 요청한 쪽에 연결
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque, namedtuple
+
+from farmlink_metrics import STAGE_SECONDS
+from farmlink_parser import looks_like_sensor_line
+
+# raw: 줄바꿈을 포함한 원본 바이트, received_at: 도착 시각(time.time()),
+# received_monotonic: 지연 계산용 도착 시각(time.monotonic())
+# reading: 이진 프레임 모드에서 디코딩한 SensorReading (텍스트 줄이면 None)
+SerialFrame = namedtuple('SerialFrame', ['raw', 'received_at', 'received_monotonic', 'reading'],
+                         defaults=(None,))
+
+# 보드가 동작을 시작했다고 보는 줄: arduino.ino / ESP8266 펌웨어의 시작 메시지 (센서 데이터 줄도 준비된 것으로 봄)
+READY_TOKENS = ('스마트팜 START!'.encode('utf-8'), 'Farm Link 시스템 시작!'.encode('utf-8'))
+
+
+def wait_until_ready(serial_conn, timeout=3.0, tokens=READY_TOKENS):
+    """포트를 연 직후 보드가 시작 메시지나 센서 데이터를 보낼 때까지 대기 (고정 2초 대기 대신)
+    (준비 여부, 대기 중 읽은 바이트) 반환, timeout이 지나면 준비 여부와 관계없이 진행
+    읽은 바이트는 수신 경로에 다시 넣어 센서 데이터를 잃지 않도록 함
+    """
+    received = bytearray()
+    start = 0
+    deadline = time.monotonic() + timeout
+    # readline은 timeout 동안 줄을 다 받지 못하면 일부만 돌려주므로 짧게 읽어 직접 줄을 나눔
+    original_timeout = serial_conn.timeout
+    serial_conn.timeout = 0.05
+    try:
+        while time.monotonic() < deadline:
+            chunk = serial_conn.read(serial_conn.in_waiting or 1)
+            if not chunk:
+                continue
+            received.extend(chunk)
+            end = received.find(b'\n', start)
+            while end != -1:
+                line = bytes(received[start:end + 1])
+                if looks_like_sensor_line(line) or any(token in line for token in tokens):
+                    return True, bytes(received)
+                start = end + 1
+                end = received.find(b'\n', start)
+    finally:
+        serial_conn.timeout = original_timeout
+    return False, bytes(received)
+
+
+class SerialFrameReader:
+    def __init__(self, serial_conn, capacity=4096, max_frame_size=1024):
+        self.serial_conn = serial_conn
+        self.max_frame_size = max_frame_size
+        # 소비자가 늦어져도 포트 읽기는 멈추지 않으며, 가득 차면 가장 오래된 프레임을 덮어씀
+        self.frames = deque(maxlen=capacity)
+        self.condition = threading.Condition()
+        self.partial = bytearray()
+        # 기본은 줄바꿈 단위 텍스트 프레임, 이진 모드에서는 디코더의 구분자와 디코딩 사용
+        self.delimiter = b'\n'
+        self.frame_decoder = None
+        # 형식 전환은 수신 스레드가 다음 feed()에서 적용 ((decoder,) 또는 None)
+        self.pending_decoder = None
+        self.active = False
+        self.reader_thread = None
+        # 포트 읽기/쓰기 오류(케이블 분리 등)가 나면 한 번 호출 (on_port_lost(error))
+        self.on_port_lost = None
+        self.lost = False
+
+        # 수신 통계
+        self.bytes_read = 0
+        self.frames_received = 0
+        self.frames_overwritten = 0
+        self.frames_oversized = 0
+        self.frames_consumed = 0
+        self.read_errors = 0
+        self.total_staleness = 0.0
+        self.max_staleness = 0.0
+
+    def start(self):
+        """수신 스레드 시작"""
+        if self.active:
+            return
+        self.active = True
+        self.reader_thread = threading.Thread(target=self.read_worker, daemon=True)
+        self.reader_thread.start()
+
+    def stop(self):
+        """수신 스레드 중지 (포트 timeout 만큼 지연될 수 있음)"""
+        if not self.active:
+            return
+        self.active = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.reader_thread:
+            self.reader_thread.join(timeout=2)
+
+    def read_worker(self):
+        """포트에서 데이터가 올 때까지 블로킹 읽기 후 도착한 바이트를 모두 프레임으로 분리"""
+        while self.active:
+            try:
+                # 최소 1바이트를 기다린 뒤(timeout까지) 이미 도착한 바이트를 한 번에 읽음
+                chunk = self.serial_conn.read(max(1, self.serial_conn.in_waiting))
+            except Exception as e:
+                self.read_errors += 1
+                # 같은 포트를 계속 읽어도 복구되지 않으므로 수신을 멈추고 재연결을 맡김
+                self.mark_lost(e)
+                return
+            if chunk:
+                self.feed(chunk)
+
+    def mark_lost(self, error):
+        """포트 연결이 끊긴 것으로 표시하고 on_port_lost 호출 (처음 한 번만)"""
+        if self.lost:
+            return
+        self.lost = True
+        self.active = False
+        print(f"⚠️ 시리얼 포트 연결이 끊겼습니다: {error}")
+        with self.condition:
+            self.condition.notify_all()
+        if self.on_port_lost:
+            self.on_port_lost(error)
+
+    def feed(self, chunk):
+        """수신한 바이트를 프레임(텍스트 줄 또는 이진 프레임)으로 분리하여 링 버퍼에 추가"""
+        received_at = time.time()
+        received_monotonic = time.monotonic()
+        decode_started = time.perf_counter()
+        if self.pending_decoder is not None:
+            # 전환 전 형식으로 받다 만 바이트는 새 형식으로 해석할 수 없으므로 버림
+            (self.frame_decoder,), self.pending_decoder = self.pending_decoder, None
+            self.delimiter = self.frame_decoder.delimiter if self.frame_decoder else b'\n'
+            self.partial.clear()
+        self.bytes_read += len(chunk)
+        self.partial.extend(chunk)
+
+        frames = []
+        start = 0
+        delimiter = self.delimiter
+        while True:
+            end = self.partial.find(delimiter, start)
+            if end < 0:
+                break
+            frames.append(bytes(self.partial[start:end + 1]))
+            start = end + 1
+        del self.partial[:start]
+
+        # 구분자 없이 계속 들어오는 잡음은 프레임 최대 크기에서 잘라 버림
+        if len(self.partial) > self.max_frame_size:
+            self.partial.clear()
+            self.frames_oversized += 1
+
+        if self.frame_decoder is None:
+            decoded = [(raw, None) for raw in frames]
+        else:
+            # 손상(COBS/CRC 오류)된 프레임은 디코더 통계에만 남기고 버림
+            decoded = [result for result in map(self.frame_decoder.decode, frames) if result is not None]
+        STAGE_SECONDS.observe(time.perf_counter() - decode_started, stage='decode')
+
+        if not decoded:
+            return
+        with self.condition:
+            for raw, reading in decoded:
+                frame = SerialFrame(raw, received_at, received_monotonic, reading)
+                # 명령 응답으로 소비된 프레임은 데이터 경로로 보내지 않음
+                if self.route_frame(frame):
+                    continue
+                if len(self.frames) == self.frames.maxlen:
+                    self.frames_overwritten += 1
+                self.frames.append(frame)
+                self.frames_received += 1
+            self.condition.notify()
+
+    def route_frame(self, frame):
+        """데이터 경로 외의 수신자가 프레임을 가져가면 True (기본: 모두 데이터 경로)"""
+        return False
+
+    def use_frame_decoder(self, decoder):
+        """이후 수신 바이트를 decoder 형식(예: 이진 프레임)으로 분리/해석 (None이면 텍스트 줄로 복귀)"""
+        self.pending_decoder = (decoder,)
+
+    def get(self, timeout=None):
+        """가장 오래된 프레임 하나를 꺼냄 (timeout 동안 없으면 None)"""
+        with self.condition:
+            if not self.frames and self.active:
+                self.condition.wait(timeout=timeout)
+            if not self.frames:
+                return None
+            return self.frames.popleft()
+
+    def mark_consumed(self, frame):
+        """프레임 처리 완료 시점을 기록하여 도착부터 처리까지의 지연 측정"""
+        staleness = time.monotonic() - frame.received_monotonic
+        self.frames_consumed += 1
+        self.total_staleness += staleness
+        self.max_staleness = max(self.max_staleness, staleness)
+        return staleness
+
+    def backlog_depth(self):
+        """링 버퍼에 쌓인 프레임 수"""
+        return len(self.frames)
+
+    def os_backlog_bytes(self):
+        """OS 시리얼 버퍼에 남아 있는 바이트 수"""
+        try:
+            return self.serial_conn.in_waiting
+        except Exception:
+            return 0
+
+    def oldest_frame_age(self):
+        """링 버퍼에서 가장 오래 기다린 프레임의 대기 시간 (초)"""
+        with self.condition:
+            if not self.frames:
+                return 0.0
+            return time.monotonic() - self.frames[0].received_monotonic
+
+    def get_stats(self):
+        """수신/백로그 통계 조회"""
+        return {
+            'bytes_read': self.bytes_read,
+            'frames_received': self.frames_received,
+            'frames_consumed': self.frames_consumed,
+            'frames_overwritten': self.frames_overwritten,
+            'frames_oversized': self.frames_oversized,
+            'read_errors': self.read_errors,
+            'backlog_frames': self.backlog_depth(),
+            'os_backlog_bytes': self.os_backlog_bytes(),
+            'oldest_frame_age_sec': self.oldest_frame_age(),
+            'binary': self.frame_decoder.get_stats() if self.frame_decoder else None,
+            'avg_staleness_sec': self.total_staleness / self.frames_consumed if self.frames_consumed else 0.0,
+            'max_staleness_sec': self.max_staleness,
+        }
+
+
+# 쓰기 우선순위 (숫자가 작을수록 먼저 전송)
+PRIORITY_CONTROL = 0
+PRIORITY_THRESHOLD = 1
+PRIORITY_STATUS = 2
+
+
+class SerialCommand:
+    """쓰기 큐에 들어가는 명령 하나 (응답 대기와 왕복 지연 측정)"""
+
+    def __init__(self, data, name, priority, expect, timeout, on_done=None):
+        self.data = data
+        self.name = name
+        self.priority = priority
+        # expect: 응답 줄에 포함되어야 하는 바이트 (None이면 센서 데이터가 아닌 첫 줄)
+        # False이면 응답을 기다리지 않고 쓰기 완료로 종료
+        self.expect = expect
+        self.timeout = timeout
+        # on_done: 명령이 끝나면(응답, 시간 초과, 쓰기 실패, 포트 닫힘) 쓰기 스레드에서 한 번 호출
+        self.on_done = on_done
+        self.submitted_at = time.monotonic()
+        self.written_at = None
+        self.response = None
+        self.error = None
+        self.done = threading.Event()
+
+    def matches(self, raw):
+        """수신 줄이 이 명령의 응답인지 확인 (센서 데이터 줄은 절대 응답으로 취급하지 않음)"""
+        if looks_like_sensor_line(raw):
+            return False
+        return self.expect is None or self.expect in raw
+
+    def wait(self, timeout=None):
+        """응답(또는 쓰기 완료)까지 대기 후 응답 프레임 반환 (없으면 None)"""
+        self.done.wait(timeout if timeout is not None else self.timeout + 1)
+        return self.response
+
+    def finish(self):
+        """명령 종료 (대기 중인 호출자를 깨우고 완료 콜백 호출)"""
+        self.done.set()
+        if self.on_done:
+            try:
+                self.on_done(self)
+            except Exception as e:
+                print(f"⚠️ 명령 완료 처리 오류 ({self.name}): {e}")
+
+    @property
+    def round_trip(self):
+        """쓰기부터 응답 도착까지의 시간 (초, 응답이 없으면 None)"""
+        if self.response is None or self.written_at is None:
+            return None
+        return self.response.received_monotonic - self.written_at
+
+
+class SerialPortMux(SerialFrameReader):
+    def __init__(self, serial_conn, capacity=4096, max_frame_size=1024, default_timeout=2.0):
+        super().__init__(serial_conn, capacity=capacity, max_frame_size=max_frame_size)
+        self.default_timeout = default_timeout
+        # (우선순위, 순번, 명령) 힙: 같은 우선순위는 먼저 들어온 순서대로
+        self.write_queue = []
+        self.write_sequence = itertools.count()
+        self.write_condition = threading.Condition()
+        # 응답을 기다리는 명령 (응답 순서로 연결하기 위해 한 번에 하나만 전송)
+        self.in_flight = None
+        self.writer_active = False
+        self.writer_thread = None
+
+        # 명령 통계 (이름별 왕복 지연: [횟수, 합계, 최대])
+        self.commands_submitted = 0
+        self.commands_written = 0
+        self.responses_matched = 0
+        self.response_timeouts = 0
+        self.write_errors = 0
+        self.round_trips = {}
+
+    def start(self, read=True):
+        """쓰기 스레드 시작 (read=False이면 수신은 호출자가 feed()로 처리, 예: asyncio add_reader)"""
+        if read:
+            super().start()
+        if self.writer_active:
+            return
+        self.writer_active = True
+        self.writer_thread = threading.Thread(target=self.write_worker, daemon=True)
+        self.writer_thread.start()
+
+    def stop(self):
+        """수신/쓰기 스레드 중지 (대기 중인 명령은 응답 없이 종료)"""
+        super().stop()
+        if not self.writer_active:
+            return
+        self.writer_active = False
+        with self.write_condition:
+            self.write_condition.notify_all()
+            in_flight = self.in_flight
+        if in_flight:
+            in_flight.done.set()
+        if self.writer_thread:
+            self.writer_thread.join(timeout=self.default_timeout + 1)
+        with self.write_condition:
+            pending, self.write_queue = self.write_queue, []
+        for _, _, command in pending:
+            command.error = "포트가 닫혔습니다"
+            command.finish()
+
+    def submit(self, data, name='command', priority=PRIORITY_STATUS, expect=None, timeout=None, on_done=None):
+        """쓰기 큐에 명령 추가 후 바로 반환 (응답이 필요하면 반환된 명령의 wait() 호출 또는 on_done 지정)"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        command = SerialCommand(data, name, priority, expect,
+                                self.default_timeout if timeout is None else timeout, on_done=on_done)
+        with self.write_condition:
+            heapq.heappush(self.write_queue, (priority, next(self.write_sequence), command))
+            self.commands_submitted += 1
+            self.write_condition.notify()
+        return command
+
+    def write_worker(self):
+        """쓰기 큐에서 우선순위 순으로 꺼내 포트에 쓰고, 응답을 기다리는 명령은 응답/시간 초과까지 대기"""
+        while self.writer_active:
+            with self.write_condition:
+                while self.writer_active and not self.write_queue:
+                    self.write_condition.wait()
+                if not self.writer_active:
+                    return
+                _, _, command = heapq.heappop(self.write_queue)
+                if command.expect is not False:
+                    self.in_flight = command
+
+            try:
+                # 쓰기 직후 도착한 응답도 연결되도록 쓰기 전에 시각 기록
+                command.written_at = time.monotonic()
+                with STAGE_SECONDS.time(stage='serial_write'):
+                    self.serial_conn.write(command.data)
+                self.commands_written += 1
+            except Exception as e:
+                self.write_errors += 1
+                command.error = str(e)
+                print(f"❌ 명령 전송 실패: {e}")
+                self.mark_lost(e)
+
+            if command.expect is not False and command.error is None:
+                if not command.done.wait(command.timeout):
+                    self.response_timeouts += 1
+            with self.write_condition:
+                self.in_flight = None
+            command.finish()
+
+    def route_frame(self, frame):
+        """응답을 기다리는 명령이 있으면 해당 응답 줄을 명령에 전달 (센서 데이터는 항상 데이터 경로)"""
+        command = self.in_flight
+        # 이진 모드의 센서 값 프레임은 응답이 아님 (텍스트 프레임만 응답으로 연결)
+        if frame.reading is not None:
+            return False
+        if command is None or command.written_at is None or not command.matches(frame.raw):
+            return False
+        with self.write_condition:
+            if self.in_flight is not command:
+                return False
+            self.in_flight = None
+        command.response = frame
+        round_trip = command.round_trip
+        stats = self.round_trips.setdefault(command.name, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += round_trip
+        stats[2] = max(stats[2], round_trip)
+        self.responses_matched += 1
+        command.done.set()
+        return True
+
+    def write_queue_depth(self):
+        """전송 대기 중인 명령 수"""
+        return len(self.write_queue)
+
+    def get_stats(self):
+        """수신/백로그 통계와 명령 전송/왕복 지연 통계 조회"""
+        stats = super().get_stats()
+        stats.update({
+            'commands_submitted': self.commands_submitted,
+            'commands_written': self.commands_written,
+            'responses_matched': self.responses_matched,
+            'response_timeouts': self.response_timeouts,
+            'write_errors': self.write_errors,
+            'write_queue_depth': self.write_queue_depth(),
+            'round_trip_ms': {
+                name: {
+                    'count': count,
+                    'avg': total / count * 1000,
+                    'max': maximum * 1000,
+                }
+                for name, (count, total, maximum) in self.round_trips.items()
+            },
+        })
+        return stats
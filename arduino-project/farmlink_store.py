@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Farm Link 로컬 시계열 저장소
+컨트롤러 호스트에 장치별 최근 이력을 보관하여 네트워크 없이 구간 조회/집계
+- 레코드: 고정 폭 24바이트 (도착 시각 float64 + 센서 값 float32 4개, 리틀 엔디언)
+- 파티션: <root>/<device_id>/<YYYYMMDD>.ts (UTC 하루 단위 파일), 보관 기간이 지난 파일은 통째로 삭제
+- 조회: 기간에 걸친 파티션만 mmap으로 열고, 파티션 안에서는 시각 열을 이진 탐색하여 범위를 찾은 뒤
+  열별 memoryview(strided)로 복사 없이 집계
+
+사용법:
+    python farmlink_store.py --root farmlink_tsdb devices
+    python farmlink_store.py --root farmlink_tsdb last --device farmlink-001 --hours 6
+    python farmlink_store.py --root farmlink_tsdb stats --device farmlink-001 --hours 168 --bucket 3600
+"""
+
+import argparse
+import bisect
+import csv
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from farmlink_parser import SENSOR_FIELDS
+
+RECORD = struct.Struct('<d4f')
+RECORD_SIZE = RECORD.size
+# 레코드 하나를 float32 단위로 본 폭 (시각 2칸 + 센서 4칸), 열 위치
+FLOATS_PER_RECORD = RECORD_SIZE // 4
+FIELD_OFFSETS = {field: 2 + index for index, field in enumerate(SENSOR_FIELDS)}
+PARTITION_SUFFIX = '.ts'
+# memoryview.cast는 호스트 바이트 순서를 따르므로 빅 엔디언 호스트는 struct로 해석
+FAST_PATH = sys.byteorder == 'little'
+
+
+def partition_name(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y%m%d') + PARTITION_SUFFIX
+
+
+def partition_start(name):
+    """파티션 파일 이름의 날짜 시작 시각 (epoch 초)"""
+    day = datetime.strptime(name[:-len(PARTITION_SUFFIX)], '%Y%m%d').replace(tzinfo=timezone.utc)
+    return day.timestamp()
+
+
+class PartitionView:
+    """파티션 파일 하나를 읽기 전용 mmap으로 열어 열 단위로 접근"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        # 기록 중 잘린 마지막 레코드는 제외
+        self.count = size // RECORD_SIZE
+        self.map = mmap.mmap(self.file.fileno(), self.count * RECORD_SIZE, access=mmap.ACCESS_READ) \
+            if self.count else None
+        self.view = memoryview(self.map) if self.map else memoryview(b'')
+        if FAST_PATH and self.count:
+            self.timestamps = self.view.cast('d')[0::3]
+            self.floats = self.view.cast('f')
+        else:
+            records = list(RECORD.iter_unpack(self.view))
+            self.timestamps = [record[0] for record in records]
+            self.columns = [[record[1 + index] for record in records] for index in range(len(SENSOR_FIELDS))]
+
+    def bounds(self, start, end):
+        """[start, end) 시각 범위의 레코드 위치 (시각 열 이진 탐색)"""
+        return bisect.bisect_left(self.timestamps, start), bisect.bisect_left(self.timestamps, end)
+
+    def column(self, field, first, last):
+        """센서 열의 [first, last) 구간 (복사 없는 strided memoryview)"""
+        if FAST_PATH:
+            offset = FIELD_OFFSETS[field]
+            return self.floats[first * FLOATS_PER_RECORD + offset:last * FLOATS_PER_RECORD:FLOATS_PER_RECORD]
+        return self.columns[FIELD_OFFSETS[field] - 2][first:last]
+
+    def record(self, index):
+        return RECORD.unpack_from(self.view, index * RECORD_SIZE)
+
+    def close(self):
+        # 열 view가 남아 있으면 mmap을 닫을 수 없으므로 먼저 해제
+        self.timestamps = None
+        self.floats = None
+        self.view.release()
+        if self.map:
+            self.map.close()
+        self.file.close()
+
+
+class TimeSeriesStore:
+    def __init__(self, root='farmlink_tsdb', retention_days=30, flush_interval=1.0):
+        self.root = root
+        self.retention_days = retention_days
+        self.flush_interval = flush_interval
+        os.makedirs(root, exist_ok=True)
+        self.lock = threading.Lock()
+        # device_id -> [파티션 이름, 파일, 마지막 시각]
+        self.writers = {}
+        self.last_flush = time.monotonic()
+
+        # 기록 통계
+        self.records_written = 0
+        self.records_clamped = 0
+        self.partitions_evicted = 0
+        self.enforce_retention()
+
+    def device_dir(self, device_id):
+        # 장치 ID를 디렉터리 이름으로 쓰므로 경로 구분자는 치환
+        return os.path.join(self.root, device_id.replace(os.sep, '_').replace('/', '_'))
+
+    def append(self, device_id, timestamp, reading):
+        """센서 데이터 한 건 기록 (timestamp: epoch 초, reading: 센서 값 dict)"""
+        with self.lock:
+            writer = self.writers.get(device_id)
+            name = partition_name(timestamp)
+            if writer is None or writer[0] != name:
+                writer = self.open_partition(device_id, name, writer)
+            # 파티션 안에서는 시각 순서가 유지되어야 이진 탐색이 가능하므로
+            # 시계가 뒤로 돌아간 경우 직전 시각으로 맞춤
+            if timestamp < writer[2]:
+                timestamp = writer[2]
+                self.records_clamped += 1
+            writer[2] = timestamp
+            writer[1].write(RECORD.pack(timestamp, *(float(reading.get(field) or 0.0) for field in SENSOR_FIELDS)))
+            self.records_written += 1
+            if time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush_locked()
+
+    def open_partition(self, device_id, name, previous):
+        """장치의 새 파티션 파일 열기 (날짜가 바뀌면 이전 파일을 닫고 보관 기간 정리)"""
+        if previous is not None:
+            previous[1].close()
+            self.enforce_retention()
+        directory = self.device_dir(device_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        last_timestamp = 0.0
+        if os.path.exists(path):
+            # 재시작 후 이어 쓰기: 잘린 마지막 레코드를 정리하고 마지막 시각을 읽음
+            size = os.path.getsize(path)
+            with open(path, 'r+b') as f:
+                f.truncate(size - size % RECORD_SIZE)
+                if size >= RECORD_SIZE:
+                    f.seek(size - size % RECORD_SIZE - RECORD_SIZE)
+                    last_timestamp = RECORD.unpack(f.read(RECORD_SIZE))[0]
+        writer = [name, open(path, 'ab'), last_timestamp]
+        self.writers[device_id] = writer
+        return writer
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        for writer in self.writers.values():
+            writer[1].flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            for writer in self.writers.values():
+                writer[1].close()
+            self.writers = {}
+
+    def enforce_retention(self, now=None):
+        """보관 기간이 지난 파티션 파일 삭제"""
+        if not self.retention_days:
+            return 0
+        cutoff = partition_name((now or time.time()) - self.retention_days * 86400)
+        evicted = 0
+        for device in self.devices():
+            directory = os.path.join(self.root, device)
+            for name in os.listdir(directory):
+                # 파일 이름(YYYYMMDD)은 문자열 순서가 날짜 순서와 같음
+                if name.endswith(PARTITION_SUFFIX) and name < cutoff:
+                    os.remove(os.path.join(directory, name))
+                    evicted += 1
+        self.partitions_evicted += evicted
+        return evicted
+
+    def devices(self):
+        """기록된 장치 목록"""
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def partitions(self, device_id, start, end):
+        """[start, end) 기간에 걸친 파티션 파일 경로 (시간 순)"""
+        directory = self.device_dir(device_id)
+        if not os.path.isdir(directory):
+            return []
+        first, last = partition_name(start), partition_name(end)
+        return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                if name.endswith(PARTITION_SUFFIX) and first <= name <= last]
+
+    def scan(self, device_id, start, end):
+        """기간에 걸친 파티션마다 (view, first, last) 반환 (호출자가 다 쓰면 view.close())"""
+        if device_id in self.writers:
+            self.flush()
+        for path in self.partitions(device_id, start, end):
+            view = PartitionView(path)
+            first, last = view.bounds(start, end)
+            if first < last:
+                yield view, first, last
+            else:
+                view.close()
+
+    def query(self, device_id, start, end, limit=None):
+        """기간 내 센서 데이터 목록 (시각 순, limit이면 마지막 limit건)"""
+        rows = []
+        for view, first, last in self.scan(device_id, start, end):
+            try:
+                for index in range(first, last):
+                    timestamp, *values = view.record(index)
+                    rows.append(dict(zip(SENSOR_FIELDS, values), timestamp=timestamp))
+            finally:
+                view.close()
+        return rows[-limit:] if limit else rows
+
+    def last(self, device_id, hours=1.0, now=None):
+        """최근 hours시간 센서 데이터"""
+        now = now or time.time()
+        return self.query(device_id, now - hours * 3600, now + 1)
+
+    def aggregate(self, device_id, start, end, bucket=None):
+        """기간(또는 bucket초 구간)별 센서별 count/min/max/avg 목록"""
+        buckets = {}
+        for view, first, last in self.scan(device_id, start, end):
+            try:
+                if bucket:
+                    index = first
+                    while index < last:
+                        bucket_start = view.timestamps[index] // bucket * bucket
+                        stop = min(bisect.bisect_left(view.timestamps, bucket_start + bucket, index, last), last)
+                        self.accumulate(buckets, bucket_start, view, index, stop)
+                        index = stop
+                else:
+                    self.accumulate(buckets, start, view, first, last)
+            finally:
+                view.close()
+        return [self.summarize(bucket_start, state) for bucket_start, state in sorted(buckets.items())]
+
+    @staticmethod
+    def accumulate(buckets, bucket_start, view, first, last):
+        state = buckets.setdefault(bucket_start, {'count': 0, 'fields': {}})
+        state['count'] += last - first
+        for field in SENSOR_FIELDS:
+            column = view.column(field, first, last)
+            current = state['fields'].get(field)
+            minimum, maximum, total = min(column), max(column), sum(column)
+            if current:
+                minimum, maximum, total = min(minimum, current[0]), max(maximum, current[1]), total + current[2]
+            state['fields'][field] = (minimum, maximum, total)
+
+    @staticmethod
+    def summarize(bucket_start, state):
+        row = {
+            'bucket_start': datetime.fromtimestamp(bucket_start, timezone.utc).isoformat(),
+            'count': state['count'],
+        }
+        for field, (minimum, maximum, total) in state['fields'].items():
+            row[f'{field}_min'] = minimum
+            row[f'{field}_max'] = maximum
+            row[f'{field}_avg'] = total / state['count']
+        return row
+
+    def get_stats(self):
+        return {
+            'root': self.root,
+            'records_written': self.records_written,
+            'records_clamped': self.records_clamped,
+            'partitions_evicted': self.partitions_evicted,
+            'open_partitions': len(self.writers),
+        }
+
+
+def write_rows(rows, output_format):
+    """조회 결과 출력 (table, csv)"""
+    if not rows:
+        print("데이터가 없습니다.")
+        return
+    if output_format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+        return
+    for row in rows:
+        print('  '.join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                        for key, value in row.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Farm Link 로컬 시계열 저장소 조회')
+    parser.add_argument('--root', default='farmlink_tsdb', help='저장소 디렉터리 (기본: farmlink_tsdb)')
+    parser.add_argument('command', choices=['devices', 'last', 'stats'],
+                        help='devices: 장치 목록, last: 최근 데이터, stats: 집계')
+    parser.add_argument('--device', help='장치 ID')
+    parser.add_argument('--hours', type=float, default=1.0, help='조회 기간 (시간, 기본: 1)')
+    parser.add_argument('--limit', type=int, help='last: 마지막 N건만 출력')
+    parser.add_argument('--bucket', type=int, help='stats: 집계 구간 (초, 예: 3600)')
+    parser.add_argument('--format', choices=['table', 'csv'], default='table', help='출력 형식')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        print(f"❌ 저장소가 없습니다: {args.root}")
+        sys.exit(1)
+    # 조회만 하므로 보관 기간 정리는 하지 않음
+    store = TimeSeriesStore(args.root, retention_days=0)
+    if args.command == 'devices':
+        for device in store.devices():
+            print(device)
+        return
+    if not args.device:
+        parser.error('--device가 필요합니다.')
+
+    now = time.time()
+    started = time.perf_counter()
+    if args.command == 'last':
+        rows = store.query(args.device, now - args.hours * 3600, now + 1, limit=args.limit)
+        for row in rows:
+            row['timestamp'] = datetime.fromtimestamp(row['timestamp']).isoformat(timespec='seconds')
+    else:
+        rows = store.aggregate(args.device, now - args.hours * 3600, now + 1, bucket=args.bucket)
+    elapsed = time.perf_counter() - started
+    write_rows(rows, args.format)
+    if args.format == 'table':
+        print(f"⏱️ {len(rows)}행, {elapsed * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Farm Link 임계치 설정 캐시
+장치별로 활성 임계치 설정과 ETag를 보관하여 조건부 조회(If-None-Match)로 재검증하고,
+아두이노에 마지막으로 보낸 값과 달라졌을 때만 다시 전송하도록 판단
+"""
+
+import threading
+
+import requests
+
+from farmlink_api import FarmLinkApiClient
+
+# 임계치 값이 없을 때 사용하는 아두이노 기본값
+DEFAULT_THRESHOLDS = {
+    'soil_moisture_threshold': 20,
+    'light_intensity_threshold': 60,
+    'temperature_threshold': 30.0,
+    'humidity_threshold': 70.0,
+}
+
+# 임계치 수신 보드(farmlink_esp8266)의 응답 줄에 포함되는 문자열 ("=== 임계치 설정 데이터 수신 ===")
+THRESHOLD_ACK_TOKEN = '임계치'.encode('utf-8')
+
+
+def build_threshold_string(config):
+    """아두이노에 전송할 임계치 문자열 구성 (형식: "M:69,D:68,T:30,H:66//")"""
+    values = {}
+    for key, default in DEFAULT_THRESHOLDS.items():
+        value = config.get(key)
+        values[key] = int(float(value if value is not None else default))
+    return (f"M:{values['soil_moisture_threshold']},D:{values['light_intensity_threshold']},"
+            f"T:{values['temperature_threshold']},H:{values['humidity_threshold']}//")
+
+
+class ThresholdCache:
+    def __init__(self, api_base_url="http://localhost:3000", session=None):
+        self.api_base_url = api_base_url
+        self.http = session or FarmLinkApiClient(api_base_url)
+        self.lock = threading.Lock()
+        # device_id -> {'config', 'etag', 'sent_string', 'pending_string'}
+        # sent_string: 보드가 응답으로 확인한 값, pending_string: 전송 후 응답을 기다리는 값
+        self.entries = {}
+
+        # 조회/전송 통계
+        self.requests_sent = 0
+        self.not_modified = 0
+        self.changes = 0
+        self.request_errors = 0
+        self.pushes = 0
+        self.pushes_skipped = 0
+
+    def entry(self, device_id):
+        with self.lock:
+            return self.entries.setdefault(device_id, {'config': None, 'etag': None, 'sent_string': None,
+                                                          'pending_string': None})
+
+    def get(self, device_id):
+        """캐시된 활성 임계치 설정 (없으면 None)"""
+        return self.entry(device_id)['config']
+
+    def fetch(self, device_id, wait=0):
+        """활성 임계치 설정을 조건부로 재검증하여 (설정, 변경 여부) 반환
+
+        wait > 0이면 서버가 설정이 바뀔 때까지 최대 wait초 동안 응답을 보류 (long-poll)
+        네트워크 오류 시에는 캐시된 설정을 그대로 반환
+        """
+        entry = self.entry(device_id)
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        params = {'wait': wait} if wait and entry['etag'] else None
+
+        self.requests_sent += 1
+        try:
+            response = self.http.get(
+                f"{self.api_base_url}/api/threshold-configs/{device_id}/active",
+                headers=headers,
+                params=params,
+                timeout=5 + (wait or 0)
+            )
+        except requests.exceptions.RequestException as e:
+            self.request_errors += 1
+            print(f"⚠️ 네트워크 오류: {e}")
+            return entry['config'], False
+
+        if response.status_code == 304:
+            self.not_modified += 1
+            return entry['config'], False
+
+        if response.status_code != 200:
+            self.request_errors += 1
+            print(f"⚠️ API 서버 오류: {response.status_code}")
+            return entry['config'], False
+
+        result = response.json()
+        if not result.get('success'):
+            self.request_errors += 1
+            print(f"⚠️ 임계치 설정 조회 실패: {result.get('error', 'Unknown error')}")
+            return entry['config'], False
+
+        config = result.get('data')
+        changed = self.effective_string(config) != self.effective_string(entry['config'])
+        with self.lock:
+            entry['config'] = config
+            entry['etag'] = response.headers.get('ETag')
+        if changed:
+            self.changes += 1
+        return config, changed
+
+    @staticmethod
+    def effective_string(config):
+        return build_threshold_string(config) if config else None
+
+    def needs_push(self, device_id, threshold_string):
+        """아두이노가 마지막으로 확인했거나 응답을 기다리는 값과 다른지 확인"""
+        entry = self.entry(device_id)
+        if threshold_string in (entry['sent_string'], entry['pending_string']):
+            self.pushes_skipped += 1
+            return False
+        return True
+
+    def mark_pending(self, device_id, threshold_string):
+        """전송 후 응답을 기다리는 값 기록 (응답 전 동기화에서 같은 값을 다시 보내지 않음)"""
+        self.entry(device_id)['pending_string'] = threshold_string
+        self.pushes += 1
+
+    def mark_sent(self, device_id, threshold_string):
+        """아두이노가 응답으로 확인한 값 기록"""
+        entry = self.entry(device_id)
+        entry['sent_string'] = threshold_string
+        if entry['pending_string'] == threshold_string:
+            entry['pending_string'] = None
+
+    def invalidate_sent(self, device_id):
+        """보드가 재시작(시리얼 재연결)되었거나 응답이 없어 다음 동기화 때 다시 전송해야 함"""
+        entry = self.entry(device_id)
+        entry['sent_string'] = None
+        entry['pending_string'] = None
+
+    def get_stats(self):
+        """조회/전송 통계 조회"""
+        return {
+            'requests_sent': self.requests_sent,
+            'not_modified': self.not_modified,
+            'changes': self.changes,
+            'request_errors': self.request_errors,
+            'pushes': self.pushes,
+            'pushes_skipped': self.pushes_skipped,
+        }
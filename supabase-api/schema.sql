@@ -13,6 +13,29 @@ CREATE TABLE IF NOT EXISTS sensor_data (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- 엣지 집계(rollup) 테이블: 게이트웨이가 구간(resolution_sec)별로 요약한 센서 값
+CREATE TABLE IF NOT EXISTS sensor_rollups (
+    id BIGSERIAL PRIMARY KEY,
+    device_id VARCHAR(50) NOT NULL,
+    resolution_sec INTEGER NOT NULL,       -- 집계 구간 (초, 예: 60, 900)
+    bucket_start TIMESTAMPTZ NOT NULL,     -- 구간 시작 시각
+    sample_count INTEGER NOT NULL,         -- 구간 내 측정 개수
+    soil_moisture_min NUMERIC(5,2) NOT NULL,
+    soil_moisture_max NUMERIC(5,2) NOT NULL,
+    soil_moisture_avg NUMERIC(6,3) NOT NULL,
+    light_intensity_min NUMERIC(5,2) NOT NULL,
+    light_intensity_max NUMERIC(5,2) NOT NULL,
+    light_intensity_avg NUMERIC(6,3) NOT NULL,
+    temperature_min NUMERIC(5,2) NOT NULL,
+    temperature_max NUMERIC(5,2) NOT NULL,
+    temperature_avg NUMERIC(6,3) NOT NULL,
+    humidity_min NUMERIC(5,2) NOT NULL,
+    humidity_max NUMERIC(5,2) NOT NULL,
+    humidity_avg NUMERIC(6,3) NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (device_id, resolution_sec, bucket_start)
+);
+
 -- 디바이스 정보 테이블
 CREATE TABLE IF NOT EXISTS devices (
     id VARCHAR(50) PRIMARY KEY,
@@ -42,11 +65,15 @@ CREATE TABLE IF NOT EXISTS sensor_threshold_configs (
 -- 인덱스 생성
 CREATE INDEX IF NOT EXISTS idx_sensor_data_timestamp ON sensor_data(timestamp);
 CREATE INDEX IF NOT EXISTS idx_sensor_data_device_id ON sensor_data(device_id);
+-- 내보내기 keyset 페이지 조회 (device_id, timestamp, id 순서)
+CREATE INDEX IF NOT EXISTS idx_sensor_data_device_timestamp_id ON sensor_data(device_id, timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_sensor_rollups_resolution_bucket ON sensor_rollups(resolution_sec, bucket_start);
 CREATE INDEX IF NOT EXISTS idx_sensor_threshold_configs_device_id ON sensor_threshold_configs(device_id);
 CREATE INDEX IF NOT EXISTS idx_sensor_threshold_configs_active ON sensor_threshold_configs(is_active);
 
 -- RLS (Row Level Security) 정책 설정
 ALTER TABLE sensor_data ENABLE ROW LEVEL SECURITY;
+ALTER TABLE sensor_rollups ENABLE ROW LEVEL SECURITY;
 ALTER TABLE devices ENABLE ROW LEVEL SECURITY;
 ALTER TABLE sensor_threshold_configs ENABLE ROW LEVEL SECURITY;
 
@@ -58,6 +85,16 @@ CREATE POLICY "Allow read access to sensor_data" ON sensor_data
 CREATE POLICY "Allow insert access to sensor_data" ON sensor_data
     FOR INSERT WITH CHECK (true);
 
+-- 모든 사용자가 집계 데이터를 읽고 저장(upsert)할 수 있도록 허용
+CREATE POLICY "Allow read access to sensor_rollups" ON sensor_rollups
+    FOR SELECT USING (true);
+
+CREATE POLICY "Allow insert access to sensor_rollups" ON sensor_rollups
+    FOR INSERT WITH CHECK (true);
+
+CREATE POLICY "Allow update access to sensor_rollups" ON sensor_rollups
+    FOR UPDATE USING (true);
+
 -- 모든 사용자가 디바이스 정보를 읽을 수 있도록 허용
 CREATE POLICY "Allow read access to devices" ON devices
     FOR SELECT USING (true);
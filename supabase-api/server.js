@@ -49,13 +49,22 @@ app.get('/health', (req, res) => {
 })
 
 
+// 클라이언트가 보낸 측정 시각 (수집기가 보드 millis()로 추정한 시각, 시간대 포함 ISO 8601)
+// 문자열이 아니거나 해석할 수 없으면 서버 수신 시각 사용
+const sampleTimestamp = (timestamp, now) => {
+  if (typeof timestamp !== 'string') return now
+  const parsed = Date.parse(timestamp)
+  return Number.isNaN(parsed) ? now : new Date(parsed).toISOString()
+}
+
 // 센서 데이터 API
 app.post('/api/sensor-data', async (req, res) => {
   try {
-    const { soil_moisture, light_intensity, temperature, humidity, device_id } = req.body
+    const { soil_moisture, light_intensity, temperature, humidity, device_id, timestamp } = req.body
 
     // 데이터 유효성 검사
-    if (!soil_moisture || !light_intensity || !temperature || !humidity) {
+    // 0(밤의 조도, 0°C 등)도 정상 값이므로 누락(null/undefined)만 거부
+    if (soil_moisture == null || light_intensity == null || temperature == null || humidity == null) {
       return res.status(400).json({
         success: false,
         error: '필수 센서 데이터가 누락되었습니다.'
@@ -72,7 +81,7 @@ app.post('/api/sensor-data', async (req, res) => {
         temperature: parseFloat(temperature),
         humidity: parseFloat(humidity),
         device_id: device_id || 'farmlink-001',
-        timestamp: now,
+        timestamp: sampleTimestamp(timestamp, now),
         created_at: now
       }])
       .select()
@@ -110,16 +119,120 @@ app.post('/api/sensor-data', async (req, res) => {
   }
 })
 
+// 센서 데이터 일괄 저장 API (배치 업로드)
+const MAX_BATCH_READINGS = 1000
+
+app.post('/api/sensor-data/batch', async (req, res) => {
+  try {
+    const { readings } = req.body
+
+    if (!Array.isArray(readings) || readings.length === 0) {
+      return res.status(400).json({
+        success: false,
+        error: 'readings 배열이 필요합니다.'
+      })
+    }
+    if (readings.length > MAX_BATCH_READINGS) {
+      return res.status(400).json({
+        success: false,
+        error: `한 번에 최대 ${MAX_BATCH_READINGS}건까지 저장할 수 있습니다.`
+      })
+    }
+
+    const now = new Date().toISOString()
+    const rows = []
+    let rejected = 0
+
+    for (const item of readings) {
+      const { soil_moisture, light_intensity, temperature, humidity, device_id, timestamp } = item || {}
+
+      // 필수 센서 값이 없는 항목은 제외
+      if (soil_moisture == null || light_intensity == null || temperature == null || humidity == null) {
+        rejected++
+        continue
+      }
+
+      rows.push({
+        soil_moisture: parseFloat(soil_moisture),
+        light_intensity: parseFloat(light_intensity),
+        temperature: parseFloat(temperature),
+        humidity: parseFloat(humidity),
+        device_id: device_id || 'farmlink-001',
+        // 배치는 수집 후 지연되어 도착하므로 측정 시각을 유지
+        timestamp: sampleTimestamp(timestamp, now),
+        created_at: now
+      })
+    }
+
+    if (rows.length === 0) {
+      return res.status(400).json({
+        success: false,
+        error: '필수 센서 데이터가 누락되었습니다.',
+        rejected: rejected
+      })
+    }
+
+    const { error } = await supabase
+      .from('sensor_data')
+      .insert(rows)
+
+    if (error) {
+      console.error('Supabase 일괄 저장 오류:', error)
+      return res.status(500).json({
+        success: false,
+        error: '데이터 저장에 실패했습니다.'
+      })
+    }
+
+    // 배치에 포함된 디바이스 상태를 한 번씩만 업데이트
+    const deviceIds = [...new Set(rows.map(row => row.device_id))]
+    await supabase
+      .from('devices')
+      .update({
+        last_seen: now,
+        updated_at: now
+      })
+      .in('id', deviceIds)
+
+    res.json({
+      success: true,
+      inserted: rows.length,
+      rejected: rejected,
+      message: `센서 데이터 ${rows.length}건이 저장되었습니다.`
+    })
+
+  } catch (error) {
+    console.error('센서 데이터 일괄 저장 API 오류:', error)
+    res.status(500).json({
+      success: false,
+      error: '서버 내부 오류가 발생했습니다.'
+    })
+  }
+})
+
+// keyset 커서의 시각 형식 (예: 2025-01-01T00:00:00.123456+00:00)
+const ISO_TIMESTAMP = /^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?(Z|[+-]\d{2}(:?\d{2})?)?$/
+
 // 센서 데이터 조회 API
+// - order=asc이면 (timestamp, id) 오름차순 keyset 페이지 조회: 응답의 next_cursor를
+//   after_timestamp/after_id로 다시 보내면 다음 페이지 (offset 없이 인덱스 범위 스캔)
+// - end_before를 지정하면 end_date 대신 배타적 상한 (구간을 나눠 받을 때 경계 행 중복 방지)
+const MAX_PAGE_SIZE = 1000
+
 app.get('/api/sensor-data', async (req, res) => {
   try {
-    const { limit = 100, device_id, start_date, end_date } = req.query
+    const { limit = 100, device_id, start_date, end_date, end_before, order, after_timestamp, after_id } = req.query
+    const keyset = order === 'asc'
+    const pageSize = keyset ? Math.min(parseInt(limit), MAX_PAGE_SIZE) : parseInt(limit)
 
     let query = supabase
       .from('sensor_data')
       .select('*')
-      .order('created_at', { ascending: false })
-      .limit(parseInt(limit))
+
+    query = keyset
+      ? query.order('timestamp', { ascending: true }).order('id', { ascending: true })
+      : query.order('created_at', { ascending: false })
+    query = query.limit(pageSize)
 
     if (device_id) {
       query = query.eq('device_id', device_id)
@@ -130,6 +243,29 @@ app.get('/api/sensor-data', async (req, res) => {
     if (end_date) {
       query = query.lte('timestamp', end_date)
     }
+    if (end_before) {
+      query = query.lt('timestamp', end_before)
+    }
+    if (keyset && after_timestamp && after_id) {
+      // 커서 값은 PostgREST 필터 문자열에 들어가므로 형식을 확인한 뒤에만 사용 (따옴표/쉼표로 필터 변조 방지)
+      // 시각은 마이크로초까지 그대로 비교해야 하므로 toISOString()(밀리초)으로 바꾸지 않고 검증한 원래 값을 사용
+      if (!ISO_TIMESTAMP.test(after_timestamp) || Number.isNaN(Date.parse(after_timestamp))) {
+        return res.status(400).json({
+          success: false,
+          error: 'after_timestamp는 ISO 8601 시각이어야 합니다.'
+        })
+      }
+      if (!/^\d+$/.test(after_id)) {
+        return res.status(400).json({
+          success: false,
+          error: 'after_id는 숫자여야 합니다.'
+        })
+      }
+      // 마지막으로 받은 행 (timestamp, id) 다음부터
+      query = query.or(
+        `timestamp.gt."${after_timestamp}",and(timestamp.eq."${after_timestamp}",id.gt.${after_id})`
+      )
+    }
 
     const { data, error } = await query
 
@@ -141,10 +277,14 @@ app.get('/api/sensor-data', async (req, res) => {
       })
     }
 
+    const last = data[data.length - 1]
     res.json({
       success: true,
       data: data,
-      count: data.length
+      count: data.length,
+      next_cursor: keyset && data.length === pageSize
+        ? { after_timestamp: last.timestamp, after_id: last.id }
+        : null
     })
 
   } catch (error) {
@@ -157,23 +297,74 @@ app.get('/api/sensor-data', async (req, res) => {
 })
 
 // 센서 데이터 통계 API
+// - resolution(초)을 지정하면 원본 대신 엣지 집계(sensor_rollups) 행으로 계산
+const ROLLUP_FIELDS = ['soil_moisture', 'light_intensity', 'temperature', 'humidity']
+
+// 행 수와 무관하게 한 번의 순회로 계산 (Math.min(...spread)는 행이 많으면 스택 한계를 넘음)
+const summarizeRawRows = (rows) => {
+  const stats = { record_count: rows.length }
+  for (const field of ROLLUP_FIELDS) {
+    let sum = 0
+    let min = Infinity
+    let max = -Infinity
+    for (const row of rows) {
+      const value = Number(row[field])
+      sum += value
+      if (value < min) min = value
+      if (value > max) max = value
+    }
+    stats[`avg_${field}`] = sum / rows.length
+    stats[`min_${field}`] = min
+    stats[`max_${field}`] = max
+  }
+  return stats
+}
+
+const summarizeRollupRows = (rows) => {
+  let count = 0
+  for (const row of rows) count += row.sample_count
+  const stats = { record_count: count, rollup_count: rows.length }
+  for (const field of ROLLUP_FIELDS) {
+    let weighted = 0
+    let min = Infinity
+    let max = -Infinity
+    for (const row of rows) {
+      // 구간 평균을 측정 개수로 가중하여 전체 평균 계산
+      weighted += Number(row[`${field}_avg`]) * row.sample_count
+      if (Number(row[`${field}_min`]) < min) min = Number(row[`${field}_min`])
+      if (Number(row[`${field}_max`]) > max) max = Number(row[`${field}_max`])
+    }
+    stats[`avg_${field}`] = count ? weighted / count : null
+    stats[`min_${field}`] = min
+    stats[`max_${field}`] = max
+  }
+  return stats
+}
+
 app.get('/api/sensor-data/stats', async (req, res) => {
   try {
-    const { device_id, start_date, end_date } = req.query
-
-    let query = supabase
-      .from('sensor_data')
-      .select('soil_moisture, light_intensity, temperature, humidity, created_at')
-      .order('created_at', { ascending: false })
+    const { device_id, start_date, end_date, resolution } = req.query
+    const fromRollups = Boolean(resolution)
+    const timeColumn = fromRollups ? 'bucket_start' : 'created_at'
+
+    let query = fromRollups
+      ? supabase
+        .from('sensor_rollups')
+        .select('*')
+        .eq('resolution_sec', parseInt(resolution))
+      : supabase
+        .from('sensor_data')
+        .select('soil_moisture, light_intensity, temperature, humidity, created_at')
+    query = query.order(timeColumn, { ascending: false })
 
     if (device_id) {
       query = query.eq('device_id', device_id)
     }
     if (start_date) {
-      query = query.gte('created_at', start_date)
+      query = query.gte(timeColumn, start_date)
     }
     if (end_date) {
-      query = query.lte('created_at', end_date)
+      query = query.lte(timeColumn, end_date)
     }
 
     const { data, error } = await query
@@ -195,20 +386,10 @@ app.get('/api/sensor-data/stats', async (req, res) => {
     }
 
     // 통계 계산
-    const stats = {
-      avg_soil_moisture: data.reduce((sum, item) => sum + item.soil_moisture, 0) / data.length,
-      avg_light_intensity: data.reduce((sum, item) => sum + item.light_intensity, 0) / data.length,
-      avg_temperature: data.reduce((sum, item) => sum + item.temperature, 0) / data.length,
-      avg_humidity: data.reduce((sum, item) => sum + item.humidity, 0) / data.length,
-      min_soil_moisture: Math.min(...data.map(item => item.soil_moisture)),
-      max_soil_moisture: Math.max(...data.map(item => item.soil_moisture)),
-      min_temperature: Math.min(...data.map(item => item.temperature)),
-      max_temperature: Math.max(...data.map(item => item.temperature)),
-      record_count: data.length,
-      time_range: {
-        start: data[data.length - 1].timestamp,
-        end: data[0].timestamp
-      }
+    const stats = fromRollups ? summarizeRollupRows(data) : summarizeRawRows(data)
+    stats.time_range = {
+      start: data[data.length - 1][timeColumn],
+      end: data[0][timeColumn]
     }
 
     res.json({
@@ -225,6 +406,139 @@ app.get('/api/sensor-data/stats', async (req, res) => {
   }
 })
 
+// 엣지 집계(rollup) 일괄 저장 API
+// 같은 (device_id, resolution_sec, bucket_start) 행은 최신 값으로 덮어씀 (재전송 시 중복 방지)
+const MAX_BATCH_ROLLUPS = 1000
+
+app.post('/api/sensor-rollups/batch', async (req, res) => {
+  try {
+    const { rollups } = req.body
+
+    if (!Array.isArray(rollups) || rollups.length === 0) {
+      return res.status(400).json({
+        success: false,
+        error: 'rollups 배열이 필요합니다.'
+      })
+    }
+    if (rollups.length > MAX_BATCH_ROLLUPS) {
+      return res.status(400).json({
+        success: false,
+        error: `한 번에 최대 ${MAX_BATCH_ROLLUPS}건까지 저장할 수 있습니다.`
+      })
+    }
+
+    const now = new Date().toISOString()
+    const rows = []
+    let rejected = 0
+
+    for (const item of rollups) {
+      const { device_id, resolution_sec, bucket_start, sample_count } = item || {}
+      const missing = !item || ROLLUP_FIELDS.some(field =>
+        ['min', 'max', 'avg'].some(stat => item[`${field}_${stat}`] == null))
+
+      if (!device_id || !resolution_sec || typeof bucket_start !== 'string' || !sample_count || missing) {
+        rejected++
+        continue
+      }
+
+      const row = {
+        device_id: device_id,
+        resolution_sec: parseInt(resolution_sec),
+        bucket_start: bucket_start,
+        sample_count: parseInt(sample_count),
+        created_at: now
+      }
+      for (const field of ROLLUP_FIELDS) {
+        for (const stat of ['min', 'max', 'avg']) {
+          row[`${field}_${stat}`] = parseFloat(item[`${field}_${stat}`])
+        }
+      }
+      rows.push(row)
+    }
+
+    if (rows.length === 0) {
+      return res.status(400).json({
+        success: false,
+        error: '필수 집계 값이 누락되었습니다.',
+        rejected: rejected
+      })
+    }
+
+    const { error } = await supabase
+      .from('sensor_rollups')
+      .upsert(rows, { onConflict: 'device_id,resolution_sec,bucket_start' })
+
+    if (error) {
+      console.error('Supabase 집계 저장 오류:', error)
+      return res.status(500).json({
+        success: false,
+        error: '집계 데이터 저장에 실패했습니다.'
+      })
+    }
+
+    res.json({
+      success: true,
+      inserted: rows.length,
+      rejected: rejected,
+      message: `집계 데이터 ${rows.length}건이 저장되었습니다.`
+    })
+
+  } catch (error) {
+    console.error('집계 데이터 일괄 저장 API 오류:', error)
+    res.status(500).json({
+      success: false,
+      error: '서버 내부 오류가 발생했습니다.'
+    })
+  }
+})
+
+// 엣지 집계(rollup) 조회 API (대시보드 차트용 작은 시계열)
+app.get('/api/sensor-rollups', async (req, res) => {
+  try {
+    const { resolution = 60, limit = 500, device_id, start_date, end_date } = req.query
+
+    let query = supabase
+      .from('sensor_rollups')
+      .select('*')
+      .eq('resolution_sec', parseInt(resolution))
+      .order('bucket_start', { ascending: false })
+      .limit(parseInt(limit))
+
+    if (device_id) {
+      query = query.eq('device_id', device_id)
+    }
+    if (start_date) {
+      query = query.gte('bucket_start', start_date)
+    }
+    if (end_date) {
+      query = query.lte('bucket_start', end_date)
+    }
+
+    const { data, error } = await query
+
+    if (error) {
+      console.error('Supabase 집계 조회 오류:', error)
+      return res.status(500).json({
+        success: false,
+        error: '집계 데이터 조회에 실패했습니다.'
+      })
+    }
+
+    res.json({
+      success: true,
+      data: data,
+      count: data.length
+    })
+
+  } catch (error) {
+    console.error('집계 데이터 조회 API 오류:', error)
+    res.status(500).json({
+      success: false,
+      error: '서버 내부 오류가 발생했습니다.'
+    })
+  }
+})
+
 // 디바이스 목록 조회 API
 app.get('/api/devices', async (req, res) => {
   try {
@@ -321,6 +635,150 @@ app.post('/api/control/:deviceId', async (req, res) => {
   }
 })
 
+// 제어 로그 저장 (엣지 규칙 엔진/원격 제어 스크립트가 직접 보낸 제어 명령 기록, duration은 밀리초)
+app.post('/api/control-logs', async (req, res) => {
+  try {
+    const { device_id, action, duration = 0, triggered_by = 'manual', sensor_data_id } = req.body || {}
+
+    if (!device_id || !action) {
+      return res.status(400).json({
+        success: false,
+        error: 'device_id와 action이 필요합니다.'
+      })
+    }
+
+    const { data, error } = await supabase
+      .from('control_logs')
+      .insert({
+        device_id: device_id,
+        action: action,
+        duration: Math.floor((parseInt(duration) || 0) / 1000), // 밀리초를 초로 변환
+        triggered_by: triggered_by,
+        sensor_data_id: sensor_data_id || null
+      })
+      .select()
+
+    if (error) throw error
+
+    res.json({
+      success: true,
+      data: data[0]
+    })
+
+  } catch (error) {
+    console.error('제어 로그 저장 오류:', error)
+    res.status(500).json({
+      success: false,
+      error: '제어 로그 저장에 실패했습니다.'
+    })
+  }
+})
+
+// 제어 로그 일괄 저장 (원격 제어 스케줄러가 모아 보낸 기록, duration은 밀리초)
+// executed_at을 보내면 업로드 시각 대신 실제 명령 전송 시각을 created_at으로 사용
+const MAX_BATCH_CONTROL_LOGS = 1000
+
+app.post('/api/control-logs/batch', async (req, res) => {
+  try {
+    const { logs } = req.body || {}
+
+    if (!Array.isArray(logs) || logs.length === 0) {
+      return res.status(400).json({
+        success: false,
+        error: 'logs 배열이 필요합니다.'
+      })
+    }
+    if (logs.length > MAX_BATCH_CONTROL_LOGS) {
+      return res.status(400).json({
+        success: false,
+        error: `한 번에 최대 ${MAX_BATCH_CONTROL_LOGS}건까지 저장할 수 있습니다.`
+      })
+    }
+
+    const now = new Date().toISOString()
+    const rows = []
+    let rejected = 0
+
+    for (const item of logs) {
+      const { device_id, action, duration = 0, triggered_by = 'manual', sensor_data_id, executed_at } = item || {}
+
+      if (!device_id || !action) {
+        rejected++
+        continue
+      }
+
+      rows.push({
+        device_id: device_id,
+        action: action,
+        duration: Math.floor((parseInt(duration) || 0) / 1000), // 밀리초를 초로 변환
+        triggered_by: triggered_by,
+        sensor_data_id: sensor_data_id || null,
+        created_at: typeof executed_at === 'string' ? executed_at : now
+      })
+    }
+
+    if (rows.length === 0) {
+      return res.status(400).json({
+        success: false,
+        error: 'device_id와 action이 필요합니다.',
+        rejected: rejected
+      })
+    }
+
+    const { error } = await supabase
+      .from('control_logs')
+      .insert(rows)
+
+    if (error) throw error
+
+    res.json({
+      success: true,
+      inserted: rows.length,
+      rejected: rejected
+    })
+
+  } catch (error) {
+    console.error('제어 로그 일괄 저장 오류:', error)
+    res.status(500).json({
+      success: false,
+      error: '제어 로그 저장에 실패했습니다.'
+    })
+  }
+})
+
+// 제어 로그 조회
+app.get('/api/control-logs', async (req, res) => {
+  try {
+    const { device_id, limit = 50 } = req.query
+
+    let query = supabase
+      .from('control_logs')
+      .select('*')
+      .order('created_at', { ascending: false })
+      .limit(Math.min(parseInt(limit) || 50, 1000))
+
+    if (device_id) {
+      query = query.eq('device_id', device_id)
+    }
+
+    const { data, error } = await query
+
+    if (error) throw error
+
+    res.json({
+      success: true,
+      data: data || []
+    })
+
+  } catch (error) {
+    console.error('제어 로그 조회 오류:', error)
+    res.status(500).json({
+      success: false,
+      error: '제어 로그 조회에 실패했습니다.'
+    })
+  }
+})
+
 // 장치 상태 조회
 app.get('/api/device-status/:deviceId', async (req, res) => {
   try {
@@ -359,6 +817,22 @@ app.get('/api/device-status/:deviceId', async (req, res) => {
 
 
 
+// 임계치 설정 변경 알림 (long-poll로 대기 중인 활성 설정 조회 요청을 깨움)
+const EventEmitter = require('events')
+const thresholdEvents = new EventEmitter()
+thresholdEvents.setMaxListeners(0)
+const MAX_THRESHOLD_WAIT_SECONDS = 60
+
+const notifyThresholdChange = (deviceId) => {
+  if (deviceId) thresholdEvents.emit(deviceId)
+}
+
+// 활성 설정의 버전 (id + updated_at) 기반 ETag
+const thresholdEtag = (config) => {
+  if (!config) return 'W/"none"'
+  return `W/"${config.id}-${new Date(config.updated_at || config.created_at).getTime()}"`
+}
+
 // 센서 임계치 설정 조회
 app.get('/api/threshold-configs/:deviceId', async (req, res) => {
   try {
@@ -407,6 +881,7 @@ app.post('/api/threshold-configs/:deviceId', async (req, res) => {
       .single()
 
     if (error) throw error
+    notifyThresholdChange(deviceId)
     res.json(data)
   } catch (error) {
     console.error('임계치 설정 생성 오류:', error)
@@ -448,6 +923,7 @@ app.put('/api/threshold-configs/:id', async (req, res) => {
       .single()
 
     if (error) throw error
+    notifyThresholdChange(data && data.device_id)
     res.json(data)
   } catch (error) {
     console.error('임계치 설정 업데이트 오류:', error)
@@ -459,12 +935,14 @@ app.put('/api/threshold-configs/:id', async (req, res) => {
 app.delete('/api/threshold-configs/:id', async (req, res) => {
   try {
     const { id } = req.params
-    const { error } = await supabase
+    const { data, error } = await supabase
       .from('sensor_threshold_configs')
       .delete()
       .eq('id', id)
+      .select('device_id')
 
     if (error) throw error
+    for (const row of data || []) notifyThresholdChange(row.device_id)
     res.json({ success: true, message: '임계치 설정이 삭제되었습니다.' })
   } catch (error) {
     console.error('임계치 설정 삭제 오류:', error)
@@ -473,26 +951,68 @@ app.delete('/api/threshold-configs/:id', async (req, res) => {
 })
 
 // 활성화된 센서 임계치 설정 조회
+// - ETag / If-None-Match: 설정이 바뀌지 않았으면 304 응답
+// - ?wait=초: If-None-Match가 현재 버전과 같으면 변경되거나 시간이 지날 때까지 응답을 보류 (long-poll)
+const fetchActiveThresholdConfig = async (deviceId) => {
+  const { data, error } = await supabase
+    .from('sensor_threshold_configs')
+    .select('*')
+    .eq('device_id', deviceId)
+    .eq('is_active', true)
+    .single()
+
+  if (error) {
+    // 활성화된 설정이 없는 경우
+    if (error.code === 'PGRST116') return null
+    throw error
+  }
+  return data
+}
+
+const waitForThresholdChange = (res, deviceId, seconds) => new Promise(resolve => {
+  const finish = (changed) => {
+    clearTimeout(timer)
+    thresholdEvents.off(deviceId, onChange)
+    res.off('close', onClose)
+    resolve(changed)
+  }
+  const onChange = () => finish(true)
+  // 클라이언트가 먼저 연결을 끊으면 대기 종료
+  const onClose = () => finish(false)
+  const timer = setTimeout(() => finish(false), seconds * 1000)
+  thresholdEvents.on(deviceId, onChange)
+  res.on('close', onClose)
+})
+
 app.get('/api/threshold-configs/:deviceId/active', async (req, res) => {
   try {
     const { deviceId } = req.params
-    const { data, error } = await supabase
-      .from('sensor_threshold_configs')
-      .select('*')
-      .eq('device_id', deviceId)
-      .eq('is_active', true)
-      .single()
+    const ifNoneMatch = req.headers['if-none-match']
+    const wait = Math.min(parseInt(req.query.wait) || 0, MAX_THRESHOLD_WAIT_SECONDS)
 
-    if (error) {
-      if (error.code === 'PGRST116') {
-        // 활성화된 설정이 없는 경우
-        return res.json({
-          success: true,
-          data: null,
-          message: '활성화된 임계치 설정이 없습니다.'
-        })
+    let data = await fetchActiveThresholdConfig(deviceId)
+    let etag = thresholdEtag(data)
+
+    if (wait > 0 && ifNoneMatch === etag) {
+      const changed = await waitForThresholdChange(res, deviceId, wait)
+      if (changed) {
+        data = await fetchActiveThresholdConfig(deviceId)
+        etag = thresholdEtag(data)
       }
-      throw error
+    }
+
+    res.set('ETag', etag)
+    res.set('Cache-Control', 'no-cache')
+    if (ifNoneMatch === etag) {
+      return res.status(304).end()
+    }
+
+    if (!data) {
+      return res.json({
+        success: true,
+        data: null,
+        message: '활성화된 임계치 설정이 없습니다.'
+      })
     }
 
     res.json({
@@ -534,9 +1054,16 @@ app.listen(PORT, () => {
   console.log('등록된 엔드포인트:')
   console.log('- GET /api/sensor-data')
   console.log('- POST /api/sensor-data')
+  console.log('- POST /api/sensor-data/batch')
+  console.log('- GET /api/sensor-data/stats')
+  console.log('- GET /api/sensor-rollups')
+  console.log('- POST /api/sensor-rollups/batch')
   console.log('- GET /api/devices')
   console.log('- GET /api/device-status/:deviceId')
   console.log('- POST /api/control/:deviceId')
+  console.log('- GET /api/control-logs')
+  console.log('- POST /api/control-logs')
+  console.log('- POST /api/control-logs/batch')
   console.log('- GET /api/threshold-configs/:deviceId')
   console.log('- GET /api/threshold-configs/:deviceId/active')
   console.log('- POST /api/threshold-configs/:deviceId')